@@ -0,0 +1,219 @@
+"""Сравнение math_plain_asgi и math_example без сети.
+
+Оба приложения вызываются напрямую как ASGI-callable одним и тем же набором
+запросов. Для каждого эндпоинта считаются throughput и p50/p95/p99, результат
+сохраняется в JSON, который можно сравнивать между коммитами:
+
+    python -m lecture_1.benchmarks.compare_apps --output before.json
+    python -m lecture_1.benchmarks.compare_apps --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from lecture_1.hw.math_plain_asgi import app as plain_app
+from lecture_1.math_example import app as fastapi_app
+
+APPS = {"plain_asgi": plain_app, "fastapi": fastapi_app}
+
+
+@dataclass(slots=True, frozen=True)
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    query_string: bytes = b""
+    body: bytes = b""
+    content_type: bytes = b"application/json"
+
+
+REQUEST_MIX = [
+    Endpoint("factorial_small", "GET", "/factorial", b"n=20"),
+    Endpoint("factorial_large", "GET", "/factorial", b"n=1000"),
+    Endpoint("fibonacci_small", "GET", "/fibonacci/30"),
+    Endpoint("fibonacci_large", "GET", "/fibonacci/10000"),
+    Endpoint("mean_json", "GET", "/mean", body=json.dumps([i / 7 for i in range(1000)]).encode()),
+    Endpoint(
+        "batch",
+        "POST",
+        "/batch",
+        body=json.dumps([{"op": "fibonacci", "n": n} for n in range(50)]).encode(),
+    ),
+    Endpoint("not_found", "GET", "/not_found"),
+]
+
+
+async def call(app, endpoint: Endpoint) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": endpoint.method,
+        "scheme": "http",
+        "path": endpoint.path,
+        "raw_path": endpoint.path.encode(),
+        "query_string": endpoint.query_string,
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", endpoint.content_type),
+            (b"content-length", str(len(endpoint.body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+    status = 0
+
+    async def receive() -> dict[str, Any]:
+        nonlocal request_sent
+        if request_sent:
+            # клиент "висит" до конца ответа, как настоящий сервер
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": endpoint.body, "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncIterator[None]:
+    """startup при входе, shutdown при выходе - как у сервера.
+
+    Без shutdown приложение не закрывает пул процессов, и его воркеры
+    остаются жить после бенчмарка.
+    """
+    messages: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    replies: asyncio.Queue[str] = asyncio.Queue()
+
+    async def send(message: dict[str, Any]) -> None:
+        await replies.put(message["type"])
+
+    async def step(event: str) -> None:
+        await messages.put({"type": f"lifespan.{event}"})
+        reply = await replies.get()
+        if reply != f"lifespan.{event}.complete":
+            raise RuntimeError(f"{reply} for lifespan.{event}")
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, messages.get, send))
+    await step("startup")
+    try:
+        yield
+    finally:
+        await step("shutdown")
+        await task
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def bench_endpoint(app, endpoint: Endpoint, requests: int, concurrency: int) -> dict[str, Any]:
+    for _ in range(min(requests, 20)):  # прогрев
+        await call(app, endpoint)
+
+    latencies: list[float] = []
+    statuses: set[int] = set()
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            started = time.perf_counter()
+            statuses.add(await call(app, endpoint))
+            latencies.append(time.perf_counter() - started)
+
+    per_worker, rest = divmod(requests, concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(per_worker + (i < rest)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "statuses": sorted(statuses),
+        "throughput_rps": requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+
+async def run(requests: int, concurrency: int) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for app_name, app in APPS.items():
+        async with lifespan(app):
+            results[app_name] = {
+                endpoint.name: await bench_endpoint(app, endpoint, requests, concurrency)
+                for endpoint in REQUEST_MIX
+            }
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    print(f"{'app':<11} {'endpoint':<16} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Δrps':>8}")
+    for app_name, endpoints in results.items():
+        for name, stats in endpoints.items():
+            delta = ""
+            base = (baseline or {}).get(app_name, {}).get(name)
+            if base:
+                delta = f"{(stats['throughput_rps'] / base['throughput_rps'] - 1) * 100:+.1f}%"
+            print(
+                f"{app_name:<11} {name:<16} {stats['throughput_rps']:>9.0f} {stats['p50_ms']:>8.3f} "
+                f"{stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f} {delta:>8}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="запросов на эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=1, help="одновременных клиентов")
+    parser.add_argument("--output", default="compare_apps.json", help="куда сохранить результат")
+    parser.add_argument("--baseline", help="JSON предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.concurrency))
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+    print_report(results, baseline)
+    print(f"\nsaved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
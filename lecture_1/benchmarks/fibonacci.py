@@ -0,0 +1,27 @@
+from sys import argv
+from timeit import Timer
+
+from lecture_1.core.fibonacci import fibonacci, fibonacci_linear
+
+
+def measure(func, n: int) -> float:
+    timer = Timer(lambda: func(n))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main(max_power: int = 6) -> None:
+    fast_doubling = fibonacci.__wrapped__  # без кеша
+    print(f"{'n':>10} {'linear, s':>12} {'doubling, s':>12} {'cached, s':>12} {'speedup':>9}")
+    for power in range(1, max_power + 1):
+        n = 10**power
+        linear = measure(fibonacci_linear, n)
+        doubling = measure(fast_doubling, n)
+        fibonacci(n)
+        cached = measure(fibonacci, n)
+        print(f"{n:>10} {linear:>12.6f} {doubling:>12.6f} {cached:>12.2e} {linear / doubling:>8.1f}x")
+
+
+if __name__ == "__main__":
+    # python -m lecture_1.benchmarks.fibonacci [max_power]
+    main(int(argv[1]) if len(argv) > 1 else 6)
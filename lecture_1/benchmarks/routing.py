@@ -0,0 +1,61 @@
+from timeit import Timer
+
+from lecture_1.hw.math_plain_asgi import router
+from lecture_1.hw.routing import parse_query
+
+REQUESTS = [
+    ("GET", "/factorial", b"n=10"),
+    ("GET", "/factorial", b"n=10&debug=1&trace=a%3Db"),
+    ("GET", "/factorial", b"n=10&filter=a=b"),
+    ("GET", "/fibonacci/42", b""),
+    ("GET", "/mean", b""),
+    ("POST", "/not_found", b""),
+]
+
+
+def legacy_dispatch(method: str, path: str, query_string: bytes):
+    # диспетчеризация из исходной версии math_plain_asgi.app
+    if path == "/factorial" and method == "GET":
+        decoded = query_string.decode("utf-8")
+        query_params = dict(param.split("=") for param in decoded.split("&") if "=" in param)
+        return "factorial", query_params.get("n")
+    elif path.startswith("/fibonacci/") and method == "GET":
+        return "fibonacci", path.split("/")[2]
+    elif path == "/mean" and method == "GET":
+        return "mean", None
+    return None
+
+
+def table_dispatch(method: str, path: str, query_string: bytes):
+    matched = router.routes[path].get(method)
+    if matched is None:
+        return None
+    handler, param = matched
+    if query_string:
+        return handler, parse_query(query_string).get("n")
+    return handler, param
+
+
+def measure(dispatch, request) -> float:
+    timer = Timer(lambda: dispatch(*request))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main() -> None:
+    print(f"{'request':<45} {'legacy, ns':>11} {'table, ns':>11}")
+    for request in REQUESTS:
+        method, path, query_string = request
+        name = f"{method} {path}" + (f"?{query_string.decode()}" if query_string else "")
+        try:
+            legacy = f"{measure(legacy_dispatch, request) * 1e9:>11.0f}"
+        except ValueError:
+            # старый парсер падает на значениях с "="
+            legacy = f"{'crash':>11}"
+        table = measure(table_dispatch, request) * 1e9
+        print(f"{name:<45} {legacy} {table:>11.0f}")
+
+
+if __name__ == "__main__":
+    # python -m lecture_1.benchmarks.routing
+    main()
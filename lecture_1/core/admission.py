@@ -0,0 +1,142 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+_T = TypeVar("_T")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status: HTTPStatus, detail: str, retry_after: int | None = None) -> None:
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class AdmissionController:
+    """Очередь с ограничением параллелизма и бюджетом по оценке стоимости.
+
+    Стоимость - оценка в мкс из `lecture_1.core.cost`. Запросы не дороже
+    `free_cost` пропускаются сразу, чтобы дешевые запросы не стояли в
+    очереди за дорогими. Остальные:
+
+    - дороже `max_request_cost` - 503, такой запрос не выполнится никогда;
+    - если вместе с уже принятыми превышают `max_pending_cost` - 429 и
+      `Retry-After` по оценке времени разбора очереди;
+    - иначе ждут одного из `max_concurrency` слотов.
+    """
+
+    max_concurrency: int
+    max_request_cost: float
+    max_pending_cost: float
+    free_cost: float = 0.0
+    pending_cost: float = field(init=False, default=0.0)
+    _slots: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    def retry_after(self) -> int:
+        """Секунды, за которые воркеры разберут уже принятую работу"""
+        return max(1, math.ceil(self.pending_cost / self.max_concurrency / 1e6))
+
+    @asynccontextmanager
+    async def admit(self, cost: float) -> AsyncIterator[None]:
+        """Стоимость известна заранее: принять и занять слот на все время блока"""
+        async with self.reserve() as reservation:
+            reservation.raise_to(cost)
+            async with reservation.slot():
+                yield
+
+    @asynccontextmanager
+    async def reserve(self) -> AsyncIterator["Reservation"]:
+        """Бюджет запроса, который растет по мере чтения тела.
+
+        Стоимость учитывается в `pending_cost` до выхода из блока, а слот
+        параллелизма берется отдельно (`Reservation.slot`) только вокруг
+        вычислений - медленная загрузка тела слот не держит.
+        """
+        reservation = Reservation(self)
+        try:
+            yield reservation
+        finally:
+            self.pending_cost -= reservation.cost
+
+
+@dataclass(slots=True)
+class Reservation:
+    controller: AdmissionController
+    cost: float = 0.0
+
+    def raise_to(self, cost: float) -> None:
+        """Довести оценку запроса до `cost`; AdmissionRejected, если не влезает.
+
+        Пока оценка не выше `free_cost`, запрос не отклоняется, как и
+        дешевые запросы в `admit`.
+        """
+        extra = cost - self.cost
+        if extra <= 0:
+            return
+        controller = self.controller
+        if cost > controller.free_cost:
+            if cost > controller.max_request_cost:
+                raise AdmissionRejected(
+                    HTTPStatus.SERVICE_UNAVAILABLE,
+                    "Estimated cost of the request exceeds the per-request budget.",
+                )
+            if controller.pending_cost + extra > controller.max_pending_cost:
+                raise AdmissionRejected(
+                    HTTPStatus.TOO_MANY_REQUESTS,
+                    "Server is busy, retry later.",
+                    retry_after=controller.retry_after(),
+                )
+        controller.pending_cost += extra
+        self.cost = cost
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Слот параллелизма на время вычислений; дешевым запросам не нужен"""
+        if self.cost <= self.controller.free_cost:
+            yield
+            return
+        async with self.controller._slots:
+            yield
+
+
+async def wait_for_disconnect(receive: Callable[[], Awaitable[dict[str, Any]]]) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(
+    receive: Callable[[], Awaitable[dict[str, Any]]],
+    awaitable: Awaitable[_T],
+) -> _T:
+    """Ждет `awaitable`, отменяя его, если клиент отключился (`http.disconnect`).
+
+    Ожидающие в очереди и еще не начатые в пуле процессов вычисления
+    снимаются; уже запущенное в процессе-воркере досчитается, но результат
+    будет выброшен. Непрочитанные сообщения с телом запроса пропускаются.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if not task.done():
+        task.cancel()
+        raise ClientDisconnected()
+    return task.result()
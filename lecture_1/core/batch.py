@@ -0,0 +1,111 @@
+import math
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any
+
+from lecture_1.core.fibonacci import fibonacci_many
+from lecture_1.core.stats import RunningMean
+
+OPERATIONS = ("factorial", "fibonacci", "mean")
+
+MAX_BATCH_SIZE = 10_000
+
+# Батч рассчитан на много маленьких запросов: результаты должны
+# укладываться в int_max_str_digits, за большими n - в /factorial и /fibonacci
+MAX_FACTORIAL_N = 1_000
+MAX_FIBONACCI_N = 20_000
+
+
+@dataclass(slots=True)
+class Operation:
+    op: str
+    n: int | None = None
+    data: list[float] | None = None
+
+
+def parse_operations(payload: Any) -> list[Operation]:
+    """Разбор тела `POST /batch`, при невалидной структуре - ValueError"""
+    if not isinstance(payload, list):
+        raise ValueError("body must be an array of operations")
+    if len(payload) > MAX_BATCH_SIZE:
+        raise ValueError(f"batch must contain at most {MAX_BATCH_SIZE} operations")
+
+    operations = []
+    for raw in payload:
+        if not isinstance(raw, dict) or raw.get("op") not in OPERATIONS:
+            raise ValueError(f"each operation must be an object with 'op' in {OPERATIONS}")
+
+        if raw["op"] == "mean":
+            data = raw.get("data")
+            # json.loads пропускает NaN, Infinity и 1e999 (inf) - их отсекаем здесь
+            if not isinstance(data, list) or not all(
+                isinstance(x, (int, float)) and not isinstance(x, bool) and (isinstance(x, int) or math.isfinite(x))
+                for x in data
+            ):
+                raise ValueError("'mean' operation requires 'data' array of finite floats")
+            operations.append(Operation(op="mean", data=data))
+        else:
+            n = raw.get("n")
+            if not isinstance(n, int) or isinstance(n, bool):
+                raise ValueError(f"'{raw['op']}' operation requires integer 'n'")
+            operations.append(Operation(op=raw["op"], n=n))
+    return operations
+
+
+def _bad_request(detail: str) -> dict[str, Any]:
+    return {"status": HTTPStatus.BAD_REQUEST, "detail": detail}
+
+
+def _factorials(ns: set[int]) -> dict[int, int]:
+    # каждый следующий факториал - продолжение предыдущего
+    result: dict[int, int] = {}
+    value, previous = 1, 0
+    for n in sorted(ns):
+        value *= math.prod(range(previous + 1, n + 1))
+        result[n] = value
+        previous = n
+    return result
+
+
+def run_batch(operations: list[Operation]) -> list[dict[str, Any]]:
+    """Результаты операций по порядку: `{"result": ...}` или `{"status", "detail"}`.
+
+    Одинаковые и соседние n считаются один раз: факториалы и числа
+    Фибоначчи вычисляются одним проходом по отсортированным n.
+    """
+    factorial_ns = {
+        op.n for op in operations if op.op == "factorial" and 0 <= op.n <= MAX_FACTORIAL_N
+    }
+    fibonacci_ns = {
+        op.n + 1 for op in operations if op.op == "fibonacci" and 0 <= op.n <= MAX_FIBONACCI_N
+    }
+    factorials = _factorials(factorial_ns)
+    fibonaccis = fibonacci_many(fibonacci_ns)
+
+    results = []
+    for op in operations:
+        if op.op == "mean":
+            if not op.data:
+                results.append(_bad_request("Invalid value for data, must be non-empty array of floats"))
+                continue
+            accumulator = RunningMean()
+            try:
+                accumulator.extend(op.data)
+            except OverflowError:
+                # конечные значения, сумма которых не помещается в float64
+                results.append(_bad_request("Sum of values overflows float64"))
+                continue
+            results.append({"result": accumulator.mean})
+        elif op.n < 0:
+            results.append(_bad_request("Invalid value for n, must be non-negative"))
+        elif op.op == "factorial":
+            if op.n > MAX_FACTORIAL_N:
+                results.append(_bad_request(f"n must be at most {MAX_FACTORIAL_N} in batch"))
+            else:
+                results.append({"result": factorials[op.n]})
+        elif op.n > MAX_FIBONACCI_N:
+            results.append(_bad_request(f"n must be at most {MAX_FIBONACCI_N} in batch"))
+        else:
+            # как и /fibonacci/{n}, отдаем F(n + 1)
+            results.append({"result": fibonaccis[op.n + 1]})
+    return results
@@ -0,0 +1,80 @@
+"""Вывод больших целых без `str(int)`.
+
+`str()` для огромных чисел упирается в `int_max_str_digits`, а наивный
+перевод квадратичен. Здесь число рекурсивно делится пополам по двоичным
+разрядам (сдвиги почти бесплатны), а половины собираются обратно уже в
+`decimal.Decimal`, где умножение в libmpdec субквадратично. Готовую
+строку стримит math_plain_asgi.send_int_response кусками по DIGITS_CHUNK.
+"""
+
+import decimal
+from typing import Callable
+
+# Куски не длиннее стольких бит переводятся в Decimal напрямую
+LEAF_BITS = 128
+
+# Числа короче этого (в битах) дешевле перевести обычным str()
+SMALL_INT_BITS = 3000
+
+FORMATS = ("decimal", "hex", "binary")
+
+
+def to_decimal(value: int) -> decimal.Decimal:
+    """Точный Decimal для сколь угодно большого целого (divide and conquer)"""
+    powers: dict[int, decimal.Decimal] = {}
+
+    def power_of_two(bits: int) -> decimal.Decimal:
+        result = powers.get(bits)
+        if result is None:
+            if bits <= LEAF_BITS:
+                result = decimal.Decimal(2) ** bits
+            elif bits - 1 in powers:
+                result = powers[bits - 1] * 2
+            else:
+                half = bits >> 1
+                result = power_of_two(half) * power_of_two(bits - half)
+            powers[bits] = result
+        return result
+
+    def convert(value: int, bits: int) -> decimal.Decimal:
+        if bits <= LEAF_BITS:
+            return decimal.Decimal(value)
+        half = bits >> 1
+        high = value >> half
+        low = value - (high << half)
+        return convert(low, half) + convert(high, bits - half) * power_of_two(half)
+
+    with decimal.localcontext() as context:
+        context.prec = decimal.MAX_PREC
+        context.Emax = decimal.MAX_EMAX
+        context.Emin = decimal.MIN_EMIN
+        context.traps[decimal.Inexact] = True
+        if value < 0:
+            return -convert(-value, (-value).bit_length())
+        return convert(value, value.bit_length())
+
+
+def format_int(value: int, output_format: str) -> str | bytes:
+    """Число в виде для ответа: decimal - цифры, hex - "0x...", binary - байты"""
+    if output_format == "hex":
+        return to_hex(value)
+    if output_format == "binary":
+        return to_bytes(value)
+    if value.bit_length() <= SMALL_INT_BITS:
+        return str(value)
+    return str(to_decimal(value))
+
+
+def compute_formatted(func: Callable[[int], int], n: int, output_format: str) -> str | bytes:
+    """func(n) сразу в формате ответа. В пуле процессов перевод в десятичный
+    вид (для огромных чисел - секунды) идет вместе с вычислением, а не в event loop"""
+    return format_int(func(n), output_format)
+
+
+def to_hex(value: int) -> str:
+    return hex(value)
+
+
+def to_bytes(value: int) -> bytes:
+    """Big-endian представление неотрицательного числа"""
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
@@ -0,0 +1,28 @@
+"""Грубая оценка стоимости вычислений в микросекундах.
+
+Коэффициенты подобраны по замерам CPython 3.12: умножение больших чисел
+в CPython (Карацуба) дает рост примерно n^1.6-n^1.75.
+"""
+
+
+def factorial_cost(n: int) -> float:
+    return 4.5e-4 * n**1.75
+
+
+def fibonacci_cost(n: int) -> float:
+    return 1 + 3.3e-5 * n**1.6
+
+
+def format_cost(bits: int, output_format: str) -> float:
+    # десятичный перевод (to_decimal) ~0.2 мкс на бит, hex и байты - копирование
+    return 1 + (0.2 if output_format == "decimal" else 0.001) * bits
+
+
+def mean_cost(body_length: int) -> float:
+    # разбор JSON ~0.05 мкс на байт, бинарное тело дешевле - оценка сверху
+    return 1 + 0.05 * body_length
+
+
+def batch_cost(body_length: int) -> float:
+    # json.loads + до MAX_FACTORIAL_N/MAX_FIBONACCI_N на операцию
+    return 1 + 0.5 * body_length
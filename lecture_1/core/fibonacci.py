@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Iterable
+
+# Сколько последних n держать в кеше результатов
+CACHE_SIZE = 256
+
+
+def fibonacci_pair(n: int) -> tuple[int, int]:
+    """(F(n), F(n + 1)) методом fast doubling за O(log n) умножений"""
+    if n < 0:
+        raise ValueError("n must be non-negative")
+
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        # F(2k) = F(k) * (2F(k+1) - F(k)), F(2k+1) = F(k)^2 + F(k+1)^2
+        a, b = a * (2 * b - a), a * a + b * b
+        if bit == "1":
+            a, b = b, a + b
+    return a, b
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fibonacci(n: int) -> int:
+    """n-ое число Фибоначчи (F(0) = 0, F(1) = 1) с LRU-кешем"""
+    return fibonacci_pair(n)[0]
+
+
+def fibonacci_many(ns: Iterable[int]) -> dict[int, int]:
+    """F(n) сразу для набора n.
+
+    Первое (минимальное) значение считается fast doubling'ом, а каждое
+    следующее - шагом d от предыдущего:
+    F(m + d) = F(m + 1)F(d) + F(m)F(d - 1), F(m + d + 1) = F(m + 1)F(d + 1) + F(m)F(d).
+    Для близких n это почти бесплатно по сравнению с отдельными вычислениями.
+    """
+    result: dict[int, int] = {}
+    previous = None
+    for n in sorted(set(ns)):
+        if previous is None:
+            a, b = fibonacci_pair(n)
+        else:
+            fd, fd1 = fibonacci_pair(n - previous)
+            a, b = b * fd + a * (fd1 - fd), b * fd1 + a * fd
+        result[n] = a
+        previous = n
+    return result
+
+
+def fibonacci_linear(n: int) -> int:
+    """Наивный O(n) вариант, оставлен как эталон для тестов и бенчмарка"""
+    if n < 0:
+        raise ValueError("n must be non-negative")
+
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
@@ -0,0 +1,50 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass(slots=True)
+class OffloadExecutor:
+    """Выносит дорогие вычисления в пул процессов.
+
+    Задачи с оценкой стоимости (в мкс, см. `lecture_1.core.cost`) не выше
+    `threshold` считаются прямо в event loop: для них пересылка в другой
+    процесс дороже самого вычисления. Пока пул не запущен (например, сервер
+    не поддерживает lifespan), все считается inline.
+    """
+
+    threshold: float
+    max_workers: int | None = None
+    _pool: ProcessPoolExecutor | None = field(init=False, default=None)
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self) -> None:
+        if self._pool is None:
+            # spawn, а не fork: процесс сервера к этому моменту уже многопоточный
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    async def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def run(self, cost: float, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pool is None or cost <= self.threshold:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, func, *args)
+
+
+def threshold_from_env(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return default if value is None else float(value)
@@ -0,0 +1,220 @@
+import math
+import sys
+from array import array
+from dataclasses import dataclass, field
+from itertools import chain, repeat
+from operator import sub
+from typing import Any, Sequence
+
+STATS = ("variance", "min", "max")
+
+
+@dataclass(slots=True)
+class RunningMean:
+    """Среднее потока чисел с компенсированной суммой.
+
+    Сумма хранится парой (сумма, поправка): каждая пачка значений
+    складывается через `math.fsum`, ошибка округления пачки считается вторым
+    проходом `fsum` и вместе с остатком уходит в поправку. Пачка не
+    копируется, память не зависит от длины потока.
+    """
+
+    count: int = 0
+    _sum: float = field(init=False, default=0.0)
+    _compensation: float = field(init=False, default=0.0)
+
+    def add(self, value: float) -> None:
+        self.extend((value,))
+
+    def extend(self, values: Sequence[float]) -> None:
+        if not len(values):
+            return
+
+        # OverflowError, если конечные значения не помещаются в float64 суммой
+        chunk = math.fsum(values)
+        if not math.isfinite(chunk):
+            # inf/nan на входе (например, "1e999" из JSON)
+            raise ValueError("values must be finite")
+        error = math.fsum(chain(values, (-chunk,)))
+        parts = (self._sum, self._compensation, chunk, error)
+
+        total = math.fsum(parts)
+        self.count += len(values)
+        self._compensation = math.fsum(chain(parts, (-total,)))
+        self._sum = total
+
+    @property
+    def total(self) -> float:
+        return self._sum + self._compensation
+
+    @property
+    def mean(self) -> float:
+        if self.count == 0:
+            raise ValueError("mean of empty sequence")
+        return self.total / self.count
+
+
+@dataclass(slots=True)
+class Summary:
+    """Среднее, дисперсия, min и max потока за один проход по пачкам.
+
+    Все редукции по пачке (`fsum`, `sumprod`, `min`, `max`) выполняются на C.
+    Считается только запрошенное: без `track_variance` и `track_extremes`
+    пачка стоит одного `fsum`. Дисперсия считается по отклонениям от среднего
+    пачки (M2), а пачки сливаются формулой Чана - без вычитания больших сумм
+    квадратов, которое при большом смещении значений съедает всю точность.
+    Значения копируются только если нужны квантили (`keep_values=True`).
+    """
+
+    keep_values: bool = False
+    track_variance: bool = False
+    track_extremes: bool = False
+    minimum: float = field(init=False, default=math.inf)
+    maximum: float = field(init=False, default=-math.inf)
+    _sum: RunningMean = field(init=False, default_factory=RunningMean)
+    # среднее и сумма квадратов отклонений от него (M2) для дисперсии
+    _mean: float = field(init=False, default=0.0)
+    _m2: float = field(init=False, default=0.0)
+    _values: array = field(init=False, default_factory=lambda: array("d"))
+
+    @classmethod
+    def for_request(cls, stats: Sequence[str], quantiles: Sequence[float]) -> "Summary":
+        """Summary, считающий только то, что просят `stats` и `quantiles`"""
+        return cls(
+            keep_values=bool(quantiles),
+            track_variance="variance" in stats,
+            track_extremes="min" in stats or "max" in stats,
+        )
+
+    def update(self, values: Sequence[float]) -> None:
+        if not len(values):
+            return
+
+        count = self.count
+        self._sum.extend(values)
+        if self.track_variance:
+            self._merge_m2(count, values)
+        if self.track_extremes:
+            self.minimum = min(self.minimum, min(values))
+            self.maximum = max(self.maximum, max(values))
+        if self.keep_values:
+            self._values.extend(values)
+
+    def _merge_m2(self, count: int, values: Sequence[float]) -> None:
+        chunk_count = len(values)
+        chunk_mean = math.fsum(values) / chunk_count
+        deviations = array("d", map(sub, values, repeat(chunk_mean)))
+        chunk_m2 = math.sumprod(deviations, deviations)
+
+        total = count + chunk_count
+        delta = chunk_mean - self._mean
+        self._mean += delta * chunk_count / total
+        self._m2 += chunk_m2 + delta * delta * count * chunk_count / total
+
+    @property
+    def count(self) -> int:
+        return self._sum.count
+
+    @property
+    def total(self) -> float:
+        return self._sum.total
+
+    @property
+    def mean(self) -> float:
+        return self._sum.mean
+
+    @property
+    def variance(self) -> float:
+        """Выборочная дисперсия (делитель n - 1), для одного значения - 0"""
+        if not self.track_variance:
+            raise ValueError("variance was not tracked")
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def quantiles(self, qs: Sequence[float]) -> list[float]:
+        """Квантили с линейной интерполяцией между соседними значениями"""
+        if not self.keep_values:
+            raise ValueError("values were not kept, quantiles are unavailable")
+        if not self._values:
+            raise ValueError("quantiles of empty sequence")
+
+        ordered = sorted(self._values)
+        result = []
+        for q in qs:
+            position = q * (len(ordered) - 1)
+            lower = math.floor(position)
+            upper = min(lower + 1, len(ordered) - 1)
+            result.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+        return result
+
+
+def float64_view(data: bytes) -> Sequence[float]:
+    """Little-endian float64 из байт без копирования (на little-endian машинах)"""
+    if len(data) % 8:
+        raise ValueError("binary body length must be a multiple of 8")
+    if sys.byteorder == "little":
+        values: Sequence[float] = memoryview(data).cast("d")
+    else:
+        values = array("d", data)
+        values.byteswap()
+    # inf и nan здесь не проверяются: отдельный проход по значениям стоит
+    # как сама сумма, а `RunningMean.extend` отклоняет их по ее результату
+    return values
+
+
+class Float64Reader:
+    """Инкрементальное чтение потока little-endian float64 чанками.
+
+    Чанки не обязаны быть выровнены по 8 байт: хвост переносится в следующий.
+    """
+
+    def __init__(self, accumulator: Summary | None = None) -> None:
+        self.accumulator = accumulator or Summary()
+        self._tail = b""
+
+    @property
+    def count(self) -> int:
+        return self.accumulator.count
+
+    def feed(self, chunk: bytes) -> None:
+        buffer = self._tail + chunk if self._tail else chunk
+        aligned = len(buffer) - len(buffer) % 8
+        self._tail = buffer[aligned:]
+        if aligned:
+            self.accumulator.update(float64_view(buffer[:aligned] if self._tail else buffer))
+
+    def close(self) -> Summary:
+        if self._tail:
+            raise ValueError("binary body length must be a multiple of 8")
+        return self.accumulator
+
+
+def parse_stats_options(stats: str | None, quantiles: str | None) -> tuple[list[str], list[float]]:
+    """Разбор query-параметров `stats=variance,min,max` и `quantiles=0.5,0.9`"""
+    names = [name for name in (stats or "").split(",") if name]
+    if any(name not in STATS for name in names):
+        raise ValueError(f"stats must be a comma separated subset of {STATS}")
+
+    try:
+        qs = [float(q) for q in (quantiles or "").split(",") if q]
+    except ValueError:
+        raise ValueError("quantiles must be comma separated numbers") from None
+    if any(not 0 <= q <= 1 for q in qs):
+        raise ValueError("quantiles must be within [0, 1]")
+
+    return names, qs
+
+
+def summary_response(summary: Summary, stats: Sequence[str], quantiles: Sequence[float]) -> dict[str, Any]:
+    response: dict[str, Any] = {"result": summary.mean}
+    for name in stats:
+        if name == "variance":
+            response["variance"] = summary.variance
+        elif name == "min":
+            response["min"] = summary.minimum
+        elif name == "max":
+            response["max"] = summary.maximum
+    if quantiles:
+        response["quantiles"] = summary.quantiles(quantiles)
+    return response
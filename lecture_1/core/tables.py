@@ -0,0 +1,98 @@
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+
+@dataclass(slots=True)
+class PackedInts:
+    """Неотрицательные int, упакованные в один буфер.
+
+    Байты всех чисел (little-endian) лежат подряд в `buffer`, границы - в
+    `offsets`. Так нет накладных расходов на отдельный объект int и запись
+    в словаре на каждое значение, а чтение - срез и `int.from_bytes`.
+    """
+
+    buffer: bytearray = field(default_factory=bytearray)
+    offsets: array = field(default_factory=lambda: array("Q", [0]))
+
+    @classmethod
+    def pack(cls, values: Iterable[int]) -> "PackedInts":
+        packed = cls()
+        for value in values:
+            packed.buffer += value.to_bytes((value.bit_length() + 7) // 8, "little")
+            packed.offsets.append(len(packed.buffer))
+        return packed
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError("packed int index out of range")
+        return int.from_bytes(self.buffer[self.offsets[index] : self.offsets[index + 1]], "little")
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+
+def factorials(n: int) -> Iterable[int]:
+    value = 1
+    yield value
+    for k in range(1, n + 1):
+        value *= k
+        yield value
+
+
+def fibonaccis(n: int) -> Iterable[int]:
+    a, b = 0, 1
+    for _ in range(n + 1):
+        yield a
+        a, b = b, a + b
+
+
+@dataclass(slots=True)
+class MathTables:
+    """Таблицы 0!..factorial_n! и F(0)..F(fibonacci_n), строятся на старте.
+
+    До вызова `build` (или для n за пределами таблиц) поиск возвращает None,
+    и вызывающий код считает значение как обычно.
+    """
+
+    factorial_n: int
+    fibonacci_n: int
+    _factorials: PackedInts | None = field(init=False, default=None)
+    _fibonaccis: PackedInts | None = field(init=False, default=None)
+
+    def build(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        self._factorials = PackedInts.pack(factorials(self.factorial_n))
+        self._fibonaccis = PackedInts.pack(fibonaccis(self.fibonacci_n))
+        return {
+            "factorial_n": self.factorial_n,
+            "fibonacci_n": self.fibonacci_n,
+            "factorial_bytes": self._factorials.nbytes,
+            "fibonacci_bytes": self._fibonaccis.nbytes,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def factorial(self, n: int) -> int | None:
+        if self._factorials is None or not 0 <= n < len(self._factorials):
+            return None
+        return self._factorials[n]
+
+    def fibonacci(self, n: int) -> int | None:
+        if self._fibonaccis is None or not 0 <= n < len(self._fibonaccis):
+            return None
+        return self._fibonaccis[n]
+
+
+def format_report(report: dict[str, Any]) -> str:
+    return (
+        f"math tables: factorial n<={report['factorial_n']} "
+        f"({report['factorial_bytes'] / 2**20:.1f} MiB), "
+        f"fibonacci n<={report['fibonacci_n']} "
+        f"({report['fibonacci_bytes'] / 2**20:.1f} MiB), "
+        f"built in {report['seconds']:.3f} s"
+    )
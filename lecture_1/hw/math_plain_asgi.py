@@ -1,108 +1,334 @@
 import json
+import logging
 import math
+import os
 from http import HTTPStatus
-from typing import Any, Callable, Awaitable
+from typing import Any, Callable
 
-async def app(
-    scope: dict[str, Any],
-    receive: Callable[[], Awaitable[dict[str, Any]]],
-    send: Callable[[dict[str, Any]], Awaitable[None]],
+from lecture_1.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    ClientDisconnected,
+    cancel_on_disconnect,
+)
+from lecture_1.core.batch import parse_operations, run_batch
+from lecture_1.core.bigint import FORMATS, compute_formatted, format_int
+from lecture_1.core.cost import batch_cost, factorial_cost, fibonacci_cost, format_cost, mean_cost
+from lecture_1.core.fibonacci import fibonacci
+from lecture_1.core.json_stream import FloatArrayReader
+from lecture_1.core.offload import OffloadExecutor, threshold_from_env
+from lecture_1.core.stats import Float64Reader, Summary, parse_stats_options, summary_response
+from lecture_1.core.tables import MathTables, format_report
+from lecture_1.hw.routing import Receive, Router, Scope, Send, parse_query
+
+# Запросы дороже порога (в мкс) считаются в пуле процессов, остальные - inline.
+# Пул создается на lifespan.startup и закрывается на lifespan.shutdown
+executor = OffloadExecutor(threshold=threshold_from_env("MATH_OFFLOAD_THRESHOLD_US", 2_000))
+
+# Таблицы факториалов и чисел Фибоначчи до заданного n строятся на
+# lifespan.startup, запросы в их пределах - просто чтение из буфера
+tables = MathTables(
+    factorial_n=int(os.environ.get("MATH_TABLE_FACTORIAL_N", 2_000)),
+    fibonacci_n=int(os.environ.get("MATH_TABLE_FIBONACCI_N", 10_000)),
+)
+
+# Очередь перед вычислениями: дешевле порога offload'а проходят сразу, дорогие
+# ограничены по параллелизму и суммарной оценке стоимости (мкс)
+admission = AdmissionController(
+    max_concurrency=int(os.environ.get("MATH_MAX_CONCURRENCY", os.cpu_count() or 1)),
+    max_request_cost=threshold_from_env("MATH_MAX_REQUEST_COST_US", 60e6),
+    max_pending_cost=threshold_from_env("MATH_MAX_PENDING_COST_US", 240e6),
+    free_cost=executor.threshold,
+)
+
+# логгер uvicorn, чтобы отчет о старте был виден в выводе сервера
+logger = logging.getLogger("uvicorn.error")
+
+router = Router()
+
+
+# Вспомогательная функция для отправки JSON ответа
+async def send_json_response(
+    send: Send,
+    status: int,
+    body: dict[str, Any],
+    headers: list[tuple[bytes, bytes]] | None = None,
 ) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *(headers or ())]
+    })
+    await send({
+        "type": "http.response.body",
+        "body": json.dumps(body).encode("utf-8")
+    })
+
+
+# Десятичные цифры большого результата отдаются кусками такого размера
+DIGITS_CHUNK = 1 << 16
+
+
+async def send_int_response(send: Send, result: str | bytes, output_format: str) -> None:
+    """Ответ с целым результатом, уже переведенным `format_int`.
+
+    decimal - JSON, большие числа стримятся чанками с more_body, hex - JSON со
+    строкой "0x...", binary - сырые big-endian байты без перевода в десятичный вид.
+    """
+    if output_format == "hex":
+        await send_json_response(send, HTTPStatus.OK, {"result": result})
+        return
+
+    if output_format == "binary":
+        await send({
+            "type": "http.response.start",
+            "status": HTTPStatus.OK,
+            "headers": [(b"content-type", b"application/octet-stream")]
+        })
+        await send({"type": "http.response.body", "body": result})
+        return
+
+    if len(result) <= DIGITS_CHUNK:
+        await send({
+            "type": "http.response.start",
+            "status": HTTPStatus.OK,
+            "headers": [(b"content-type", b"application/json")]
+        })
+        await send({"type": "http.response.body", "body": b'{"result": %s}' % result.encode("ascii")})
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": HTTPStatus.OK,
+        "headers": [(b"content-type", b"application/json")]
+    })
+    await send({"type": "http.response.body", "body": b'{"result": ', "more_body": True})
+    for start in range(0, len(result), DIGITS_CHUNK):
+        chunk = result[start : start + DIGITS_CHUNK].encode("ascii")
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b"}"})
+
+
+async def send_rejection(send: Send, rejection: AdmissionRejected) -> None:
+    headers = []
+    if rejection.retry_after is not None:
+        headers.append((b"retry-after", str(rejection.retry_after).encode()))
+    await send_json_response(send, rejection.status, {"detail": rejection.detail}, headers)
+
+
+async def compute(cost: float, func: Callable[..., Any], *args: Any) -> Any:
+    async with admission.admit(cost):
+        return await executor.run(cost, func, *args)
+
+
+def parse_int(value: str | None) -> int | None:
+    # isascii отсекает юникодные цифры вроде "²", которые isdigit пропускает
+    if value is None or not value.isascii() or not value.lstrip("-").isdigit():
+        return None
+    return int(value)
+
+
+# Обработка /factorial? n=...
+@router.route("GET", "/factorial")
+async def factorial_handler(scope: Scope, receive: Receive, send: Send, _: str | None) -> None:
+    query = parse_query(scope.get("query_string", b""))
+    n = parse_int(query.get("n"))
+
+    # Проверяем наличие параметра и его валидность
+    if n is None:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Parameter 'n' is required and must be a valid integer."})
+        return
+
+    output_format = query.get("format", "decimal")
+    if output_format not in FORMATS:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": f"Parameter 'format' must be one of {FORMATS}."})
+        return
+
+    # Проверяем, что n не отрицательный
+    if n < 0:
+        await send_json_response(send, HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for 'n', must be non-negative."})
+        return
+
+    # Вычисляем факториал; перевод в формат ответа - там же, где вычисление
+    value = tables.factorial(n)
+    if value is None:
+        work = compute(factorial_cost(n), compute_formatted, math.factorial, n, output_format)
+    else:
+        work = compute(format_cost(value.bit_length(), output_format), format_int, value, output_format)
+    try:
+        result = await cancel_on_disconnect(receive, work)
+    except AdmissionRejected as rejection:
+        await send_rejection(send, rejection)
+        return
+    except ClientDisconnected:
+        return
+    await send_int_response(send, result, output_format)
+
+
+# Обработка /fibonacci/{n}
+@router.route("GET", "/fibonacci/{n}")
+async def fibonacci_handler(scope: Scope, receive: Receive, send: Send, param: str | None) -> None:
+    n = parse_int(param)
+    if n is None:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Path parameter 'n' must be a valid integer."})
+        return
+
+    output_format = parse_query(scope.get("query_string", b"")).get("format", "decimal")
+    if output_format not in FORMATS:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": f"Parameter 'format' must be one of {FORMATS}."})
+        return
+
+    if n < 0:
+        await send_json_response(send, HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for 'n', must be non-negative."})
+        return
+
+    # Вычисляем число Фибоначчи (API исторически отдает F(n + 1))
+    value = tables.fibonacci(n + 1)
+    if value is None:
+        work = compute(fibonacci_cost(n), compute_formatted, fibonacci, n + 1, output_format)
+    else:
+        work = compute(format_cost(value.bit_length(), output_format), format_int, value, output_format)
+    try:
+        result = await cancel_on_disconnect(receive, work)
+    except AdmissionRejected as rejection:
+        await send_rejection(send, rejection)
+        return
+    except ClientDisconnected:
+        return
+    await send_int_response(send, result, output_format)
+
+
+def header(scope: Scope, name: bytes) -> bytes | None:
+    for key, value in scope.get("headers", ()):
+        if key.lower() == name:
+            return value
+    return None
+
+
+def content_length(scope: Scope) -> int:
+    # без Content-Length (chunked) размер заранее неизвестен: 0, а стоимость
+    # набирается по мере чтения тела (см. Reservation.raise_to)
+    value = header(scope, b"content-length")
+    return int(value) if value and value.isdigit() else 0
+
+
+# Обработка /mean: тело читается чанками, массив целиком в память не попадает.
+# Кроме JSON принимается application/octet-stream - сырые little-endian float64
+@router.route("GET", "/mean")
+async def mean_handler(scope: Scope, receive: Receive, send: Send, _: str | None) -> None:
+    query = parse_query(scope.get("query_string", b""))
+    try:
+        stats, quantiles = parse_stats_options(query.get("stats"), query.get("quantiles"))
+    except ValueError as exc:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": str(exc)})
+        return
+
+    content_type = header(scope, b"content-type") or b""
+    if content_type.split(b";")[0].strip() == b"application/octet-stream":
+        reader = Float64Reader(Summary.for_request(stats, quantiles))
+    else:
+        reader = FloatArrayReader(Summary.for_request(stats, quantiles))
+
+    try:
+        async with admission.reserve() as reservation:
+            # заявленный размер отклоняет запрос сразу, фактический - доначисляется
+            reservation.raise_to(mean_cost(content_length(scope)))
+            received = 0
+            more_body = True
+            while more_body:
+                request = await receive()
+                if request["type"] == "http.disconnect":
+                    return
+                body = request.get("body", b"")
+                received += len(body)
+                reservation.raise_to(mean_cost(received))
+                # слот - только на разбор чанка, ожидание тела его не держит
+                async with reservation.slot():
+                    reader.feed(body)
+                more_body = request.get("more_body", False)
+            accumulator = reader.close()
+    except AdmissionRejected as rejection:
+        await send_rejection(send, rejection)
+        return
+    except ValueError:
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Request body must be a non-empty array of floats."})
+        return
+    except OverflowError:
+        # конечные значения, сумма которых не помещается в float64
+        await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Sum of values overflows float64."})
+        return
+
+    if accumulator.count == 0:
+        await send_json_response(send, HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for body, must be a non-empty array of floats."})
+        return
+
+    # Вычисляем среднее арифметическое и запрошенные статистики
+    await send_json_response(send, HTTPStatus.OK, summary_response(accumulator, stats, quantiles))
+
+
+# Обработка /batch: список операций, результаты в том же порядке
+@router.route("POST", "/batch")
+async def batch_handler(scope: Scope, receive: Receive, send: Send, _: str | None) -> None:
+    try:
+        async with admission.reserve() as reservation:
+            reservation.raise_to(batch_cost(content_length(scope)))
+            chunks = []
+            received = 0
+            more_body = True
+            while more_body:
+                request = await receive()
+                if request["type"] == "http.disconnect":
+                    return
+                chunks.append(request.get("body", b""))
+                received += len(chunks[-1])
+                reservation.raise_to(batch_cost(received))
+                more_body = request.get("more_body", False)
+
+            try:
+                operations = parse_operations(json.loads(b"".join(chunks)))
+            except ValueError as exc:
+                await send_json_response(send, HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": str(exc)})
+                return
+
+            async with reservation.slot():
+                results = await executor.run(reservation.cost, run_batch, operations)
+    except AdmissionRejected as rejection:
+        await send_rejection(send, rejection)
+        return
+
+    await send_json_response(send, HTTPStatus.OK, {"results": results})
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
     # Обрабатываем событие жизненного цикла ASGI (startup/shutdown)
     if scope["type"] == "lifespan":
         while True:
             message = await receive()
             if message["type"] == "lifespan.startup":
+                logger.info(format_report(tables.build()))
+                executor.start()
                 await send({"type": "lifespan.startup.complete"})
             elif message["type"] == "lifespan.shutdown":
+                await executor.shutdown()
                 await send({"type": "lifespan.shutdown.complete"})
                 return
 
     # Обработка HTTP запросов
     assert scope["type"] == "http"
-    method = scope["method"]
-    path = scope["path"]
-
-    # Вспомогательная функция для отправки JSON ответа
-    async def send_json_response(status: int, body: dict):
-        await send({
-            "type": "http.response.start",
-            "status": status,
-            "headers": [(b"content-type", b"application/json")]
-        })
-        await send({
-            "type": "http.response.body",
-            "body": json.dumps(body).encode("utf-8")
-        })
 
-    # Обработка /factorial? n=...
-    if path == "/factorial" and method == "GET":
-        query_string = scope.get("query_string", b"").decode("utf-8")
-        query_params = dict(param.split("=") for param in query_string.split("&") if "=" in param)
-        n = query_params.get("n")
-
-        # Проверяем наличие параметра и его валидность
-        if n is None or not n.lstrip("-").isdigit():
-            await send_json_response(HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Parameter 'n' is required and must be a valid integer."})
-            return
-        
-        n = int(n)
-        
-        # Проверяем, что n не отрицательный
-        if n < 0:
-            await send_json_response(HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for 'n', must be non-negative."})
-            return
-        
-        # Вычисляем факториал
-        result = math.factorial(n)
-        await send_json_response(HTTPStatus.OK, {"result": result})
-
-    # Обработка /fibonacci/{n}
-    elif path.startswith("/fibonacci/") and method == "GET":
-        try:
-            n = int(path.split("/")[2])
-        except (IndexError, ValueError):
-            await send_json_response(HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Path parameter 'n' must be a valid integer."})
-            return
-
-        if n < 0:
-            await send_json_response(HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for 'n', must be non-negative."})
-            return
-
-        # Вычисляем последовательность Фибоначчи
-        a, b = 0, 1
-        for _ in range(n):
-            a, b = b, a + b
-        
-        await send_json_response(HTTPStatus.OK, {"result": b})
-
-    # Обработка /mean
-    elif path == "/mean" and method == "GET":
-        request = await receive()
-        try:
-            body = json.loads(request.get("body", b"").decode("utf-8"))
-            if not isinstance(body, list) or not all(isinstance(i, (float, int)) for i in body):
-                raise ValueError
-        except ValueError:
-            await send_json_response(HTTPStatus.UNPROCESSABLE_ENTITY, {"detail": "Request body must be a non-empty array of floats."})
-            return
-
-        if len(body) == 0:
-            await send_json_response(HTTPStatus.BAD_REQUEST, {"detail": "Invalid value for body, must be a non-empty array of floats."})
-            return
-
-        # Вычисляем среднее арифметическое
-        result = sum(body) / len(body)
-        await send_json_response(HTTPStatus.OK, {"result": result})
+    matched = router.routes[scope["path"]].get(scope["method"])
+    if matched is not None:
+        handler, param = matched
+        await handler(scope, receive, send, param)
+        return
 
     # Возвращаем 404 для неподдерживаемых путей
-    else:
-        await send({
-            "type": "http.response.start",
-            "status": HTTPStatus.NOT_FOUND,
-            "headers": [(b"content-type", b"text/plain")]
-        })
-        await send({
-            "type": "http.response.body",
-            "body": b"404 Not Found"
-        })
+    await send({
+        "type": "http.response.start",
+        "status": HTTPStatus.NOT_FOUND,
+        "headers": [(b"content-type", b"text/plain")]
+    })
+    await send({
+        "type": "http.response.body",
+        "body": b"404 Not Found"
+    })
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+from urllib.parse import unquote
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Обработчик получает path-параметр ({n} из шаблона) или None для точных путей
+Handler = Callable[[Scope, Receive, Send, str | None], Awaitable[None]]
+
+
+# Сколько разрешенных путей с параметром (и неизвестных путей) помнит Router
+RESOLVED_LIMIT = 4096
+
+Methods = dict[str, tuple[Handler, str | None]]
+
+
+class RouteCache(dict[str, Methods]):
+    """path -> method -> (handler, param): точные пути и уже разрешенные.
+
+    Попадание - обычный `dict.__getitem__` без вызова Python-кода; путь,
+    которого в кэше нет, разрешается по словарю префиксов в `__missing__`
+    (как в `defaultdict`) и запоминается, в том числе если он не найден.
+    Кэш ограничен RESOLVED_LIMIT путей.
+    """
+
+    def __init__(self, exact: dict[str, Methods], prefixed: dict[str, dict[str, Handler]]) -> None:
+        super().__init__(exact)
+        self._exact = exact
+        self._prefixed = prefixed
+
+    def __missing__(self, path: str) -> Methods:
+        slash = path.rfind("/") + 1
+        param = path[slash:]
+        handlers = self._prefixed.get(path[:slash], {})
+        methods = {method: (handler, param) for method, handler in handlers.items()}
+        if len(self) >= RESOLVED_LIMIT:
+            # произвольные пути не должны раздувать кэш: проще начать заново
+            self.clear()
+            self.update(self._exact)
+        self[path] = methods
+        return methods
+
+
+@dataclass(slots=True)
+class Router:
+    """Таблица маршрутов, собирается один раз при импорте.
+
+    Точные пути хранятся как path -> method -> (handler, None), где
+    результат матчинга - готовый кортеж, который не создается на каждый
+    запрос. Пути с параметром поддерживаются только в виде `/prefix/{name}`,
+    где параметр - последний сегмент: ищутся по словарю префиксов (путь до
+    последнего `/` включительно). Горячий путь - `router.routes[path]`,
+    см. RouteCache.
+    """
+
+    _exact: dict[str, Methods] = field(default_factory=dict)
+    _prefixed: dict[str, dict[str, Handler]] = field(default_factory=dict)
+    routes: RouteCache = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.routes = RouteCache(self._exact, self._prefixed)
+
+    def add(self, method: str, path: str, handler: Handler) -> None:
+        brace = path.find("{")
+        if brace == -1:
+            self._exact.setdefault(path, {})[method] = (handler, None)
+        elif not path.endswith("}") or path[brace - 1] != "/" or "/" in path[brace:]:
+            raise ValueError(f"unsupported route template: {path}")
+        else:
+            self._prefixed.setdefault(path[:brace], {})[method] = handler
+        # уже разрешенные пути могли измениться
+        self.routes = RouteCache(self._exact, self._prefixed)
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            self.add(method, path, handler)
+            return handler
+
+        return decorator
+
+    def match(self, method: str, path: str) -> tuple[Handler, str | None] | None:
+        return self.routes[path].get(method)
+
+
+class QueryParams:
+    """Параметры query string с `%XX`; значения декодируются при чтении.
+
+    Обработчику нужны один-два параметра, а `unquote` дорогой, так что
+    остальные значения не декодируются вовсе. Ключи декодируются сразу -
+    по ним идет поиск.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw: dict[str, str]) -> None:
+        self._raw = raw
+
+    def __getitem__(self, key: str) -> str:
+        value = self._raw[key]
+        return unquote(value) if "%" in value else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._raw.get(key)
+        if value is None:
+            return default
+        return unquote(value) if "%" in value else value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def items(self) -> Iterator[tuple[str, str]]:
+        return ((key, self[key]) for key in self._raw)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, QueryParams):
+            other = dict(other.items())
+        return dict(self.items()) == other
+
+    def __repr__(self) -> str:
+        return f"QueryParams({dict(self.items())!r})"
+
+
+def parse_query(query_string: bytes) -> dict[str, str] | QueryParams:
+    """Разбор query string за один проход.
+
+    Значение может содержать `=`, пары без `=` дают пустую строку, при
+    повторе ключа побеждает последнее значение. `+` заменяется пробелом
+    сразу во всей строке (на `&` и `=` это не влияет). Если `%` нет (обычный
+    запрос вроде `n=10`), декодировать нечего и результат - простой dict;
+    иначе значения декодирует `QueryParams` по запросу.
+    """
+    params: dict[str, str] = {}
+    if not query_string:
+        return params
+
+    text = query_string.decode("latin-1")
+    if "+" in text:
+        text = text.replace("+", " ")
+    if "%" not in text:
+        for pair in text.split("&"):
+            if pair:
+                key, _, value = pair.partition("=")
+                params[key] = value
+        return params
+
+    for pair in text.split("&"):
+        if pair:
+            key, _, value = pair.partition("=")
+            if "%" in key:
+                key = unquote(key)
+            params[key] = value
+    return QueryParams(params)
@@ -1,11 +1,44 @@
+import logging
 import math
+import os
+from contextlib import asynccontextmanager
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Any
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from pydantic import FiniteFloat, TypeAdapter, ValidationError
 
-app = FastAPI()
+from lecture_1.core.batch import parse_operations, run_batch
+from lecture_1.core.fibonacci import fibonacci
+from lecture_1.core.stats import (
+    Summary,
+    float64_view,
+    parse_stats_options,
+    summary_response,
+)
+from lecture_1.core.tables import MathTables, format_report
+
+logger = logging.getLogger("uvicorn.error")
+
+# заполняются в lifespan, до этого все считается как обычно
+tables = MathTables(
+    factorial_n=int(os.environ.get("MATH_TABLE_FACTORIAL_N", 2_000)),
+    fibonacci_n=int(os.environ.get("MATH_TABLE_FIBONACCI_N", 10_000)),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(format_report(tables.build()))
+
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+_float_list = TypeAdapter(list[FiniteFloat])
 
 
 @app.get("/factorial")
@@ -16,7 +49,9 @@ def get_factorial(n: Annotated[int, Query()]) -> JSONResponse:
             detail="Invalid value for n, must be non-negative",
         )
 
-    result = math.factorial(n)
+    result = tables.factorial(n)
+    if result is None:
+        result = math.factorial(n)
 
     return JSONResponse({"result": result})
 
@@ -29,21 +64,80 @@ def get_fibonacci(n: int) -> JSONResponse:
             detail="Invalid value for n, must be non-negative",
         )
 
-    a, b = 0, 1
-    for _ in range(n):
-        a, b = b, a + b
+    # как и в исходной реализации, отдаем F(n + 1)
+    result = tables.fibonacci(n + 1)
+    if result is None:
+        result = fibonacci(n + 1)
 
-    return JSONResponse({"result": b})
+    return JSONResponse({"result": result})
 
 
 @app.get("/mean")
-def get_mean(data: list[float]) -> JSONResponse:
+async def get_mean(
+    request: Request,
+    stats: Annotated[str | None, Query()] = None,
+    quantiles: Annotated[str | None, Query()] = None,
+) -> JSONResponse:
+    """Среднее JSON-массива или application/octet-stream из little-endian float64.
+
+    Бинарное тело читается без копирования через memoryview, все редукции
+    выполняются на C. `stats=variance,min,max` и `quantiles=0.5,0.9`
+    добавляют статистики к ответу.
+    """
+    try:
+        stats_names, qs = parse_stats_options(stats, quantiles)
+    except ValueError as exc:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    body = await request.body()
+    binary = request.headers.get("content-type", "").startswith("application/octet-stream")
+    # разбор и редукции - на C, но для больших тел это миллисекунды:
+    # считаем в пуле потоков, чтобы не останавливать event loop
+    summary = await run_in_threadpool(summarize, body, binary, stats_names, qs)
+    return JSONResponse(summary_response(summary, stats_names, qs))
+
+
+def summarize(body: bytes, binary: bool, stats_names: list[str], qs: list[float]) -> Summary:
+    try:
+        data = float64_view(body) if binary else _float_list.validate_json(body)
+    except (ValueError, ValidationError):
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail="Invalid value for body, must be array of floats",
+        )
+
     if len(data) == 0:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Invalid value for body, must be non-empty array of floats",
         )
 
-    result = sum(data) / len(data)
+    summary = Summary.for_request(stats_names, qs)
+    try:
+        summary.update(data)
+    except ValueError:
+        # inf и nan в бинарном теле
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail="Invalid value for body, must be array of finite floats",
+        )
+    except OverflowError:
+        # конечные значения, сумма которых не помещается в float64
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail="Sum of values overflows float64",
+        )
+    return summary
+
 
-    return JSONResponse({"result": result})
+@app.post("/batch")
+def post_batch(payload: Annotated[Any, Body()]) -> JSONResponse:
+    try:
+        operations = parse_operations(payload)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=str(exc),
+        )
+
+    return JSONResponse({"results": run_batch(operations)})
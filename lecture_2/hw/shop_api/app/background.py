@@ -0,0 +1,34 @@
+import asyncio
+import logging
+from typing import Callable
+
+from lecture_2.hw.shop_api.app.storages import Storages
+from lecture_2.hw.shop_api.app.storages.cart_storage import EXPIRE_BATCH
+from lecture_2.hw.shop_api.app.storages.item_storage import COMPACT_BATCH
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def drain_periodically(storages: Storages, step: Callable[[], int], batch: int, interval: float, what: str) -> None:
+    """Раз в `interval` секунд вызывает `step`, пока он возвращает полную пачку.
+
+    Между пачками event loop обслуживает запросы - in-memory хранилища
+    вызываются прямо в нем.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            while await storages.run(step) == batch:
+                await asyncio.sleep(0)
+        except Exception:
+            logger.exception("%s failed", what)
+
+
+async def compact_periodically(storages: Storages, interval: float) -> None:
+    """Раз в `interval` секунд убирает надгробия товаров пачками по COMPACT_BATCH"""
+    await drain_periodically(storages, storages.compact, COMPACT_BATCH, interval, "Item compaction")
+
+
+async def expire_periodically(storages: Storages, interval: float = 1.0) -> None:
+    """Раз в `interval` секунд удаляет просроченные корзины пачками по EXPIRE_BATCH"""
+    await drain_periodically(storages, storages.expire, EXPIRE_BATCH, interval, "Cart expiry")
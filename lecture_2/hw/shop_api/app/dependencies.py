@@ -0,0 +1,12 @@
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from lecture_2.hw.shop_api.app.storages import Storages
+
+
+def storages(request: Request) -> Storages:
+    return request.app.state.storages
+
+
+StoragesDep = Annotated[Storages, Depends(storages)]
@@ -48,6 +48,22 @@ class ItemUpdateRequest(BaseModel):
         return item
 
 
+class ItemBatchEntry(BaseModel):
+    """Элемент POST /item/batch: без id - создание, с id - замена"""
+    id: Optional[int] = None
+    name: str
+    price: float
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class ItemBatchResult(BaseModel):
+    """Результат элемента пачки: статус как у одиночного запроса"""
+    status: int
+    item: Optional[ItemResponse] = None
+    detail: Optional[str] = None
+
+
 class CartItemResponse(BaseModel):
     id: int
     name: str
@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+import math
+from typing import Any
+
+# Заголовок ответа со ссылкой на следующую страницу (тело списка не меняется)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# id в курсоре - неотрицательное целое, которое влезает в SQLite INTEGER
+MAX_ID = 2**63 - 1
+
+
+def _id_part(part: Any) -> int:
+    if not isinstance(part, int) or isinstance(part, bool) or not 0 <= part <= MAX_ID:
+        raise ValueError("invalid cursor")
+    return part
+
+
+def _number_part(part: Any) -> float:
+    if not isinstance(part, (int, float)) or isinstance(part, bool):
+        raise ValueError("invalid cursor")
+    try:
+        value = float(part)
+    except OverflowError:
+        raise ValueError("invalid cursor") from None
+    if not math.isfinite(value):
+        raise ValueError("invalid cursor")
+    return value
+
+
+# Ключ сортировки: (id,) или (цена, id) - id разрывает равенство цен.
+# Дробной может быть только цена, id - только целым
+KEY_PARTS = {"id": (_id_part,), "price": (_number_part, _id_part)}
+
+
+def encode_cursor(order_by: str, key: tuple[Any, ...]) -> str:
+    """Непрозрачный курсор: порядок сортировки и ключ последней записи страницы"""
+    raw = json.dumps([order_by, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, order_by: str) -> tuple[Any, ...]:
+    """Ключ из курсора; ValueError, если курсор битый или от другого порядка"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError("invalid cursor") from None
+
+    if not isinstance(decoded, list) or not decoded or decoded[0] != order_by:
+        raise ValueError("cursor does not match order_by")
+    parts = KEY_PARTS.get(order_by, ())
+    if len(decoded) - 1 != len(parts):
+        raise ValueError("invalid cursor")
+    return tuple(parse(part) for parse, part in zip(parts, decoded[1:]))
@@ -1,19 +1,42 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Response
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Body, Header, HTTPException, Response
 from http import HTTPStatus
-from pydantic import NonNegativeInt, PositiveInt, condecimal
+from pydantic import NonNegativeInt, PositiveInt, condecimal, conint
 from fastapi.responses import JSONResponse
 from lecture_2.hw.shop_api.app.models import Cart, CartResponse, Item
-from lecture_2.hw.shop_api.app.storages import carts_storage, items_storage
+from lecture_2.hw.shop_api.app.serialization import JSONBytesResponse, encode_cart, encode_carts
+from lecture_2.hw.shop_api.app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartVersionConflict
+from lecture_2.hw.shop_api.app.dependencies import StoragesDep
 
 router = APIRouter(prefix="/cart")
 
 # Ограничения на положительное значение для цен
 PositiveDecimal = condecimal(gt=0)  # Гарантирует, что цена будет больше нуля
 
+# Количество товара в строке корзины: с запасом влезает в SQLite INTEGER и
+# int64 shared memory даже после многих добавлений
+MAX_QUANTITY = 2**31 - 1
+Quantity = conint(gt=0, le=MAX_QUANTITY)
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Версия из If-Match; None - без условия ("*" или заголовка нет).
+
+    Непонятное значение не совпадет ни с одной версией: -1 даст 412.
+    """
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip().removeprefix("W/").strip('"')
+    return int(tag) if tag.isascii() and tag.isdigit() else -1
+
 @router.post("/", responses={HTTPStatus.CREATED: {"description": "Successfully created cart"}})
-async def create_cart() -> JSONResponse:
-    cart_id = carts_storage.create_cart()
+async def create_cart(storages: StoragesDep) -> JSONResponse:
+    cart_id = await storages.run(storages.carts.create_cart)
     location = f"/cart/{cart_id}"
     return JSONResponse(
         content={"id": cart_id},
@@ -22,21 +45,24 @@ async def create_cart() -> JSONResponse:
     )
 
 @router.get("/{cart_id}", response_model=CartResponse)
-async def get_cart(cart_id: int) -> CartResponse:
-    cart = carts_storage.get_cart(cart_id)
+async def get_cart(cart_id: int, storages: StoragesDep) -> Response:
+    cart = await storages.run(storages.carts.get_cart, cart_id)
     if not cart:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cart not found")
-    return CartResponse.from_cart(cart)
+    # готовый JSON из dataclass'а, response_model - только для схемы OpenAPI
+    return JSONBytesResponse(encode_cart(cart), headers={"ETag": etag(cart.version)})
 
 @router.get("/", response_model=List[CartResponse])
 async def list_carts(
+    storages: StoragesDep,
     offset: NonNegativeInt = 0,
     limit: PositiveInt = 10,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_quantity: Optional[NonNegativeInt] = None,
-    max_quantity: Optional[NonNegativeInt] = None
-) -> List[CartResponse]:
+    max_quantity: Optional[NonNegativeInt] = None,
+    cursor: Optional[str] = None
+) -> Response:
     # Проверка на ненегативные значения для цен и количеств
     if min_price is not None and min_price < 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="min_price must be non-negative")
@@ -50,20 +76,97 @@ async def list_carts(
     if max_quantity is not None and max_quantity < 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="max_quantity must be non-negative")
 
-    carts = carts_storage.paginate_filtered(
-        offset, limit, min_price, max_price, min_quantity, max_quantity
+    after = None
+    if cursor is not None:
+        try:
+            (after,) = decode_cursor(cursor, "id")
+        except ValueError as exc:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    carts = await storages.run(
+        storages.carts.paginate_filtered, offset, limit, min_price, max_price, min_quantity, max_quantity, after
     )
-    return [CartResponse.from_cart(cart) for cart in carts]
+    response = JSONBytesResponse(encode_carts(carts))
+    if len(carts) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("id", (carts[-1].id,))
+    return response
 
-@router.post("/{cart_id}/add/{item_id}", responses={HTTPStatus.OK: {"description": "Item added"}})
-async def add_item_to_cart(cart_id: int, item_id: int):
-    cart = carts_storage.get_cart(cart_id)
-    item = items_storage.get_item(item_id)
+@router.post(
+    "/{cart_id}/add/{item_id}",
+    responses={
+        HTTPStatus.OK: {"description": "Item added"},
+        HTTPStatus.PRECONDITION_FAILED: {"description": "Cart changed since the version in If-Match"},
+    },
+)
+async def add_item_to_cart(
+    cart_id: int,
+    item_id: int,
+    storages: StoragesDep,
+    if_match: Annotated[Optional[str], Header()] = None,
+):
+    cart = await storages.run(storages.carts.get_cart, cart_id)
+    item = await storages.run(storages.items.get_item, item_id)
 
     if not cart:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cart not found")
     if not item or item.deleted:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item not found")
+    line = cart.items.get(item_id)
+    if line is not None and line.quantity >= MAX_QUANTITY:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=f"Quantity must be at most {MAX_QUANTITY}"
+        )
 
-    carts_storage.add_item_to_cart(cart_id, item)
+    # версия сверяется в хранилище атомарно с изменением, а не здесь по
+    # прочитанной выше корзине, которая могла уже устареть
+    try:
+        await storages.run(storages.carts.add_item_to_cart, cart_id, item, parse_if_match(if_match))
+    except CartVersionConflict as conflict:
+        raise HTTPException(
+            status_code=HTTPStatus.PRECONDITION_FAILED,
+            detail=str(conflict),
+            headers={"ETag": etag(conflict.version)},
+        )
     return Response(status_code=HTTPStatus.OK)
+
+
+@router.post(
+    "/{cart_id}/add",
+    response_model=CartResponse,
+    responses={HTTPStatus.PRECONDITION_FAILED: {"description": "Cart changed since the version in If-Match"}},
+)
+async def add_items_to_cart(
+    cart_id: int,
+    quantities: Annotated[dict[int, Quantity], Body()],
+    storages: StoragesDep,
+    if_match: Annotated[Optional[str], Header()] = None,
+) -> Response:
+    """Добавить в корзину товары по карте {item_id: количество} одним изменением.
+
+    Запрос применяется целиком или не применяется: если какого-то товара нет,
+    корзина не меняется.
+    """
+    if not quantities:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="At least one item is required")
+
+    items = await storages.run(storages.items.get_items, quantities.keys())
+    missing = [item_id for item_id in quantities if item_id not in items or items[item_id].deleted]
+    if missing:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Items not found: {missing}")
+
+    try:
+        cart = await storages.run(
+            storages.carts.add_items_to_cart,
+            cart_id,
+            [(items[item_id], quantity) for item_id, quantity in quantities.items()],
+            parse_if_match(if_match),
+        )
+    except KeyError:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Cart not found")
+    except CartVersionConflict as conflict:
+        raise HTTPException(
+            status_code=HTTPStatus.PRECONDITION_FAILED,
+            detail=str(conflict),
+            headers={"ETag": etag(conflict.version)},
+        )
+    return JSONBytesResponse(encode_cart(cart), headers={"ETag": etag(cart.version)})
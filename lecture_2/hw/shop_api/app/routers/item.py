@@ -1,42 +1,91 @@
-from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi import APIRouter, Body, HTTPException, Query, Response
 from http import HTTPStatus
 from pydantic import NonNegativeInt, PositiveInt, condecimal
 from fastapi.responses import JSONResponse
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional
 
 
-from lecture_2.hw.shop_api.app.models import ItemResponse, ItemRequest, ItemUpdateRequest
-from lecture_2.hw.shop_api.app.storages import items_storage
+from lecture_2.hw.shop_api.app.models import (
+    ItemBatchEntry,
+    ItemBatchResult,
+    ItemRequest,
+    ItemResponse,
+    ItemUpdateRequest,
+)
+from lecture_2.hw.shop_api.app.serialization import JSONBytesResponse, encode_item, encode_items
+from lecture_2.hw.shop_api.app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from lecture_2.hw.shop_api.app.dependencies import StoragesDep
 
 router = APIRouter(prefix="/item")
 
 # Добавление ограничения на положительное значение цены
 PositiveDecimal = condecimal(gt=0)  # Гарантирует, что цена будет больше нуля
 
-@router.post("/", status_code=HTTPStatus.CREATED)
-async def add_item(item: ItemRequest) -> ItemResponse:
+# Максимум элементов в POST /item/batch
+MAX_BATCH_SIZE = 10_000
+
+@router.post("/", status_code=HTTPStatus.CREATED, response_model=ItemResponse)
+async def add_item(item: ItemRequest, storages: StoragesDep) -> Response:
     # Проверка на ненегативное значение цены
     if item.price <= 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Price must be greater than zero")
         
-    new_item = items_storage.add_new_item(item.name, item.price)
-    return ItemResponse.from_item(new_item)
+    new_item = await storages.run(storages.items.add_new_item, item.name, item.price)
+    # готовый JSON из dataclass'а, response_model - только для схемы OpenAPI
+    return JSONBytesResponse(encode_item(new_item), status_code=HTTPStatus.CREATED)
+
+@router.post("/batch", response_model=List[ItemBatchResult])
+async def add_items_batch(
+    entries: Annotated[List[ItemBatchEntry], Body(max_length=MAX_BATCH_SIZE)],
+    storages: StoragesDep,
+) -> List[ItemBatchResult]:
+    """Создание и замена многих товаров за один запрос.
+
+    Элементы применяются к хранилищу одним вызовом (для SQLite - одной
+    транзакцией); ошибка элемента не отменяет остальные, у каждого свой статус.
+    """
+    results: List[Optional[ItemBatchResult]] = [
+        None if entry.price > 0
+        else ItemBatchResult(status=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Price must be greater than zero")
+        for entry in entries
+    ]
+    valid = [index for index, result in enumerate(results) if result is None]
+    items = await storages.run(
+        storages.items.upsert_items, [(entries[i].id, entries[i].name, entries[i].price) for i in valid]
+    )
+
+    replaced = [item for index, item in zip(valid, items) if item is not None and entries[index].id is not None]
+    if replaced:
+        await storages.run(storages.carts.refresh_items, replaced)
+
+    for index, item in zip(valid, items):
+        if item is None:
+            results[index] = ItemBatchResult(status=HTTPStatus.NOT_FOUND, detail="Item not found")
+        else:
+            status = HTTPStatus.CREATED if entries[index].id is None else HTTPStatus.OK
+            results[index] = ItemBatchResult(status=status, item=ItemResponse.from_item(item))
+    return results
 
 @router.get("/{item_id}", response_model=ItemResponse)
-async def get_item(item_id: int) -> ItemResponse:
-    item = items_storage.get_item(item_id)
+async def get_item(item_id: int, storages: StoragesDep) -> Response:
+    item = await storages.run(storages.items.get_item, item_id)
     if not item or item.deleted:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item not found")
-    return ItemResponse.from_item(item)
+    return JSONBytesResponse(encode_item(item))
 
 @router.get("/", response_model=List[ItemResponse])
 async def list_items(
+    storages: StoragesDep,
     offset: NonNegativeInt = 0,
     limit: PositiveInt = 10,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
-    show_deleted: bool = False
-) -> List[ItemResponse]:
+    show_deleted: bool = False,
+    order_by: Literal["id", "price"] = "id",
+    cursor: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1),
+    name_prefix: Optional[str] = Query(None, min_length=1),
+) -> Response:
     # Проверка на ненегативные значения для фильтрации цен
     if min_price is not None and min_price < 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="min_price must be non-negative")
@@ -44,37 +93,65 @@ async def list_items(
     if max_price is not None and max_price < 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="max_price must be non-negative")
     
-    items = items_storage.paginate_items_filtered(offset, limit, min_price, max_price, show_deleted)
-    return [ItemResponse.from_item(item) for item in items]
+    # Курсор - ключ последнего товара прошлой страницы, offset считается от него
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, order_by)
+        except ValueError as exc:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    items = await storages.run(
+        storages.items.paginate_items_filtered,
+        offset,
+        limit,
+        min_price,
+        max_price,
+        show_deleted,
+        order_by,
+        after,
+        q,
+        name_prefix,
+    )
+    response = JSONBytesResponse(encode_items(items))
+    if len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(order_by, storages.items.sort_key(items[-1], order_by))
+    return response
 
 @router.put("/{item_id}", response_model=ItemResponse)
-async def replace_item(item_id: int, item: ItemRequest) -> ItemResponse:
+async def replace_item(item_id: int, item: ItemRequest, storages: StoragesDep) -> Response:
     # Проверка на ненегативное значение цены
     if item.price <= 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Price must be greater than zero")
 
     try:
-        updated_item = items_storage.replace_item(item_id, item.name, item.price)
+        updated_item = await storages.run(storages.items.replace_item, item_id, item.name, item.price)
     except ValueError:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item not found")
-    return ItemResponse.from_item(updated_item)
+    # корзины хранят копии цены, имени и доступности - обновляем те, где товар лежит
+    await storages.run(storages.carts.refresh_items, [updated_item])
+    return JSONBytesResponse(encode_item(updated_item))
 
 @router.patch("/{item_id}", response_model=ItemResponse)
-async def update_item(item_id: int, item_update: ItemUpdateRequest) -> ItemResponse:
-    item = items_storage.get_item(item_id)
+async def update_item(item_id: int, item_update: ItemUpdateRequest, storages: StoragesDep) -> Response:
+    item = await storages.run(storages.items.get_item, item_id)
     if not item or item.deleted:
         raise HTTPException(status_code=HTTPStatus.NOT_MODIFIED, detail="Item is deleted")
 
     if item_update.price is not None and item_update.price <= 0:
         raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Price must be greater than zero")
 
-    updated_item = items_storage.update_item(item_id, item_update.name, item_update.price)
-    return ItemResponse.from_item(updated_item)
+    updated_item = await storages.run(storages.items.update_item, item_id, item_update.name, item_update.price)
+    await storages.run(storages.carts.refresh_items, [updated_item])
+    return JSONBytesResponse(encode_item(updated_item))
 
 @router.delete("/{item_id}")
-async def delete_item(item_id: int) -> Response:
+async def delete_item(item_id: int, storages: StoragesDep) -> Response:
     try:
-        items_storage.delete_item(item_id)
+        await storages.run(storages.items.delete_item, item_id)
     except ValueError:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Item not found")
+    deleted_item = await storages.run(storages.items.get_item, item_id)
+    if deleted_item is not None:
+        await storages.run(storages.carts.refresh_items, [deleted_item])
     return Response(status_code=HTTPStatus.OK)
@@ -0,0 +1,58 @@
+from typing import Any, Iterable
+
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import Cart, CartItem
+from lecture_2.hw.shop_api.app.storages.item_storage import Item
+
+
+class JSONBytesResponse(Response):
+    """Ответ с уже готовым JSON: тело отдается как есть, без json.dumps"""
+
+    media_type = "application/json"
+
+
+# Dataclass'ы хранилищ переводятся в словари с полями и порядком полей
+# CartResponse / ItemResponse и кодируются `pydantic_core.to_json` (Rust) за
+# один вызов - без модели pydantic на каждую строку и без повторной проверки
+# ответа по response_model. Схема в OpenAPI по-прежнему берется из моделей.
+
+
+def item_payload(item: Item) -> dict[str, Any]:
+    return {"id": item.id, "name": item.name, "price": float(item.price), "deleted": item.deleted}
+
+
+def cart_item_payload(line: CartItem) -> dict[str, Any]:
+    return {
+        "id": line.id,
+        "name": line.name,
+        "quantity": line.quantity,
+        "is_in_stock": line.is_in_stock,
+        "price": float(line.price),
+    }
+
+
+def cart_payload(cart: Cart) -> dict[str, Any]:
+    return {
+        "id": cart.id,
+        "items": [cart_item_payload(line) for line in cart.items.values()],
+        "total_cost": float(cart.total_cost),
+        "price": float(cart.price),
+    }
+
+
+def encode_item(item: Item) -> bytes:
+    return to_json(item_payload(item))
+
+
+def encode_items(items: Iterable[Item]) -> bytes:
+    return to_json([item_payload(item) for item in items])
+
+
+def encode_cart(cart: Cart) -> bytes:
+    return to_json(cart_payload(cart))
+
+
+def encode_carts(carts: Iterable[Cart]) -> bytes:
+    return to_json([cart_payload(cart) for cart in carts])
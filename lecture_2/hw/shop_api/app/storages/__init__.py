@@ -1,4 +1,6 @@
-from .cart_storage import carts_storage
-from .item_storage import items_storage
+from .backends import BACKENDS, Storages, create_storages
+from .cart_storage import CartStorage
+from .item_storage import ItemStorage
+from .sharded_cart_storage import ShardedCartStorage
 
-__all__ = ["carts_storage", "items_storage"]
+__all__ = ["BACKENDS", "CartStorage", "ItemStorage", "ShardedCartStorage", "Storages", "create_storages"]
@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import EXPIRE_BATCH, CartStorage
+from lecture_2.hw.shop_api.app.storages.columnar_item_storage import ColumnarItemStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import COMPACT_BATCH, ItemStorage
+from lecture_2.hw.shop_api.app.storages.sharded_cart_storage import ShardedCartStorage
+from lecture_2.hw.shop_api.app.storages.shared_memory_storage import SharedMemoryCartStorage, SharedMemoryItemStorage
+from lecture_2.hw.shop_api.app.storages.sqlite_storage import SQLiteCartStorage, SQLiteDatabase, SQLiteItemStorage
+
+AnyItemStorage = Union[ItemStorage, ColumnarItemStorage, SQLiteItemStorage, SharedMemoryItemStorage]
+AnyCartStorage = Union[CartStorage, ShardedCartStorage, SQLiteCartStorage, SharedMemoryCartStorage]
+
+BACKENDS = ("memory", "columnar", "sqlite", "shared")
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class Storages:
+    """Хранилища приложения и способ вызывать их методы из async-роутеров.
+
+    In-memory хранилища отвечают за микросекунды и вызываются прямо в event
+    loop. Блокирующие (SQLite) получают `executor` и исполняются в его
+    потоках, чтобы ожидание диска не останавливало остальные запросы.
+    """
+
+    items: AnyItemStorage
+    carts: AnyCartStorage
+    executor: Optional[ThreadPoolExecutor] = None
+    # то, что нужно закрыть при остановке: база, сегменты shared memory
+    resources: tuple[Any, ...] = ()
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.executor is None:
+            return func(*args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def compact(self, limit: int = COMPACT_BATCH) -> int:
+        """Шаг уборки удаленных товаров, которых нет в корзинах; см. `ItemStorage.compact`"""
+        return self.items.compact(self.carts, limit)
+
+    def expire(self, limit: int = EXPIRE_BATCH) -> int:
+        """Шаг удаления корзин, к которым не обращались дольше ttl; см. `CartStorage.expire`"""
+        return self.carts.expire(limit)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+        for resource in self.resources:
+            resource.close()
+
+
+def create_storages(
+    backend: str = "memory",
+    sqlite_path: str = "shop.sqlite3",
+    sqlite_readers: int = 4,
+    shared_name: str = "shop_api",
+    shared_capacity: int = 100_000,
+    cart_ttl: Optional[float] = None,
+) -> Storages:
+    # ShardedCartStorage здесь не выбирается: in-memory хранилища вызываются
+    # в event loop без executor, и писатели в разные шарды все равно идут
+    # по одному. Шарды нужны при вызове из потоков на free-threaded сборке
+    if backend == "memory":
+        return Storages(items=ItemStorage(), carts=CartStorage(ttl=cart_ttl))
+    if backend == "columnar":
+        return Storages(items=ColumnarItemStorage(), carts=CartStorage(ttl=cart_ttl))
+    if backend == "sqlite":
+        database = SQLiteDatabase(sqlite_path, readers=sqlite_readers)
+        return Storages(
+            items=SQLiteItemStorage(database),
+            carts=SQLiteCartStorage(database, ttl=cart_ttl),
+            # писатель один, так что потоков больше, чем читателей + 1, не нужно
+            executor=ThreadPoolExecutor(sqlite_readers + 1, thread_name_prefix="shop-sqlite"),
+            resources=(database,),
+        )
+    if backend == "shared":
+        # все воркеры с одним shared_name работают с одними сегментами
+        items = SharedMemoryItemStorage(f"{shared_name}_items", shared_capacity)
+        carts = SharedMemoryCartStorage(f"{shared_name}_carts", shared_capacity)
+        return Storages(items=items, carts=carts, resources=(items, carts))
+    raise ValueError(f"Unknown storage backend {backend!r}, expected one of {BACKENDS}")
@@ -1,7 +1,31 @@
-from dataclasses import dataclass
-from typing import Optional
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional, Sequence
 from itertools import islice
-from lecture_2.hw.shop_api.app.storages.item_storage import Item
+from operator import itemgetter
+from lecture_2.hw.shop_api.app.storages.expiry import ExpiryQueue
+from lecture_2.hw.shop_api.app.storages.id_allocator import IdAllocator, SequentialIdAllocator
+from lecture_2.hw.shop_api.app.storages.indexes import IdIndex, SortedIndex, first_in_window
+from lecture_2.hw.shop_api.app.storages.item_storage import INDEX_SELECTIVITY, Item
+
+# Число блокировок на все корзины: корзина cart_id защищена cart_id % LOCK_STRIPES
+LOCK_STRIPES = 64
+
+# Сколько корзин удаляет один вызов `expire`
+EXPIRE_BATCH = 10_000
+
+# Сколько id списка копируется за один захват блокировки создания
+ID_CHUNK = 1024
+
+
+class CartVersionConflict(Exception):
+    """Корзина изменилась после версии, которую передал клиент"""
+
+    def __init__(self, cart_id: int, version: int):
+        super().__init__(f"Cart {cart_id} is at version {version}")
+        self.version = version
 
 @dataclass
 class CartItem:
@@ -17,40 +41,197 @@ class Cart:
     id: int
     items: dict[int, CartItem]
     price: float
+    # растет на 1 при каждом изменении корзины, отдается клиенту как ETag
+    version: int = 0
+    # сумма количеств товаров; как и price, обновляется при каждом изменении
+    quantity: int = 0
+    # время последнего обращения (часы хранилища) - для истечения по TTL;
+    # служебное, в сравнении корзин не участвует
+    accessed_at: float = field(default=0.0, compare=False)
 
     @property
     def total_cost(self) -> float:
-        return sum(item.quantity * item.price for item in self.items.values())  
+        return self.price
 
 class CartStorage:
-    def __init__(self):
+    """Корзины в словаре по id плюс индексы для списка и обратный индекс товаров.
+
+    С `ttl` корзина, к которой не обращались (создание, чтение, изменение)
+    дольше ttl секунд, удаляется вызовом `expire`. Сроки лежат в
+    `ExpiryQueue`, так что удаление стоит O(истекших), а не проход по всем
+    корзинам; обращение только обновляет `accessed_at`.
+    """
+
+    def __init__(
+        self,
+        id_allocator: Optional[IdAllocator] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         self.carts: dict[int, Cart] = {}
+        self.id_allocator = id_allocator or SequentialIdAllocator()
+        self.id_index = IdIndex()
+        # (price, id) и (quantity, id) всех корзин для фильтров списка
+        self.price_index = SortedIndex()
+        self.quantity_index = SortedIndex()
+        # индексы общие для всех корзин, поэтому у них своя блокировка
+        self._index_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._create_lock = threading.Lock()
+        # обратный индекс: id товара -> id корзин, где он лежит; меняется под
+        # индексной блокировкой, читается без нее
+        self.item_carts: dict[int, set[int]] = {}
+        self.ttl = ttl
+        self.clock = clock
+        # такт - десятая часть ttl, но не больше секунды
+        self.expiry = ExpiryQueue(min(ttl / 10, 1.0) if ttl else 1.0)
 
     def create_cart(self) -> int:
-        new_id = max(self.carts.keys(), default=0) + 1
-        cart = Cart(id=new_id, items={}, price=0.0)
-        self.carts[new_id] = cart
+        with self._create_lock:
+            new_id = self.id_allocator.allocate()
+            cart = Cart(id=new_id, items={}, price=0.0, accessed_at=self.clock())
+            self.carts[new_id] = cart
+            self.id_index.add(new_id)
+            if self.ttl is not None:
+                self.expiry.schedule(new_id, cart.accessed_at + self.ttl)
+            with self._index_lock:
+                self.price_index.add(cart.price, new_id)
+                self.quantity_index.add(cart.quantity, new_id)
         return new_id
 
     def get_cart(self, cart_id: int) -> Optional[Cart]:
-        return self.carts.get(cart_id)
+        cart = self.carts.get(cart_id)
+        if cart is not None and self.ttl is not None:
+            cart.accessed_at = self.clock()
+        return cart
 
-    def add_item_to_cart(self, cart_id: int, item: Item) -> CartItem:
-        # Local import to avoid circular dependency
-        cart = self.carts[cart_id]
-        if item.id in cart.items:
-            cart.items[item.id].quantity += 1
-        else:
-            cart.items[item.id] = CartItem(
-                id=item.id,
-                name=item.name,
-                quantity=1,
-                available=not item.deleted,
-                is_in_stock=not item.deleted,  
-                price=item.price  
-            )
-        cart.price += item.price
-        return cart.items[item.id]
+    def is_referenced(self, item_id: int) -> bool:
+        """Лежит ли товар хоть в одной корзине"""
+        return item_id in self.item_carts
+
+    def add_item_to_cart(self, cart_id: int, item: Item, expected_version: Optional[int] = None) -> CartItem:
+        return self.add_items_to_cart(cart_id, [(item, 1)], expected_version).items[item.id]
+
+    def add_items_to_cart(
+        self,
+        cart_id: int,
+        quantities: Sequence[tuple[Item, int]],
+        expected_version: Optional[int] = None,
+    ) -> Cart:
+        """Добавить в корзину товары в заданных количествах одним изменением.
+
+        Чтение-изменение-запись идет под блокировкой корзины, так что из потоков
+        инкременты не теряются. С `expected_version` это compare-and-swap:
+        если корзина уже на другой версии, бросается CartVersionConflict.
+        """
+        with self._locks[cart_id % LOCK_STRIPES]:
+            cart = self.carts[cart_id]
+            if expected_version is not None and cart.version != expected_version:
+                raise CartVersionConflict(cart_id, cart.version)
+            old_price, old_quantity = cart.price, cart.quantity
+            if self.ttl is not None:
+                cart.accessed_at = self.clock()
+            for item, quantity in quantities:
+                if item.id in cart.items:
+                    cart.items[item.id].quantity += quantity
+                else:
+                    cart.items[item.id] = CartItem(
+                        id=item.id,
+                        name=item.name,
+                        quantity=quantity,
+                        available=not item.deleted,
+                        is_in_stock=not item.deleted,  
+                        price=item.price  
+                    )
+                cart.price += item.price * quantity
+                cart.quantity += quantity
+            cart.version += 1
+            with self._index_lock:
+                for item, _ in quantities:
+                    self.item_carts.setdefault(item.id, set()).add(cart_id)
+                self.price_index.remove(old_price, cart_id)
+                self.price_index.add(cart.price, cart_id)
+                self.quantity_index.remove(old_quantity, cart_id)
+                self.quantity_index.add(cart.quantity, cart_id)
+            return cart
+
+    def expire(self, limit: int = EXPIRE_BATCH) -> int:
+        """Удалить до `limit` корзин, к которым не обращались дольше ttl.
+
+        Из очереди берутся только наступившие сроки. Корзина, к которой
+        обращались после постановки в очередь, не удаляется, а ставится
+        заново на новый срок. Возвращает число удаленных корзин.
+        """
+        if self.ttl is None:
+            return 0
+        now = self.clock()
+        with self._create_lock:
+            due = self.expiry.pop_expired(now, limit)
+        expired: list[Cart] = []
+        for cart_id in due:
+            with self._locks[cart_id % LOCK_STRIPES]:
+                cart = self.carts[cart_id]
+                deadline = cart.accessed_at + self.ttl
+                if deadline > now:
+                    with self._create_lock:
+                        self.expiry.schedule(cart_id, deadline)
+                    continue
+                del self.carts[cart_id]
+                expired.append(cart)
+
+        with self._create_lock:
+            self.id_index.remove_many({cart.id for cart in expired})
+        with self._index_lock:
+            self.price_index.remove_many({(cart.price, cart.id) for cart in expired})
+            self.quantity_index.remove_many({(cart.quantity, cart.id) for cart in expired})
+            for cart in expired:
+                for item_id in cart.items:
+                    holders = self.item_carts[item_id]
+                    holders.discard(cart.id)
+                    if not holders:
+                        # товар больше ни в одной корзине - его надгробие можно убрать
+                        del self.item_carts[item_id]
+        return len(expired)
+
+    def refresh_items(self, items: Iterable[Item]) -> int:
+        """Перенести новые цену, имя и доступность товаров в их строки корзин.
+
+        Корзины находятся по `item_carts`, так что работа пропорциональна
+        числу затронутых строк, а не всех корзин. Сумма и версия корзины
+        обновляются вместе со строкой, индекс цен - одним `rekey` в конце.
+        Возвращает число измененных корзин.
+        """
+        targets = [(item, tuple(self.item_carts.get(item.id, ()))) for item in items]
+        stripes = sorted({cart_id % LOCK_STRIPES for _, cart_ids in targets for cart_id in cart_ids})
+        # старая и новая сумма измененных корзин - для индекса цен
+        old_prices: dict[int, float] = {}
+        new_prices: dict[int, float] = {}
+        with ExitStack() as stack:
+            # блокировки полос - по возрастанию, чтобы не взаимоблокироваться
+            # с другим обновлением; индексная берется после них, как в add_items_to_cart
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+            carts = self.carts
+            for item, cart_ids in targets:
+                item_id, name, price, available = item.id, item.name, item.price, not item.deleted
+                for cart_id in cart_ids:
+                    cart = carts.get(cart_id)
+                    if cart is None:
+                        # корзина истекла после снимка item_carts
+                        continue
+                    cart_item = cart.items[item_id]
+                    if cart_item.price == price and cart_item.name == name and cart_item.available == available:
+                        continue
+                    if cart_id not in old_prices:
+                        old_prices[cart_id] = cart.price
+                        cart.version += 1
+                    cart.price += (price - cart_item.price) * cart_item.quantity
+                    new_prices[cart_id] = cart.price
+                    cart_item.name, cart_item.price = name, price
+                    cart_item.available = cart_item.is_in_stock = available
+            with self._index_lock:
+                self.price_index.rekey(old_prices, new_prices)
+        return len(old_prices)
 
     def paginate_filtered(
         self,
@@ -60,22 +241,104 @@ class CartStorage:
         max_price: Optional[float] = None,
         min_quantity: Optional[int] = None,
         max_quantity: Optional[int] = None,
+        after: Optional[int] = None,
     ) -> list[Cart]:
+        """Страница корзин по порядку id; `after` - id последней корзины
+        предыдущей страницы, продолжение ищется бинарным поиском."""
+        carts = self.filtered(min_price, max_price, min_quantity, max_quantity, after, offset + limit)
+        return list(islice(carts, offset, offset + limit))
+
+    def filtered(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+        after: Optional[int] = None,
+        wanted: Optional[int] = None,
+    ) -> Iterator[Cart]:
+        """Подходящие корзины по порядку id, лениво.
+
+        Сумма и количество корзины хранятся готовыми. Если окно по цене или
+        количеству узкое, первые `wanted` корзин ищет `first_in_window` по
+        более узкому из индексов (как в `ItemStorage.paginate_items_filtered`),
+        иначе - проход по id. Без `wanted` в узком окне отдаются все.
+        """
         def filter_cart(cart: Cart) -> bool:
             if min_price is not None and cart.price < min_price:
                 return False
             if max_price is not None and cart.price > max_price:
                 return False
-            total_quantity = sum(item.quantity for item in cart.items.values())
-            if min_quantity is not None and total_quantity < min_quantity:
+            if min_quantity is not None and cart.quantity < min_quantity:
                 return False
-            if max_quantity is not None and total_quantity > max_quantity:
+            if max_quantity is not None and cart.quantity > max_quantity:
                 return False
             return True
 
-        filtered_carts = islice(
-            filter(filter_cart, self.carts.values()), offset, offset + limit
-        )
-        return list(filtered_carts)
+        def matches(cart_id: int) -> bool:
+            # корзина могла истечь после выборки из индекса
+            cart = self.carts.get(cart_id)
+            return cart is not None and filter_cart(cart)
+
+        candidates: Iterable[Cart]
+        window = self._narrowest_window(min_price, max_price, min_quantity, max_quantity)
+        if window is not None:
+            size, window_ids = window
+            cart_ids = first_in_window(
+                self._ids_after(after), window_ids, size, after, size if wanted is None else wanted, matches
+            )
+            candidates = filter(None, map(self.carts.get, cart_ids))
+        else:
+            candidates = filter(None, map(self.carts.get, self._ids_after(after)))
+        return filter(filter_cart, candidates)
+
+    def _ids_after(self, after: Optional[int]) -> Iterator[int]:
+        """id корзин после `after` по возрастанию, лениво.
+
+        Ни словарь корзин, ни индекс id не перебираются напрямую: другой поток
+        может создать или удалить корзину посреди перебора. Под блокировкой
+        создания копируется пачка из ID_CHUNK id, следующая ищется бинарным
+        поиском после последнего отданного.
+        """
+        while True:
+            with self._create_lock:
+                chunk = self.id_index.slice_after(after, ID_CHUNK)
+            yield from chunk
+            if len(chunk) < ID_CHUNK:
+                return
+            after = chunk[-1]
+
+    def _narrowest_window(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        min_quantity: Optional[int],
+        max_quantity: Optional[int],
+    ) -> Optional[tuple[int, Callable[[], Iterable[int]]]]:
+        """Размер самого узкого окна индексов и функция, отдающая его id, или
+        None, если окно шире INDEX_SELECTIVITY и дешевле пройти по всем корзинам.
+
+        Под индексной блокировкой только считаются границы и (если понадобится)
+        копируется срез окна; перебор идет уже без нее.
+        """
+        with self._index_lock:
+            windows = [
+                (index.count(min_key, max_key), index, min_key, max_key)
+                for index, min_key, max_key in (
+                    (self.price_index, min_price, max_price),
+                    (self.quantity_index, min_quantity, max_quantity),
+                )
+                if min_key is not None or max_key is not None
+            ]
+        if not windows:
+            return None
+        size, index, min_key, max_key = min(windows, key=lambda window: window[0])
+        if size >= INDEX_SELECTIVITY * len(self.carts):
+            return None
+
+        def window_ids() -> Iterable[int]:
+            with self._index_lock:
+                entries = index.entries(min_key, max_key)
+            return map(itemgetter(1), entries)
 
-carts_storage = CartStorage()
+        return size, window_ids
@@ -0,0 +1,271 @@
+import operator
+import sys
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack
+from itertools import compress, islice, repeat
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from lecture_2.hw.shop_api.app.storages.id_allocator import IdAllocator, SequentialIdAllocator
+from lecture_2.hw.shop_api.app.storages.indexes import first_in_window
+from lecture_2.hw.shop_api.app.storages.item_storage import COMPACT_BATCH, INDEX_SELECTIVITY, Item, ItemStorage
+from lecture_2.hw.shop_api.app.storages.text_index import name_matches, tokenize
+
+
+class ColumnarItemStorage:
+    """Хранилище товаров по колонкам для каталогов в миллионы позиций.
+
+    Вместо объекта `Item` на товар - непрерывные типизированные массивы:
+    id (`q`), цены (`d`), флаги удаления (bytearray) и номер имени (`I`) в
+    пуле интернированных строк. Товар занимает ~21 байт плюс 8 байт в
+    индексе цен, одинаковые имена хранятся один раз.
+
+    Фильтры по цене и удалению - маски из `map(operator.ge, ...)` поверх
+    memoryview колонок, строки отбираются `itertools.compress`: весь проход
+    идет в C без вызова Python-функции на каждый товар.
+
+    Строки только добавляются, так что порядок строк - порядок id. Поэтому
+    id должны выдаваться по возрастанию (так работают все аллокаторы из
+    `id_allocator`), а строка по id находится бинарным поиском.
+
+    Интерфейс тот же, что у `ItemStorage`; `get_item` и остальные методы
+    отдают снимок товара - изменять его напрямую бесполезно.
+    """
+
+    def __init__(self, id_allocator: Optional[IdAllocator] = None):
+        self.id_allocator = id_allocator or SequentialIdAllocator()
+        self.ids = array("q")
+        self.prices = array("d")
+        self.deleted = bytearray()
+        self.name_codes = array("I")
+        self._names: list[str] = []
+        self._name_index: dict[str, int] = {}
+        # номера строк, отсортированные по (цена, id), включая удаленные
+        self.price_order = array("q")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _name_code(self, name: str) -> int:
+        code = self._name_index.get(name)
+        if code is None:
+            code = len(self._names)
+            name = sys.intern(name)
+            self._names.append(name)
+            self._name_index[name] = code
+        return code
+
+    def _row(self, item_id: int) -> Optional[int]:
+        row = bisect_left(self.ids, item_id)
+        if row < len(self.ids) and self.ids[row] == item_id:
+            return row
+        return None
+
+    def _item(self, row: int) -> Item:
+        return Item(
+            id=self.ids[row],
+            name=self._names[self.name_codes[row]],
+            price=self.prices[row],
+            deleted=bool(self.deleted[row]),
+        )
+
+    def _price_key(self, row: int) -> tuple[float, int]:
+        # строки идут по возрастанию id, так что (цена, строка) ~ (цена, id)
+        return self.prices[row], row
+
+    def _set_price(self, row: int, price: float) -> None:
+        position = bisect_left(self.price_order, self._price_key(row), key=self._price_key)
+        del self.price_order[position]
+        self.prices[row] = price
+        insort(self.price_order, row, key=self._price_key)
+
+    def add_new_item(self, name: str, price: float) -> Item:
+        new_id = self.id_allocator.allocate()
+        if self.ids and new_id <= self.ids[-1]:
+            raise ValueError("Item ids must be allocated in increasing order")
+
+        self.ids.append(new_id)
+        self.prices.append(price)
+        self.deleted.append(0)
+        self.name_codes.append(self._name_code(name))
+        insort(self.price_order, len(self.ids) - 1, key=self._price_key)
+        return self._item(len(self.ids) - 1)
+
+    def get_item(self, item_id: int) -> Optional[Item]:
+        row = self._row(item_id)
+        return None if row is None else self._item(row)
+
+    def get_items(self, item_ids: Iterable[int]) -> dict[int, Item]:
+        rows = {item_id: self._row(item_id) for item_id in item_ids}
+        return {item_id: self._item(row) for item_id, row in rows.items() if row is not None}
+
+    def upsert_items(self, entries: Sequence[tuple[Optional[int], str, float]]) -> list[Optional[Item]]:
+        """См. `ItemStorage.upsert_items`"""
+        results: list[Optional[Item]] = []
+        for item_id, name, price in entries:
+            if item_id is None:
+                results.append(self.add_new_item(name, price))
+            elif self._row(item_id) is not None:
+                results.append(self.replace_item(item_id, name, price))
+            else:
+                results.append(None)
+        return results
+
+    def replace_item(self, item_id: int, name: str, price: float) -> Item:
+        row = self._row(item_id)
+        if row is None:
+            raise ValueError("Item not found")
+        self.name_codes[row] = self._name_code(name)
+        self.deleted[row] = 0
+        self._set_price(row, price)
+        return self._item(row)
+
+    def update_item(self, item_id: int, name: Optional[str] = None, price: Optional[float] = None) -> Item:
+        row = self._row(item_id)
+        if row is None:
+            raise ValueError("Item not found")
+        if name is not None:
+            self.name_codes[row] = self._name_code(name)
+        if price is not None:
+            self._set_price(row, price)
+        return self._item(row)
+
+    def delete_item(self, item_id: int) -> None:
+        row = self._row(item_id)
+        if row is None:
+            raise ValueError("Item not found")
+        self.deleted[row] = 1
+
+    def compact(self, carts: Any = None, limit: int = COMPACT_BATCH) -> int:
+        """Строки только добавляются, и номер строки ищется по колонке id, так
+        что надгробия не убираются: они занимают ~29 байт и пропускаются масками"""
+        return 0
+
+    def _price_bounds(self, min_price: Optional[float], max_price: Optional[float]) -> tuple[int, int]:
+        """Границы ценового окна в `price_order`"""
+        price_order = self.price_order
+        lower = 0 if min_price is None else bisect_left(price_order, min_price, key=self.prices.__getitem__)
+        upper = len(price_order) if max_price is None else bisect_right(price_order, max_price, key=self.prices.__getitem__)
+        return lower, upper
+
+    def _is_narrow(self, min_price: Optional[float], max_price: Optional[float]) -> bool:
+        if min_price is None and max_price is None:
+            return False
+        lower, upper = self._price_bounds(min_price, max_price)
+        return upper - lower < INDEX_SELECTIVITY * len(self.ids)
+
+    def _price_rows(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        after: Optional[tuple[Any, ...]],
+    ) -> Iterator[int]:
+        """Строки в порядке (цена, id) внутри ценового окна"""
+        price_order = self.price_order
+        lower, upper = self._price_bounds(min_price, max_price)
+        if after is not None:
+            after_price, after_id = after
+            # строка после after_id - первая с id > after_id
+            key = (after_price, bisect_right(self.ids, after_id) - 0.5)
+            lower = max(lower, bisect_right(price_order, key, key=self._price_key))
+        for position in range(lower, upper):
+            yield price_order[position]
+
+    def paginate_items_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+        order_by: str = "id",
+        after: Optional[tuple[Any, ...]] = None,
+        q: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> list[Item]:
+        """Страница товаров, параметры - как у `ItemStorage.paginate_items_filtered`.
+
+        Узкое ценовое окно, как и в `ItemStorage`, читается из индекса цен,
+        остальное - проходом масок по колонкам.
+
+        `q` и `name_prefix` проверяются один раз на каждое уникальное имя
+        пула, а строки отбираются по номеру имени - еще одной маской.
+        """
+        codes = None
+        if q is not None or name_prefix is not None:
+            tokens = None if q is None else tokenize(q)
+            codes = {code for code, name in enumerate(self._names) if name_matches(name, tokens, name_prefix)}
+
+        start = 0 if after is None or order_by == "price" else bisect_right(self.ids, after[0])
+        rows: Iterable[int]
+        if order_by == "price":
+            rows = self._price_rows(min_price, max_price, after)
+        elif self._is_narrow(min_price, max_price):
+            lower, upper = self._price_bounds(min_price, max_price)
+            deleted, name_codes, prices = self.deleted, self.name_codes, self.prices
+
+            def matches(row: int) -> bool:
+                if not show_deleted and deleted[row]:
+                    return False
+                if codes is not None and name_codes[row] not in codes:
+                    return False
+                price = prices[row]
+                return (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+
+            # строки идут по возрастанию id - см. `first_in_window`
+            rows = first_in_window(
+                iter(range(start, len(self.ids))),
+                lambda: islice(self.price_order, lower, upper),
+                upper - lower,
+                start - 1,
+                offset + limit,
+                matches,
+            )
+            show_deleted, codes = True, None  # условия уже проверены
+        else:
+            rows = self._scan(start, offset + limit, min_price, max_price, show_deleted, codes)
+            show_deleted, codes = True, None  # маски уже применены
+
+        if not show_deleted:
+            deleted = self.deleted
+            rows = (row for row in rows if not deleted[row])
+        if codes is not None:
+            name_codes = self.name_codes
+            rows = (row for row in rows if name_codes[row] in codes)
+        return [self._item(row) for row in islice(rows, offset, offset + limit)]
+
+    def _scan(
+        self,
+        start: int,
+        stop: int,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        show_deleted: bool,
+        codes: Optional[set[int]] = None,
+    ) -> list[int]:
+        """Первые `stop` строк с номера `start`, прошедших маски фильтров"""
+        with ExitStack() as stack:
+            # view отпускается на выходе, иначе массивы нельзя будет дополнять
+            masks = []
+            if not show_deleted:
+                deleted = stack.enter_context(memoryview(self.deleted)[start:])
+                masks.append(map(operator.not_, deleted))
+            if min_price is not None or max_price is not None:
+                prices = stack.enter_context(memoryview(self.prices)[start:])
+                if min_price is not None:
+                    masks.append(map(operator.ge, prices, repeat(min_price)))
+                if max_price is not None:
+                    masks.append(map(operator.le, prices, repeat(max_price)))
+            if codes is not None:
+                name_codes = stack.enter_context(memoryview(self.name_codes)[start:])
+                masks.append(map(codes.__contains__, name_codes))
+
+            rows: Iterable[int] = range(start, len(self.ids))
+            if masks:
+                mask = masks[0]
+                for other in masks[1:]:
+                    mask = map(operator.and_, mask, other)
+                rows = compress(rows, mask)
+            return list(islice(rows, stop))
+
+    sort_key = staticmethod(ItemStorage.sort_key)
@@ -0,0 +1,49 @@
+import math
+from heapq import heappop, heappush
+
+
+class ExpiryQueue:
+    """Очередь истечения сроков по корзинам времени (timing wheel).
+
+    id попадает в корзину своего срока, округленного вверх до `resolution`
+    секунд, номера непустых корзин лежат в куче. `pop_expired` забирает
+    только наступившие корзины - O(истекших + log корзин) без прохода по
+    всем записям, а пустые такты между вызовами ничего не стоят.
+
+    Перенести срок нельзя: владелец, у которого срок сдвинулся, кладет id
+    заново, когда тот выпадет из очереди (ленивое перепланирование).
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self._buckets: dict[int, list[int]] = {}
+        self._ticks: list[int] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, entity_id: int, deadline: float) -> None:
+        tick = math.ceil(deadline / self.resolution)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = []
+            heappush(self._ticks, tick)
+        bucket.append(entity_id)
+        self._size += 1
+
+    def pop_expired(self, now: float, limit: int) -> list[int]:
+        """До `limit` id со сроком не позже now; срок никогда не наступает раньше"""
+        now_tick = math.floor(now / self.resolution)
+        expired: list[int] = []
+        while self._ticks and self._ticks[0] <= now_tick and len(expired) < limit:
+            tick = self._ticks[0]
+            bucket = self._buckets[tick]
+            taken = bucket[len(expired) - limit :]
+            del bucket[len(expired) - limit :]
+            expired.extend(taken)
+            if not bucket:
+                heappop(self._ticks)
+                del self._buckets[tick]
+        self._size -= len(expired)
+        return expired
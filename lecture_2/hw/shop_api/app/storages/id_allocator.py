@@ -0,0 +1,95 @@
+import fcntl
+import os
+import threading
+from itertools import count
+from typing import Protocol
+
+
+class IdAllocator(Protocol):
+    def allocate(self) -> int: ...
+
+
+class SequentialIdAllocator:
+    """Монотонные id за O(1) в пределах одного процесса; с `step` - каждый
+    step-й id, начиная со start (так шарды делят id без общего счетчика)"""
+
+    def __init__(self, start: int = 1, step: int = 1) -> None:
+        # next() у itertools.count атомарен под GIL, отдельный лок не нужен
+        self._counter = count(start, step)
+
+    def allocate(self) -> int:
+        return next(self._counter)
+
+
+class BlockSource(Protocol):
+    def lease(self, size: int) -> int:
+        """Арендовать диапазон [start, start + size), вернуть start"""
+        ...
+
+
+class LocalBlockSource:
+    """Источник блоков внутри процесса (например, общий для нескольких хранилищ)"""
+
+    def __init__(self, start: int = 1) -> None:
+        self._next = start
+        self._lock = threading.Lock()
+
+    def lease(self, size: int) -> int:
+        with self._lock:
+            start = self._next
+            self._next += size
+            return start
+
+
+class FileBlockSource:
+    """Источник блоков, общий для нескольких процессов.
+
+    Следующий свободный id хранится в файле, аренда блока - чтение и запись
+    под `flock` с fsync до выдачи блока. Файл трогается один раз на блок, а
+    не на каждый id.
+    """
+
+    def __init__(self, path: str, start: int = 1) -> None:
+        self.path = path
+        self.start = start
+
+    def lease(self, size: int) -> int:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, 32, 0).strip()
+            start = int(raw) if raw else self.start
+            # новое значение пишется поверх старого и лишь потом файл обрезается:
+            # пустого файла (аренда снова с self.start) не бывает даже при сбое
+            value = str(start + size).encode()
+            os.pwrite(fd, value, 0)
+            os.ftruncate(fd, len(value))
+            os.fsync(fd)
+            return start
+        finally:
+            os.close(fd)  # закрытие снимает flock
+
+
+class BlockIdAllocator:
+    """Выдает id из арендованных у `BlockSource` блоков.
+
+    Процессы с одним источником получают непересекающиеся блоки, поэтому id
+    не совпадают. Внутри процесса id растут монотонно, между процессами -
+    только в пределах своего блока.
+    """
+
+    def __init__(self, source: BlockSource, block_size: int = 1024) -> None:
+        self.source = source
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self.source.lease(self.block_size)
+                self._end = self._next + self.block_size
+            new_id = self._next
+            self._next += 1
+            return new_id
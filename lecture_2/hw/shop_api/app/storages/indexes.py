@@ -0,0 +1,230 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import nsmallest
+from itertools import islice
+from math import inf
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Пачки меньше этого размера применяются по одной записи: сдвиг хвоста
+# (memmove) на запись дешевле пересборки всего списка. Обе цены растут с
+# длиной списка, так что порог от нее почти не зависит
+BULK_THRESHOLD = 128
+
+# Если пачка больше этой доли списка, список пересобирается целиком, а не
+# правится по позициям, найденным бинарным поиском
+REBUILD_SHARE = 0.25
+
+
+def _without(values: list[Any], positions: list[int]) -> list[Any]:
+    """Список без элементов на позициях.
+
+    Подряд идущие позиции (например, самые старые записи) удаляются на
+    месте - по одному сдвигу хвоста на отрезок. Если отрезков много, список
+    склеивается из срезов, копирование - в C.
+    """
+    positions = sorted(positions)
+    runs: list[list[int]] = []
+    for position in positions:
+        if runs and runs[-1][1] == position:
+            runs[-1][1] = position + 1
+        else:
+            runs.append([position, position + 1])
+    if len(runs) < BULK_THRESHOLD:
+        for start, end in reversed(runs):
+            del values[start:end]
+        return values
+
+    result, start = [], 0
+    for position in positions:
+        result.extend(values[start:position])
+        start = position + 1
+    result.extend(values[start:])
+    return result
+
+
+# признак конца итератора для next(): id и номера строк бывают нулем
+_END = object()
+
+
+def first_in_window(
+    walk: Iterator[int],
+    window: Callable[[], Iterable[int]],
+    window_size: int,
+    after: Optional[int],
+    wanted: int,
+    matches: Callable[[int], bool],
+) -> list[int]:
+    """Первые `wanted` id (по возрастанию, больше `after`), подходящих под
+    узкое окно индекса из `window_size` записей.
+
+    `walk` - id по возрастанию начиная после `after`, `matches` проверяет
+    все условия. Сначала id перебираются по порядку: если ключи индекса не
+    зависят от id, подходящий встречается раз в total / window_size записей.
+    Перебор ограничен window_size шагами; если страница не набралась, id
+    берутся из самого окна через `nsmallest` - O(window log wanted), без
+    сортировки и копии окна. Так страница стоит не больше O(window) при
+    любой глубине.
+    """
+    found = list(islice(filter(matches, islice(walk, window_size)), wanted))
+    if len(found) == wanted or next(walk, _END) is _END:
+        return found
+    candidates: Iterable[int] = filter(matches, window())
+    if after is not None:
+        candidates = (entity_id for entity_id in candidates if entity_id > after)
+    return nsmallest(wanted, candidates)
+
+
+class SortedIndex:
+    """Отсортированный список пар (ключ, id) для диапазонных запросов.
+
+    Поиск границ - бинарный, O(log n); вставка и удаление - O(log n) поиск
+    плюс сдвиг хвоста списка (memmove), что на практике быстро и для
+    миллионов записей. Одинаковые ключи упорядочены по id.
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: float, entity_id: int) -> None:
+        insort(self._entries, (key, entity_id))
+
+    def add_many(self, entries: Iterable[tuple[float, int]]) -> None:
+        """Пачка записей: дописать и отсортировать. Timsort сливает готовый
+        отсортированный список с хвостом за O(n + k log k) вместо k вставок"""
+        entries = list(entries)
+        if len(entries) < BULK_THRESHOLD:
+            for entry in entries:
+                insort(self._entries, entry)
+            return
+        self._entries.extend(entries)
+        self._entries.sort()
+
+    def remove(self, key: float, entity_id: int) -> None:
+        position = bisect_left(self._entries, (key, entity_id))
+        if position < len(self._entries) and self._entries[position] == (key, entity_id):
+            del self._entries[position]
+
+    def _positions(self, entries: Iterable[tuple[float, int]]) -> list[int]:
+        """Позиции имеющихся записей; искать до любых изменений списка"""
+        positions, size = [], len(self._entries)
+        for entry in entries:
+            position = bisect_left(self._entries, entry)
+            if position < size and self._entries[position] == entry:
+                positions.append(position)
+        return positions
+
+    def remove_many(self, entries: set[tuple[float, int]]) -> None:
+        """Убрать пачку записей без сдвига хвоста на каждую"""
+        if len(entries) < BULK_THRESHOLD:
+            for key, entity_id in entries:
+                self.remove(key, entity_id)
+        elif len(entries) > REBUILD_SHARE * len(self._entries):
+            self._entries = [entry for entry in self._entries if entry not in entries]
+        else:
+            self._entries = _without(self._entries, self._positions(entries))
+
+    def rekey(self, old_keys: dict[int, float], new_keys: dict[int, float]) -> None:
+        """Сменить ключи многих id сразу (id -> старый и новый ключ).
+
+        Записи правятся на своих местах, и порядок восстанавливает
+        `list.sort`: timsort видит почти упорядоченный список и сливает
+        сдвинутые записи за O(n) сравнений в C, без O(n) сдвигов на каждую.
+        """
+        if len(new_keys) < BULK_THRESHOLD:
+            for entity_id, key in new_keys.items():
+                self.remove(old_keys[entity_id], entity_id)
+                self.add(key, entity_id)
+            return
+        if len(new_keys) > REBUILD_SHARE * len(self._entries):
+            entries = [(new_keys.get(entity_id, key), entity_id) for key, entity_id in self._entries]
+        else:
+            entries = self._entries
+            positions = self._positions((old_keys[entity_id], entity_id) for entity_id in new_keys)
+            for position in positions:
+                entity_id = entries[position][1]
+                entries[position] = (new_keys[entity_id], entity_id)
+        entries.sort()
+        self._entries = entries
+
+    def _bounds(self, min_key: Optional[float], max_key: Optional[float]) -> tuple[int, int]:
+        lower = 0 if min_key is None else bisect_left(self._entries, (min_key, -inf))
+        upper = len(self._entries) if max_key is None else bisect_right(self._entries, (max_key, inf))
+        return lower, max(lower, upper)
+
+    def count(self, min_key: Optional[float] = None, max_key: Optional[float] = None) -> int:
+        lower, upper = self._bounds(min_key, max_key)
+        return upper - lower
+
+    def entries(self, min_key: Optional[float] = None, max_key: Optional[float] = None) -> list[tuple[float, int]]:
+        """Копия записей окна (срез - копирование в C), чтобы читать ее без блокировки"""
+        lower, upper = self._bounds(min_key, max_key)
+        return self._entries[lower:upper]
+
+    def ids(
+        self,
+        min_key: Optional[float] = None,
+        max_key: Optional[float] = None,
+        after: Optional[tuple[float, int]] = None,
+    ) -> Iterator[int]:
+        """id с ключом в [min_key, max_key] в порядке возрастания ключа, лениво.
+
+        `after` - (ключ, id) последней прочитанной записи: продолжение
+        начинается сразу за ней, без прохода по предыдущим.
+        """
+        lower, upper = self._bounds(min_key, max_key)
+        if after is not None:
+            lower = max(lower, bisect_right(self._entries, after))
+        entries = self._entries
+        for position in range(lower, upper):
+            yield entries[position][1]
+
+
+class IdIndex:
+    """Отсортированные id для keyset-пагинации (продолжить после id за O(log n)).
+
+    id от аллокатора растут монотонно, так что вставка почти всегда - append.
+    """
+
+    def __init__(self) -> None:
+        self._ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, entity_id: int) -> None:
+        if not self._ids or entity_id > self._ids[-1]:
+            self._ids.append(entity_id)
+        else:
+            insort(self._ids, entity_id)
+
+    def remove(self, entity_id: int) -> None:
+        position = bisect_left(self._ids, entity_id)
+        if position < len(self._ids) and self._ids[position] == entity_id:
+            del self._ids[position]
+
+    def remove_many(self, entity_ids: set[int]) -> None:
+        if len(entity_ids) < BULK_THRESHOLD:
+            for entity_id in entity_ids:
+                self.remove(entity_id)
+        elif len(entity_ids) > REBUILD_SHARE * len(self._ids):
+            self._ids = [entity_id for entity_id in self._ids if entity_id not in entity_ids]
+        else:
+            positions = [bisect_left(self._ids, entity_id) for entity_id in entity_ids]
+            size = len(self._ids)
+            self._ids = _without(
+                self._ids, [p for p, entity_id in zip(positions, entity_ids) if p < size and self._ids[p] == entity_id]
+            )
+
+    def slice_after(self, entity_id: Optional[int], size: int) -> list[int]:
+        """Копия следующих `size` id после entity_id - для чтения под блокировкой"""
+        start = 0 if entity_id is None else bisect_right(self._ids, entity_id)
+        return self._ids[start : start + size]
+
+    def after(self, entity_id: Optional[int] = None) -> Iterator[int]:
+        """id строго больше entity_id (или все), по возрастанию, лениво"""
+        ids = self._ids
+        start = 0 if entity_id is None else bisect_right(ids, entity_id)
+        for position in range(start, len(ids)):
+            yield ids[position]
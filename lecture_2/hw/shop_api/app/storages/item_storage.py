@@ -1,7 +1,23 @@
 from dataclasses import dataclass
-from typing import Optional
+from heapq import merge, nsmallest
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Sequence
 from itertools import islice
 
+from lecture_2.hw.shop_api.app.storages.id_allocator import IdAllocator, SequentialIdAllocator
+from lecture_2.hw.shop_api.app.storages.indexes import IdIndex, SortedIndex, first_in_window
+from lecture_2.hw.shop_api.app.storages.text_index import PrefixIndex, TokenIndex, name_matches, tokenize
+
+if TYPE_CHECKING:
+    from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+
+# Если в ценовое окно попадает меньше этой доли каталога, выборка идет по
+# индексу цен, иначе дешевле пройти по всем товарам
+INDEX_SELECTIVITY = 0.125
+
+# Сколько удаленных товаров убирает один вызов `compact`: индексы надгробий
+# перестраиваются за проход на пачку, так что пачка должна быть крупной
+COMPACT_BATCH = 10_000
+
 @dataclass(slots=True)
 class Item:
     id: int
@@ -10,21 +26,96 @@ class Item:
     deleted: bool = False
 
 class ItemStorage:
-    def __init__(self):
+    """Товары в словаре по id плюс индексы для выборок.
+
+    Индексы id и цен разделены на живые товары и «надгробия» (удаленные):
+    обычные выборки читают только живые, а с show_deleted обе части
+    сливаются по порядку. Надгробия, на которые не ссылается ни одна
+    корзина, убирает `compact`.
+    """
+
+    def __init__(self, id_allocator: Optional[IdAllocator] = None):
         self.items: dict[int, Item] = {}
+        self.id_allocator = id_allocator or SequentialIdAllocator()
+        # (price, id) и id живых товаров
+        self.price_index = SortedIndex()
+        self.id_index = IdIndex()
+        # то же для удаленных - видны только с show_deleted
+        self.deleted_price_index = SortedIndex()
+        self.deleted_id_index = IdIndex()
+        # убранные `compact` с последней пересборки словаря items
+        self._dropped = 0
+        # поиск по имени: слова (`q`) и префикс (`name_prefix`)
+        self.token_index = TokenIndex()
+        self.prefix_index = PrefixIndex()
 
     def add_new_item(self, name: str, price: float) -> Item:
-        new_id = max(self.items.keys(), default=0) + 1
+        new_item = self._create_item(name, price)
+        self.price_index.add(price, new_item.id)
+        self.prefix_index.add(new_item.id, name)
+        return new_item
+
+    def _create_item(self, name: str, price: float) -> Item:
+        """Новый товар без сортированных индексов - их дополняет вызывающий"""
+        new_id = self.id_allocator.allocate()
         new_item = Item(id=new_id, name=name, price=price)
         self.items[new_id] = new_item
+        self.id_index.add(new_id)
+        self.token_index.add(new_id, name)
         return new_item
 
+    def _indexes(self, item: Item) -> tuple[IdIndex, SortedIndex]:
+        """Индексы id и цен, в которых сейчас лежит товар"""
+        if item.deleted:
+            return self.deleted_id_index, self.deleted_price_index
+        return self.id_index, self.price_index
+
+    def _rename(self, item_id: int, old_name: str, new_name: str) -> None:
+        self.token_index.remove(item_id, old_name)
+        self.prefix_index.remove(item_id, old_name)
+        self.token_index.add(item_id, new_name)
+        self.prefix_index.add(item_id, new_name)
+
     def get_item(self, item_id: int) -> Optional[Item]:
         return self.items.get(item_id)
 
+    def get_items(self, item_ids: Iterable[int]) -> dict[int, Item]:
+        """Найденные товары по id за один вызов (отсутствующих в ответе нет)"""
+        items = self.items
+        return {item_id: items[item_id] for item_id in item_ids if item_id in items}
+
+    def upsert_items(self, entries: Sequence[tuple[Optional[int], str, float]]) -> list[Optional[Item]]:
+        """Создание (id=None) или замена товаров за один проход.
+
+        Результаты - в порядке entries; None - заменяемого товара нет.
+        Новые товары попадают в сортированные индексы одной пачкой.
+        """
+        results: list[Optional[Item]] = []
+        created: list[Item] = []
+        for item_id, name, price in entries:
+            if item_id is None:
+                created.append(self._create_item(name, price))
+                results.append(created[-1])
+            elif item_id in self.items:
+                results.append(self.replace_item(item_id, name, price))
+            else:
+                results.append(None)
+        if created:
+            self.price_index.add_many((item.price, item.id) for item in created)
+            self.prefix_index.add_many((item.id, item.name) for item in created)
+        return results
+
     def replace_item(self, item_id: int, name: str, price: float) -> Item:
         if item_id in self.items:
+            old_item = self.items[item_id]
+            id_index, price_index = self._indexes(old_item)
+            id_index.remove(item_id)
+            price_index.remove(old_item.price, item_id)
+            self._rename(item_id, old_item.name, name)
+            # замена восстанавливает удаленный товар
             self.items[item_id] = Item(id=item_id, name=name, price=price, deleted=False)
+            self.id_index.add(item_id)
+            self.price_index.add(price, item_id)
             return self.items[item_id]
         else:
             raise ValueError("Item not found")
@@ -32,20 +123,85 @@ class ItemStorage:
     def update_item(self, item_id: int, name: Optional[str] = None, price: Optional[float] = None) -> Item:
         if item_id in self.items:
             if name is not None:
+                self._rename(item_id, self.items[item_id].name, name)
                 self.items[item_id].name = name
             if price is not None:
+                _, price_index = self._indexes(self.items[item_id])
+                price_index.remove(self.items[item_id].price, item_id)
                 self.items[item_id].price = price
+                price_index.add(price, item_id)
             return self.items[item_id]
         else:
             raise ValueError("Item not found")
 
     def delete_item(self, item_id: int) -> None:
         if item_id in self.items:
-            self.items[item_id].deleted = True
+            # мягкое удаление: товар переезжает в индексы надгробий
+            item = self.items[item_id]
+            if not item.deleted:
+                self.id_index.remove(item_id)
+                self.price_index.remove(item.price, item_id)
+                item.deleted = True
+                self.deleted_id_index.add(item_id)
+                self.deleted_price_index.add(item.price, item_id)
         else:
             raise ValueError("Item not found")
 
-    def paginate_items_filtered(self, offset: int = 0, limit: int = 10, min_price: Optional[float] = None, max_price: Optional[float] = None, show_deleted: bool = False) -> list[Item]:
+    def compact(self, carts: "CartStorage", limit: int = COMPACT_BATCH) -> int:
+        """Убрать до `limit` удаленных товаров, которых нет ни в одной корзине.
+
+        Возвращает число убранных; перебираются только надгробия. Товары из
+        корзин остаются - корзина показывает их как недоступные.
+        """
+        unreferenced = (item_id for item_id in self.deleted_id_index.after() if not carts.is_referenced(item_id))
+        dropped = [self.items.pop(item_id) for item_id in list(islice(unreferenced, limit))]
+        for item in dropped:
+            self.token_index.remove(item.id, item.name)
+        self.deleted_id_index.remove_many({item.id for item in dropped})
+        self.deleted_price_index.remove_many({(item.price, item.id) for item in dropped})
+        self.prefix_index.remove_many((item.id, item.name) for item in dropped)
+        # dict не сжимается при удалении ключей: копия освобождает память, а
+        # пересборка не чаще раза на len(items) убранных - амортизированно O(1)
+        self._dropped += len(dropped)
+        if self._dropped > len(self.items):
+            self.items = dict(self.items)
+            self._dropped = 0
+        return len(dropped)
+
+    def paginate_items_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+        order_by: str = "id",
+        after: Optional[tuple[Any, ...]] = None,
+        q: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> list[Item]:
+        """Страница товаров по порядку id (по умолчанию) или цены.
+
+        `order_by="price"` читается прямо из индекса цен: O(log n + offset +
+        limit). Для порядка по id широкое ценовое окно - проход по id, узкое
+        (k товаров) - `first_in_window`: не больше O(k) на страницу.
+        Без show_deleted читаются только индексы живых товаров, так что
+        удаленные не перебираются и не замедляют выборку.
+
+        `after` - ключ последнего товара предыдущей страницы (`sort_key`):
+        выборка продолжается с него через бинарный поиск, так что глубокие
+        страницы стоят столько же, сколько первая.
+
+        `q` - слова, которые все должны быть в имени, `name_prefix` - начало
+        имени (оба без учета регистра). Выбор пути тот же, что для ценового
+        окна: если совпадений мало, они берутся из индексов имен, и страница -
+        `nsmallest` по найденным после `after`, без сортировки всех. Если
+        много - обычный ленивый проход по индексу id или цен с проверкой
+        имени (`name_matches`), и страница не зависит от числа совпадений.
+        """
+        tokens = tokenize(q) if q is not None else None
+        check_names = False
+
         def filter_item(item: Item) -> bool:
             if not show_deleted and item.deleted:
                 return False
@@ -53,10 +209,110 @@ class ItemStorage:
                 return False
             if max_price is not None and item.price > max_price:
                 return False
-            return True
+            return not check_names or name_matches(item.name, tokens, name_prefix)
+
+        matched = 0
+        if q is not None or name_prefix is not None:
+            matched = self._count_matches(tokens, name_prefix)
+            if matched < INDEX_SELECTIVITY * len(self.items):
+                found: Iterable[Item] = (self.items[item_id] for item_id in self._search(tokens, name_prefix))
+                if after is not None:
+                    found = (item for item in found if self.sort_key(item, order_by) > after)
+                page = nsmallest(
+                    offset + limit, filter(filter_item, found), key=lambda item: self.sort_key(item, order_by)
+                )
+                return page[offset:]
+            check_names = True
 
-        filtered_items = islice(filter(filter_item, self.items.values()), offset, offset + limit)
+        if order_by == "price":
+            item_ids = self._ids_by_price(min_price, max_price, after, show_deleted)
+            price_ordered = (self.items[item_id] for item_id in item_ids)
+            if check_names:
+                price_ordered = filter(filter_item, price_ordered)
+            return list(islice(price_ordered, offset, offset + limit))
+
+        after_id = after[0] if after is not None else None
+        has_price_filter = min_price is not None or max_price is not None
+        window, total = self.price_index.count(min_price, max_price), len(self.id_index)
+        if show_deleted:
+            window += self.deleted_price_index.count(min_price, max_price)
+            total += len(self.deleted_id_index)
+        if has_price_filter and window < INDEX_SELECTIVITY * total:
+            items = self.items
+            item_ids = first_in_window(
+                self._ids_by_id(after_id, show_deleted),
+                lambda: self._ids_by_price(min_price, max_price, None, show_deleted),
+                window,
+                after_id,
+                offset + limit,
+                lambda item_id: filter_item(items[item_id]),
+            )
+            return [items[item_id] for item_id in item_ids[offset:]]
+
+        if check_names:
+            # широкий поиск по id: если совпадения собрались в конце каталога,
+            # перебор ограничен их числом, а дальше страница берется из них
+            items = self.items
+            item_ids = first_in_window(
+                self._ids_by_id(after_id, show_deleted),
+                lambda: self._search(tokens, name_prefix),
+                matched,
+                after_id,
+                offset + limit,
+                lambda item_id: filter_item(items[item_id]),
+            )
+            return [items[item_id] for item_id in item_ids[offset:]]
+
+        candidates = (self.items[item_id] for item_id in self._ids_by_id(after_id, show_deleted))
+        filtered_items = islice(filter(filter_item, candidates), offset, offset + limit)
         return list(filtered_items)
 
+    def _ids_by_id(self, after_id: Optional[int], show_deleted: bool) -> Iterator[int]:
+        ids = self.id_index.after(after_id)
+        if show_deleted:
+            ids = merge(ids, self.deleted_id_index.after(after_id))
+        return ids
+
+    def _ids_by_price(
+        self,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        after: Optional[tuple[Any, ...]],
+        show_deleted: bool,
+    ) -> Iterator[int]:
+        ids = self.price_index.ids(min_price, max_price, after)
+        if show_deleted:
+            items = self.items
+            deleted_ids = self.deleted_price_index.ids(min_price, max_price, after)
+            ids = merge(ids, deleted_ids, key=lambda item_id: (items[item_id].price, item_id))
+        return ids
+
+    def _count_matches(self, tokens: Optional[set[str]], name_prefix: Optional[str]) -> int:
+        """Верхняя оценка числа товаров под `q` и `name_prefix` - O(слов + log n)"""
+        bounds = []
+        if tokens is not None:
+            bounds.append(self.token_index.count(tokens))
+        if name_prefix is not None:
+            bounds.append(self.prefix_index.count(name_prefix))
+        return min(bounds)
+
+    def _search(self, tokens: Optional[set[str]], name_prefix: Optional[str]) -> set[int]:
+        """id товаров, подходящих под `q` (уже разбитый на слова) и `name_prefix`"""
+        found: Optional[set[int]] = None
+        if tokens is not None:
+            found = self.token_index.ids(tokens)
+        if name_prefix is not None:
+            if found is None:
+                found = set(self.prefix_index.ids(name_prefix))
+            elif len(found) > self.prefix_index.count(name_prefix):
+                found.intersection_update(self.prefix_index.ids(name_prefix))
+            else:
+                # слов мало - дешевле проверить каждое имя, чем выгружать префикс
+                prefix = name_prefix.casefold()
+                found = {item_id for item_id in found if self.items[item_id].name.casefold().startswith(prefix)}
+        return found if found is not None else set()
 
-items_storage = ItemStorage()
+    @staticmethod
+    def sort_key(item: Item, order_by: str = "id") -> tuple[Any, ...]:
+        """Ключ товара для `after` при данном порядке сортировки"""
+        return (item.price, item.id) if order_by == "price" else (item.id,)
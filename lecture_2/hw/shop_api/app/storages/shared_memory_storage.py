@@ -0,0 +1,577 @@
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import EXPIRE_BATCH, Cart, CartItem, CartVersionConflict
+from lecture_2.hw.shop_api.app.storages.item_storage import COMPACT_BATCH, Item, ItemStorage
+from lecture_2.hw.shop_api.app.storages.text_index import name_matches, tokenize
+
+MAGIC = 0x53484F50  # "SHOP": сегмент размечен и готов к работе
+NAME_SIZE = 237  # байт UTF-8 на имя, запись товара - ровно 256 байт
+
+VERSION = struct.Struct("<Q")
+PRICE = struct.Struct("<d")
+COUNTER = struct.Struct("<q")
+
+
+class CapacityError(Exception):
+    """Запись не помещается в сегмент: кончились слоты или имя слишком длинное"""
+
+
+def _encode_name(name: str) -> bytes:
+    encoded = name.encode()
+    if len(encoded) > NAME_SIZE:
+        raise CapacityError(f"Name must fit into {NAME_SIZE} bytes of UTF-8")
+    return encoded
+
+
+class SharedSegment:
+    """Именованный сегмент shared memory, общий для всех воркеров.
+
+    Первый процесс создает и размечает сегмент, остальные подключаются по
+    имени и ждут MAGIC в заголовке. Запись сериализуется flock на файле
+    рядом (между процессами) и обычным Lock (между потоками процесса).
+    Чтение идет без блокировок: каждая запись защищена seqlock - версия
+    нечетная, пока идет изменение, и читатель повторяет попытку, если версия
+    нечетная или поменялась за время чтения.
+    """
+
+    # magic, capacity, затем поля конкретного хранилища
+    HEADER = struct.Struct("<QQ")
+
+    def __init__(self, name: str, size: Callable[[int], int], capacity: int):
+        try:
+            self.shm = SharedMemory(name, create=True, size=size(capacity))
+            created = True
+        except FileExistsError:
+            self.shm = SharedMemory(name)
+            created = False
+        # сегмент переживает воркеры: иначе resource_tracker удалит его при
+        # выходе первого же процесса, подключившегося к нему
+        resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore[attr-defined]
+
+        self.buf = self.shm.buf
+        self._thread_lock = threading.Lock()
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        if created:
+            self.HEADER.pack_into(self.buf, 0, 0, capacity)
+            self.HEADER.pack_into(self.buf, 0, MAGIC, capacity)
+        else:
+            self._wait_ready()
+        self.capacity = self.HEADER.unpack_from(self.buf, 0)[1]
+
+    def _wait_ready(self, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while self.HEADER.unpack_from(self.buf, 0)[0] != MAGIC:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Shared memory segment {self.shm.name} was not initialized")
+            time.sleep(0.001)
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def begin(self, offset: int) -> int:
+        """Начало изменения под seqlock по смещению offset, возвращает версию"""
+        version = VERSION.unpack_from(self.buf, offset)[0] + 1
+        VERSION.pack_into(self.buf, offset, version)
+        return version
+
+    def end(self, offset: int, version: int) -> None:
+        VERSION.pack_into(self.buf, offset, version + 1)
+
+    def read(self, offset: int, reader: Callable[[], Any]) -> Any:
+        """Результат reader(), согласованный с seqlock по смещению offset"""
+        while True:
+            version = VERSION.unpack_from(self.buf, offset)[0]
+            if version & 1:
+                time.sleep(0)
+                continue
+            try:
+                result = reader()
+            except Exception:
+                # недописанная запись может не разбираться (обрезанный UTF-8)
+                if VERSION.unpack_from(self.buf, offset)[0] == version:
+                    raise
+                continue
+            if VERSION.unpack_from(self.buf, offset)[0] == version:
+                return result
+
+    def close(self) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Удалить сегмент из системы (данные пропадут для всех процессов)"""
+        # unlink снимает регистрацию в resource_tracker, снятую в __init__
+        resource_tracker.register(self.shm._name, "shared_memory")  # type: ignore[attr-defined]
+        self.shm.unlink()
+
+
+class SharedMemoryItemStorage:
+    """`ItemStorage` в shared memory: один каталог на все воркеры uvicorn.
+
+    Сегмент: заголовок, `capacity` записей товаров фиксированного размера и
+    общий индекс цен - номера записей, отсортированные по (цена, id). Id
+    товара - номер записи + 1, так что отдельный индекс по id не нужен.
+    Вместимость задается при создании сегмента и дальше не меняется.
+    """
+
+    # magic, capacity, count, версия индекса цен
+    HEADER = struct.Struct("<QQQQ")
+    # версия, цена, удален, длина имени, имя
+    RECORD = struct.Struct(f"<QdBH{NAME_SIZE}s")
+    # для сканирования: только цена и флаг удаления, без копирования имен
+    SCAN = struct.Struct(f"<8xdB{2 + NAME_SIZE}x")
+
+    def __init__(self, name: str = "shop_api_items", capacity: int = 100_000):
+        self.segment = SharedSegment(name, self._size, capacity)
+        self.capacity = self.segment.capacity
+        self._records = self.HEADER.size
+        self._index = self._records + self.capacity * self.RECORD.size
+        self.price_order = self.segment.buf[self._index : self._index + self.capacity * 8].cast("q")
+
+    @classmethod
+    def _size(cls, capacity: int) -> int:
+        return cls.HEADER.size + capacity * (cls.RECORD.size + 8)
+
+    @property
+    def count(self) -> int:
+        return COUNTER.unpack_from(self.segment.buf, 16)[0]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _offset(self, slot: int) -> int:
+        return self._records + slot * self.RECORD.size
+
+    def _price(self, slot: int) -> float:
+        return PRICE.unpack_from(self.segment.buf, self._offset(slot) + 8)[0]
+
+    def _price_key(self, slot: int) -> tuple[float, int]:
+        return self._price(slot), slot
+
+    def _read(self, slot: int) -> Item:
+        offset = self._offset(slot)
+        _, price, deleted, name_length, name = self.segment.read(
+            offset, lambda: self.RECORD.unpack_from(self.segment.buf, offset)
+        )
+        return Item(id=slot + 1, name=name[:name_length].decode(), price=price, deleted=bool(deleted))
+
+    def _write(self, slot: int, name: Optional[bytes], price: float, deleted: bool) -> None:
+        offset = self._offset(slot)
+        version = self.segment.begin(offset)
+        if name is None:
+            PRICE.pack_into(self.segment.buf, offset + 8, price)
+            self.segment.buf[offset + 16] = deleted
+        else:
+            self.RECORD.pack_into(self.segment.buf, offset, version, price, deleted, len(name), name)
+        self.segment.end(offset, version)
+
+    def _reindex(self, slot: int, old_price: Optional[float], price: float) -> None:
+        """Перенос записи в индексе цен (old_price=None - новая запись)"""
+        count, order = self.count, self.price_order
+        version = self.segment.begin(24)
+        if old_price is not None:
+            position = bisect_left(order, (old_price, slot), 0, count, key=self._price_key)
+            order[position : count - 1] = order[position + 1 : count]
+            count -= 1
+        self._write(slot, None, price, bool(self.segment.buf[self._offset(slot) + 16]))
+        position = bisect_right(order, (price, slot), 0, count, key=self._price_key)
+        order[position + 1 : count + 1] = order[position:count]
+        order[position] = slot
+        self.segment.end(24, version)
+
+    def _slot(self, item_id: int) -> Optional[int]:
+        slot = item_id - 1
+        return slot if 0 <= slot < self.count else None
+
+    def _add(self, encoded: bytes, price: float) -> int:
+        """Новая запись, вызывается под блокировкой записи"""
+        slot = self.count
+        if slot >= self.capacity:
+            raise CapacityError("Shared item storage is full")
+        self._write(slot, encoded, price, False)
+        self._reindex(slot, None, price)
+        # публикуем запись последней: читатели видят только готовые
+        COUNTER.pack_into(self.segment.buf, 16, slot + 1)
+        return slot
+
+    def _replace(self, slot: int, encoded: bytes, price: float) -> None:
+        old_price = self._price(slot)
+        self._write(slot, encoded, old_price, False)
+        self._reindex(slot, old_price, price)
+
+    def add_new_item(self, name: str, price: float) -> Item:
+        encoded = _encode_name(name)
+        with self.segment.write():
+            slot = self._add(encoded, price)
+        return Item(id=slot + 1, name=name, price=price)
+
+    def get_item(self, item_id: int) -> Optional[Item]:
+        slot = self._slot(item_id)
+        return None if slot is None else self._read(slot)
+
+    def get_items(self, item_ids: Iterable[int]) -> dict[int, Item]:
+        slots = {item_id: self._slot(item_id) for item_id in item_ids}
+        return {item_id: self._read(slot) for item_id, slot in slots.items() if slot is not None}
+
+    def upsert_items(self, entries: Sequence[tuple[Optional[int], str, float]]) -> list[Optional[Item]]:
+        """См. `ItemStorage.upsert_items`; весь список - под одной блокировкой"""
+        encoded = [_encode_name(name) for _, name, _ in entries]
+        results: list[Optional[Item]] = []
+        with self.segment.write():
+            for (item_id, name, price), name_bytes in zip(entries, encoded):
+                slot = None if item_id is None else self._slot(item_id)
+                if item_id is None:
+                    slot = self._add(name_bytes, price)
+                elif slot is None:
+                    results.append(None)
+                    continue
+                else:
+                    self._replace(slot, name_bytes, price)
+                results.append(Item(id=slot + 1, name=name, price=price))
+        return results
+
+    def replace_item(self, item_id: int, name: str, price: float) -> Item:
+        encoded = _encode_name(name)
+        with self.segment.write():
+            slot = self._slot(item_id)
+            if slot is None:
+                raise ValueError("Item not found")
+            self._replace(slot, encoded, price)
+        return Item(id=item_id, name=name, price=price)
+
+    def update_item(self, item_id: int, name: Optional[str] = None, price: Optional[float] = None) -> Item:
+        encoded = None if name is None else _encode_name(name)
+        with self.segment.write():
+            slot = self._slot(item_id)
+            if slot is None:
+                raise ValueError("Item not found")
+            current = self._read(slot)
+            if encoded is not None:
+                self._write(slot, encoded, current.price, current.deleted)
+            if price is not None:
+                self._reindex(slot, current.price, price)
+        return self._read(slot)
+
+    def delete_item(self, item_id: int) -> None:
+        with self.segment.write():
+            slot = self._slot(item_id)
+            if slot is None:
+                raise ValueError("Item not found")
+            self._write(slot, None, self._price(slot), True)
+
+    def compact(self, carts: Any = None, limit: int = COMPACT_BATCH) -> int:
+        """id товара - номер его записи в сегменте, так что записи не
+        освобождаются: надгробие остается на месте и отсекается фильтром"""
+        return 0
+
+    def _matches(self, item: Item, min_price: Optional[float], max_price: Optional[float], show_deleted: bool) -> bool:
+        if not show_deleted and item.deleted:
+            return False
+        if min_price is not None and item.price < min_price:
+            return False
+        if max_price is not None and item.price > max_price:
+            return False
+        return True
+
+    def _scan(self, start: int, min_price: Optional[float], max_price: Optional[float], show_deleted: bool) -> Iterator[int]:
+        """Записи с номера start, прошедшие фильтры, по порядку id"""
+        count = self.count
+        with self.segment.buf[self._offset(start) : self._offset(count)] as records:
+            for slot, (price, deleted) in enumerate(self.SCAN.iter_unpack(records), start):
+                if deleted and not show_deleted:
+                    continue
+                if min_price is not None and price < min_price:
+                    continue
+                if max_price is not None and price > max_price:
+                    continue
+                yield slot
+
+    def _price_slots(
+        self, min_price: Optional[float], max_price: Optional[float], after: Optional[tuple[Any, ...]]
+    ) -> list[int]:
+        """Снимок окна индекса цен, согласованный с его seqlock"""
+        def window() -> list[int]:
+            count, order = self.count, self.price_order
+            lower = 0 if min_price is None else bisect_left(order, min_price, 0, count, key=self._price)
+            upper = count if max_price is None else bisect_right(order, max_price, 0, count, key=self._price)
+            if after is not None:
+                after_key = (after[0], after[1] - 1)
+                lower = max(lower, bisect_right(order, after_key, 0, count, key=self._price_key))
+            return order[lower:upper].tolist()
+
+        return self.segment.read(24, window)
+
+    def paginate_items_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+        order_by: str = "id",
+        after: Optional[tuple[Any, ...]] = None,
+        q: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> list[Item]:
+        """Страница товаров, параметры - как у `ItemStorage.paginate_items_filtered`.
+
+        Порядок по id - проход по записям через `struct.iter_unpack` без
+        блокировок, порядок по цене - снимок окна общего индекса цен. Целиком
+        перечитываются под seqlock только товары страницы; если запись за это
+        время перестала подходить под фильтр, страница будет короче.
+
+        Индексов имен в сегменте нет: `q` и `name_prefix` проверяются по
+        прочитанным записям.
+        """
+        if order_by == "price":
+            slots: Iterator[int] = iter(self._price_slots(min_price, max_price, after))
+            if not show_deleted:
+                buf = self.segment.buf
+                slots = (slot for slot in slots if not buf[self._offset(slot) + 16])
+        else:
+            slots = self._scan(0 if after is None else max(after[0], 0), min_price, max_price, show_deleted)
+        if q is not None or name_prefix is not None:
+            tokens = None if q is None else tokenize(q)
+            slots = (slot for slot in slots if name_matches(self._read(slot).name, tokens, name_prefix))
+
+        items = [self._read(slot) for slot in islice(slots, offset, offset + limit)]
+        return [item for item in items if self._matches(item, min_price, max_price, show_deleted)]
+
+    sort_key = staticmethod(ItemStorage.sort_key)
+
+    def close(self) -> None:
+        self.price_order.release()
+        self.segment.close()
+
+
+class SharedMemoryCartStorage:
+    """`CartStorage` в shared memory.
+
+    Корзина - запись фиксированного размера с суммой, количеством и ссылками
+    на первую и последнюю строку; строки корзин лежат в общей области и
+    связаны в список через `next`. Seqlock корзины покрывает и ее строки, а
+    половина его счетчика - версия корзины для If-Match.
+    """
+
+    # magic, capacity, count, число занятых строк
+    HEADER = struct.Struct("<QQQQ")
+    # версия, сумма, количество, первая строка, последняя строка
+    CART = struct.Struct("<Qdqqq")
+    # id товара, количество, цена, следующая строка, в наличии, длина имени, имя
+    LINE = struct.Struct(f"<qqdqBH{NAME_SIZE}s")
+    SCAN = struct.Struct("<8xdq16x")
+    # в среднем различных товаров на корзину, под них резервируются строки
+    LINES_PER_CART = 4
+
+    def __init__(self, name: str = "shop_api_carts", capacity: int = 100_000):
+        self.segment = SharedSegment(name, self._size, capacity)
+        self.capacity = self.segment.capacity
+        self.line_capacity = self.capacity * self.LINES_PER_CART
+        self._carts = self.HEADER.size
+        self._lines = self._carts + self.capacity * self.CART.size
+
+    @classmethod
+    def _size(cls, capacity: int) -> int:
+        return cls.HEADER.size + capacity * (cls.CART.size + cls.LINES_PER_CART * cls.LINE.size)
+
+    @property
+    def count(self) -> int:
+        return COUNTER.unpack_from(self.segment.buf, 16)[0]
+
+    def _offset(self, slot: int) -> int:
+        return self._carts + slot * self.CART.size
+
+    def _line_offset(self, line: int) -> int:
+        return self._lines + line * self.LINE.size
+
+    def _slot(self, cart_id: int) -> Optional[int]:
+        slot = cart_id - 1
+        return slot if 0 <= slot < self.count else None
+
+    def create_cart(self) -> int:
+        with self.segment.write():
+            slot = self.count
+            if slot >= self.capacity:
+                raise CapacityError("Shared cart storage is full")
+            self.CART.pack_into(self.segment.buf, self._offset(slot), 0, 0.0, 0, -1, -1)
+            COUNTER.pack_into(self.segment.buf, 16, slot + 1)
+        return slot + 1
+
+    def _load(self, slot: int) -> Cart:
+        buf, offset = self.segment.buf, self._offset(slot)
+
+        def load() -> Cart:
+            version, price, quantity, line, _ = self.CART.unpack_from(buf, offset)
+            cart = Cart(id=slot + 1, items={}, price=price, version=version // 2, quantity=quantity)
+            while line >= 0:
+                item_id, quantity, item_price, line, available, name_length, name = self.LINE.unpack_from(
+                    buf, self._line_offset(line)
+                )
+                cart.items[item_id] = CartItem(
+                    id=item_id,
+                    name=name[:name_length].decode(),
+                    quantity=quantity,
+                    available=bool(available),
+                    is_in_stock=bool(available),
+                    price=item_price,
+                )
+            return cart
+
+        return self.segment.read(offset, load)
+
+    def get_cart(self, cart_id: int) -> Optional[Cart]:
+        slot = self._slot(cart_id)
+        return None if slot is None else self._load(slot)
+
+    def add_item_to_cart(self, cart_id: int, item: Item, expected_version: Optional[int] = None) -> CartItem:
+        return self.add_items_to_cart(cart_id, [(item, 1)], expected_version).items[item.id]
+
+    def _line(self, first: int, item_id: int) -> int:
+        """Строка товара в списке корзины или -1"""
+        buf, line = self.segment.buf, first
+        while line >= 0 and COUNTER.unpack_from(buf, self._line_offset(line))[0] != item_id:
+            line = COUNTER.unpack_from(buf, self._line_offset(line) + 24)[0]
+        return line
+
+    def add_items_to_cart(
+        self,
+        cart_id: int,
+        quantities: Sequence[tuple[Item, int]],
+        expected_version: Optional[int] = None,
+    ) -> Cart:
+        """См. `CartStorage.add_items_to_cart`; одно изменение под seqlock корзины"""
+        names = {item.id: _encode_name(item.name) for item, _ in quantities}
+        buf = self.segment.buf
+        with self.segment.write():
+            slot = self._slot(cart_id)
+            if slot is None:
+                raise KeyError(cart_id)
+            offset = self._offset(slot)
+            version, price, quantity, first, last = self.CART.unpack_from(buf, offset)
+            if expected_version is not None and version // 2 != expected_version:
+                raise CartVersionConflict(cart_id, version // 2)
+
+            free = COUNTER.unpack_from(buf, 24)[0]
+            new_items = {item.id for item, _ in quantities if self._line(first, item.id) < 0}
+            if free + len(new_items) > self.line_capacity:
+                raise CapacityError("Shared cart storage has no free cart lines")
+
+            version = self.segment.begin(offset)
+            for item, item_quantity in quantities:
+                line = self._line(first, item.id)
+                if line < 0:
+                    # новая строка дописывается целиком до того, как на нее сошлются
+                    line, free = free, free + 1
+                    encoded = names[item.id]
+                    self.LINE.pack_into(
+                        buf, self._line_offset(line), item.id, 0, item.price, -1, not item.deleted, len(encoded), encoded
+                    )
+                    if last >= 0:
+                        COUNTER.pack_into(buf, self._line_offset(last) + 24, line)
+                    first, last = (line if first < 0 else first), line
+                    COUNTER.pack_into(buf, 24, free)
+                line_offset = self._line_offset(line) + 8
+                COUNTER.pack_into(buf, line_offset, COUNTER.unpack_from(buf, line_offset)[0] + item_quantity)
+                price += item.price * item_quantity
+                quantity += item_quantity
+            self.CART.pack_into(buf, offset, version, price, quantity, first, last)
+            self.segment.end(offset, version)
+
+        return self._load(slot)
+
+    def expire(self, limit: int = EXPIRE_BATCH) -> int:
+        """id корзины - номер ее записи в сегменте, а строки связаны списком
+        без освобождения, так что корзины не удаляются и TTL не действует"""
+        return 0
+
+    def refresh_items(self, items: Iterable[Item]) -> int:
+        """См. `CartStorage.refresh_items`.
+
+        Обратный индекс переменного размера в сегмент не помещается, поэтому
+        строки ищутся проходом по всем корзинам - O(всех строк); seqlock
+        открывается только у корзин, которые действительно меняются.
+        """
+        updates = {item.id: (item, _encode_name(item.name)) for item in items}
+        buf, changed = self.segment.buf, 0
+        with self.segment.write():
+            for slot in range(self.count):
+                offset = self._offset(slot)
+                version, price, quantity, first, last = self.CART.unpack_from(buf, offset)
+                stale, line = [], first
+                while line >= 0:
+                    item_id, line_quantity, line_price, next_line, available, name_length, name = self.LINE.unpack_from(
+                        buf, self._line_offset(line)
+                    )
+                    if item_id in updates:
+                        item, encoded = updates[item_id]
+                        if (line_price, bool(available), name[:name_length]) != (item.price, not item.deleted, encoded):
+                            stale.append((line, line_quantity, line_price, next_line, item, encoded))
+                    line = next_line
+                if not stale:
+                    continue
+
+                version = self.segment.begin(offset)
+                for line, line_quantity, line_price, next_line, item, encoded in stale:
+                    self.LINE.pack_into(
+                        buf,
+                        self._line_offset(line),
+                        item.id,
+                        line_quantity,
+                        item.price,
+                        next_line,
+                        not item.deleted,
+                        len(encoded),
+                        encoded,
+                    )
+                    price += (item.price - line_price) * line_quantity
+                self.CART.pack_into(buf, offset, version, price, quantity, first, last)
+                self.segment.end(offset, version)
+                changed += 1
+        return changed
+
+    def paginate_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> list[Cart]:
+        def slots() -> Iterator[int]:
+            start, count = (0 if after is None else max(after, 0)), self.count
+            with self.segment.buf[self._offset(start) : self._offset(count)] as carts:
+                for slot, (price, quantity) in enumerate(self.SCAN.iter_unpack(carts), start):
+                    if min_price is not None and price < min_price:
+                        continue
+                    if max_price is not None and price > max_price:
+                        continue
+                    if min_quantity is not None and quantity < min_quantity:
+                        continue
+                    if max_quantity is not None and quantity > max_quantity:
+                        continue
+                    yield slot
+
+        return [self._load(slot) for slot in islice(slots(), offset, offset + limit)]
+
+    def close(self) -> None:
+        self.segment.close()
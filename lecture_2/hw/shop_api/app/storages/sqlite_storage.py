@@ -0,0 +1,433 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import EXPIRE_BATCH, Cart, CartItem, CartVersionConflict
+from lecture_2.hw.shop_api.app.storages.item_storage import COMPACT_BATCH, Item, ItemStorage
+from lecture_2.hw.shop_api.app.storages.text_index import MAX_CHAR, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    -- AUTOINCREMENT: id убранного `compact` товара не выдается повторно
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_price ON items (price, id);
+CREATE INDEX IF NOT EXISTS items_deleted ON items (id) WHERE deleted = 1;
+CREATE INDEX IF NOT EXISTS items_name ON items (casefold(name));
+CREATE TABLE IF NOT EXISTS item_tokens (
+    token TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (token, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS item_tokens_item ON item_tokens (item_id);
+CREATE TABLE IF NOT EXISTS carts (
+    -- AUTOINCREMENT: id удаленной (истекшей) корзины не выдается повторно
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    price REAL NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    accessed_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS carts_price ON carts (price, id);
+CREATE INDEX IF NOT EXISTS carts_quantity ON carts (quantity, id);
+CREATE INDEX IF NOT EXISTS carts_accessed ON carts (accessed_at);
+CREATE TABLE IF NOT EXISTS cart_items (
+    cart_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    available INTEGER NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (cart_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS cart_items_item ON cart_items (item_id);
+"""
+
+# sqlite3 кэширует подготовленные выражения по тексту SQL, поэтому все
+# запросы ниже - константы (или собираются из конечного набора фрагментов)
+CACHED_STATEMENTS = 256
+
+# id в одном `IN (...)`: целые пачки дают один и тот же текст запроса
+IN_CHUNK = 256
+
+
+class SQLiteDatabase:
+    """Файл SQLite в режиме WAL: один писатель и пул читателей.
+
+    WAL позволяет читать параллельно с записью, так что читатели берут
+    соединение из пула, а все изменения идут через единственное соединение
+    писателя под блокировкой. Методы блокирующие - вызывать их из потоков
+    (см. `Storages.run`), а не из event loop.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self.writer = self._connect()
+        self.writer.executescript(SCHEMA)
+        self._write_lock = threading.Lock()
+        self._readers: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(self._connect())
+        self.readers = readers
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            isolation_level=None,  # транзакции открываем явно
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        # в WAL synchronous=NORMAL не теряет целостность, только последние
+        # транзакции при отключении питания
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        # индекс items_name построен по casefold, поэтому функция нужна каждому
+        # соединению - и тому, что пишет, и тому, что ищет по префиксу
+        connection.create_function("casefold", 1, str.casefold, deterministic=True)
+        return connection
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            # IMMEDIATE сразу берет блокировку записи - важно при нескольких воркерах
+            self.writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.writer
+            except BaseException:
+                self.writer.execute("ROLLBACK")
+                raise
+            self.writer.execute("COMMIT")
+
+    def close(self) -> None:
+        self.writer.close()
+        for _ in range(self.readers):
+            self._readers.get().close()
+
+
+def _item(row: tuple[Any, ...]) -> Item:
+    return Item(id=row[0], name=row[1], price=row[2], deleted=bool(row[3]))
+
+
+def _index_name(connection: sqlite3.Connection, item_id: int, name: str, replace: bool = True) -> None:
+    """Слова имени товара в item_tokens (вызывать в транзакции записи)"""
+    if replace:
+        connection.execute("DELETE FROM item_tokens WHERE item_id = ?", (item_id,))
+    connection.executemany(
+        "INSERT INTO item_tokens (token, item_id) VALUES (?, ?)", [(token, item_id) for token in tokenize(name)]
+    )
+
+
+class SQLiteItemStorage:
+    """`ItemStorage` поверх SQLite: тот же интерфейс, id выдает сама база"""
+
+    def __init__(self, database: SQLiteDatabase):
+        self.database = database
+
+    def add_new_item(self, name: str, price: float) -> Item:
+        with self.database.write() as connection:
+            cursor = connection.execute("INSERT INTO items (name, price) VALUES (?, ?)", (name, price))
+            _index_name(connection, cursor.lastrowid, name, replace=False)
+        return Item(id=cursor.lastrowid, name=name, price=price)
+
+    def get_item(self, item_id: int) -> Optional[Item]:
+        with self.database.read() as connection:
+            row = connection.execute("SELECT id, name, price, deleted FROM items WHERE id = ?", (item_id,)).fetchone()
+        return None if row is None else _item(row)
+
+    def get_items(self, item_ids: Iterable[int]) -> dict[int, Item]:
+        item_ids = iter(item_ids)
+        items = {}
+        with self.database.read() as connection:
+            while chunk := tuple(islice(item_ids, IN_CHUNK)):
+                placeholders = ",".join("?" * len(chunk))
+                for row in connection.execute(
+                    f"SELECT id, name, price, deleted FROM items WHERE id IN ({placeholders})", chunk
+                ):
+                    items[row[0]] = _item(row)
+        return items
+
+    def upsert_items(self, entries: Sequence[tuple[Optional[int], str, float]]) -> list[Optional[Item]]:
+        """См. `ItemStorage.upsert_items`; весь список - одна транзакция"""
+        results: list[Optional[Item]] = []
+        with self.database.write() as connection:
+            for item_id, name, price in entries:
+                if item_id is None:
+                    cursor = connection.execute("INSERT INTO items (name, price) VALUES (?, ?)", (name, price))
+                    _index_name(connection, cursor.lastrowid, name, replace=False)
+                    results.append(Item(id=cursor.lastrowid, name=name, price=price))
+                    continue
+                cursor = connection.execute(
+                    "UPDATE items SET name = ?, price = ?, deleted = 0 WHERE id = ?", (name, price, item_id)
+                )
+                if cursor.rowcount:
+                    _index_name(connection, item_id, name)
+                results.append(Item(id=item_id, name=name, price=price) if cursor.rowcount else None)
+        return results
+
+    def replace_item(self, item_id: int, name: str, price: float) -> Item:
+        with self.database.write() as connection:
+            cursor = connection.execute(
+                "UPDATE items SET name = ?, price = ?, deleted = 0 WHERE id = ?", (name, price, item_id)
+            )
+            if cursor.rowcount == 0:
+                raise ValueError("Item not found")
+            _index_name(connection, item_id, name)
+        return Item(id=item_id, name=name, price=price)
+
+    def update_item(self, item_id: int, name: Optional[str] = None, price: Optional[float] = None) -> Item:
+        with self.database.write() as connection:
+            row = connection.execute(
+                "UPDATE items SET name = coalesce(?, name), price = coalesce(?, price) WHERE id = ?"
+                " RETURNING id, name, price, deleted",
+                (name, price, item_id),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Item not found")
+            if name is not None:
+                _index_name(connection, item_id, name)
+        return _item(row)
+
+    def delete_item(self, item_id: int) -> None:
+        with self.database.write() as connection:
+            cursor = connection.execute("UPDATE items SET deleted = 1 WHERE id = ?", (item_id,))
+            if cursor.rowcount == 0:
+                raise ValueError("Item not found")
+
+    def compact(self, carts: Any = None, limit: int = COMPACT_BATCH) -> int:
+        """См. `ItemStorage.compact`; корзины лежат в той же базе, так что
+        ссылки проверяет сам запрос (`carts` - для единого интерфейса)"""
+        with self.database.write() as connection:
+            dropped = connection.execute(
+                "DELETE FROM items WHERE id IN (SELECT id FROM items WHERE deleted = 1 AND NOT EXISTS"
+                " (SELECT 1 FROM cart_items WHERE item_id = items.id) LIMIT ?) RETURNING id",
+                (limit,),
+            ).fetchall()
+            connection.executemany("DELETE FROM item_tokens WHERE item_id = ?", dropped)
+        return len(dropped)
+
+    def paginate_items_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        show_deleted: bool = False,
+        order_by: str = "id",
+        after: Optional[tuple[Any, ...]] = None,
+        q: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> list[Item]:
+        """Страница товаров, параметры - как у `ItemStorage.paginate_items_filtered`.
+
+        Условия по цене и курсору - диапазоны по индексу `items_price` или
+        первичному ключу, так что SQLite не сканирует таблицу. Префикс имени -
+        диапазон по индексу `items_name`, слова `q` - поиск в `item_tokens`.
+        """
+        conditions, params = [], []
+        if q is not None:
+            tokens = tokenize(q)
+            if not tokens:
+                return []
+            for token in sorted(tokens):
+                conditions.append("id IN (SELECT item_id FROM item_tokens WHERE token = ?)")
+                params.append(token)
+        if name_prefix is not None:
+            prefix = name_prefix.casefold()
+            conditions.append("casefold(name) >= ? AND casefold(name) < ?")
+            params.extend((prefix, prefix + MAX_CHAR))
+        if not show_deleted:
+            conditions.append("deleted = 0")
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+        if after is not None:
+            conditions.append("(price, id) > (?, ?)" if order_by == "price" else "id > ?")
+            params.extend(after)
+
+        sql = "SELECT id, name, price, deleted FROM items"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY price, id" if order_by == "price" else " ORDER BY id"
+        sql += " LIMIT ? OFFSET ?"
+
+        with self.database.read() as connection:
+            rows = connection.execute(sql, (*params, limit, offset)).fetchall()
+        return [_item(row) for row in rows]
+
+    sort_key = staticmethod(ItemStorage.sort_key)
+
+
+class SQLiteCartStorage:
+    """`CartStorage` поверх SQLite; количество и сумма корзины хранятся в carts.
+
+    Время обращения обновляется только при записи: чтение идет через пул
+    читателей и писать в базу не должно. Поэтому ttl здесь - время с
+    последнего изменения корзины, а часы - настенные (`time.time`), общие
+    для всех воркеров.
+    """
+
+    def __init__(
+        self,
+        database: SQLiteDatabase,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.database = database
+        self.ttl = ttl
+        self.clock = clock
+
+    def create_cart(self) -> int:
+        with self.database.write() as connection:
+            return connection.execute("INSERT INTO carts (accessed_at) VALUES (?)", (self.clock(),)).lastrowid
+
+    def _load(self, connection: sqlite3.Connection, rows: list[tuple[Any, ...]]) -> list[Cart]:
+        carts = {
+            cart_id: Cart(id=cart_id, items={}, price=price, version=version, quantity=quantity)
+            for cart_id, price, version, quantity in rows
+        }
+        if not carts:
+            return []
+        placeholders = ",".join("?" * len(carts))
+        for cart_id, item_id, name, quantity, available, price in connection.execute(
+            "SELECT cart_id, item_id, name, quantity, available, price FROM cart_items"
+            f" WHERE cart_id IN ({placeholders}) ORDER BY rowid",
+            tuple(carts),
+        ):
+            carts[cart_id].items[item_id] = CartItem(
+                id=item_id,
+                name=name,
+                quantity=quantity,
+                available=bool(available),
+                is_in_stock=bool(available),
+                price=price,
+            )
+        return list(carts.values())
+
+    def get_cart(self, cart_id: int) -> Optional[Cart]:
+        with self.database.read() as connection:
+            rows = connection.execute("SELECT id, price, version, quantity FROM carts WHERE id = ?", (cart_id,)).fetchall()
+            carts = self._load(connection, rows)
+        return carts[0] if carts else None
+
+    def add_item_to_cart(self, cart_id: int, item: Item, expected_version: Optional[int] = None) -> CartItem:
+        return self.add_items_to_cart(cart_id, [(item, 1)], expected_version).items[item.id]
+
+    def add_items_to_cart(
+        self,
+        cart_id: int,
+        quantities: Sequence[tuple[Item, int]],
+        expected_version: Optional[int] = None,
+    ) -> Cart:
+        """См. `CartStorage.add_items_to_cart`; одна транзакция на все товары"""
+        price = sum(item.price * quantity for item, quantity in quantities)
+        total_quantity = sum(quantity for _, quantity in quantities)
+        with self.database.write() as connection:
+            # транзакция писателя уже держит блокировку, так что проверка версии
+            # и обновление атомарны и между воркерами
+            row = connection.execute(
+                "UPDATE carts SET price = price + ?, quantity = quantity + ?, version = version + 1,"
+                " accessed_at = ? WHERE id = ? RETURNING id, price, version, quantity",
+                (price, total_quantity, self.clock(), cart_id),
+            ).fetchone()
+            if row is None:
+                raise KeyError(cart_id)
+            if expected_version is not None and row[2] != expected_version + 1:
+                raise CartVersionConflict(cart_id, row[2] - 1)
+            connection.executemany(
+                "INSERT INTO cart_items (cart_id, item_id, name, quantity, available, price)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (cart_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+                [
+                    (cart_id, item.id, item.name, quantity, not item.deleted, item.price)
+                    for item, quantity in quantities
+                ],
+            )
+            return self._load(connection, [row])[0]
+
+    def expire(self, limit: int = EXPIRE_BATCH) -> int:
+        """См. `CartStorage.expire`; просроченные корзины - начало индекса
+        carts_accessed, так что запрос не смотрит на живые"""
+        if self.ttl is None:
+            return 0
+        with self.database.write() as connection:
+            expired = connection.execute(
+                "DELETE FROM carts WHERE id IN (SELECT id FROM carts WHERE accessed_at <= ?"
+                " ORDER BY accessed_at LIMIT ?) RETURNING id",
+                (self.clock() - self.ttl, limit),
+            ).fetchall()
+            connection.executemany("DELETE FROM cart_items WHERE cart_id = ?", expired)
+        return len(expired)
+
+    def refresh_items(self, items: Iterable[Item]) -> int:
+        """См. `CartStorage.refresh_items`; строки товара находит индекс
+        cart_items_item, все изменения - одна транзакция"""
+        changed: set[int] = set()
+        with self.database.write() as connection:
+            for item in items:
+                stale = "item_id = ? AND (name <> ? OR price <> ? OR available <> ?)"
+                params = (item.id, item.name, item.price, not item.deleted)
+                # сначала сумма корзин - по старой цене строки
+                changed.update(
+                    cart_id
+                    for (cart_id,) in connection.execute(
+                        "UPDATE carts SET version = version + 1, price = price + (SELECT quantity * (? - price)"
+                        " FROM cart_items WHERE cart_id = carts.id AND item_id = ?)"
+                        f" WHERE id IN (SELECT cart_id FROM cart_items WHERE {stale}) RETURNING id",
+                        (item.price, item.id, *params),
+                    ).fetchall()
+                )
+                connection.execute(
+                    f"UPDATE cart_items SET name = ?, price = ?, available = ? WHERE {stale}",
+                    (item.name, item.price, not item.deleted, *params),
+                )
+        return len(changed)
+
+    def paginate_filtered(
+        self,
+        offset: int = 0,
+        limit: int = 10,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> list[Cart]:
+        conditions, params = [], []
+        for condition, value in (
+            ("price >= ?", min_price),
+            ("price <= ?", max_price),
+            ("quantity >= ?", min_quantity),
+            ("quantity <= ?", max_quantity),
+            ("id > ?", after),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        sql = "SELECT id, price, version, quantity FROM carts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id LIMIT ? OFFSET ?"
+
+        with self.database.read() as connection:
+            rows = connection.execute(sql, (*params, limit, offset)).fetchall()
+            return self._load(connection, rows)
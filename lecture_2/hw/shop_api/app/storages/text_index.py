@@ -0,0 +1,87 @@
+import re
+from typing import Iterable, Iterator, Optional
+
+from lecture_2.hw.shop_api.app.storages.indexes import SortedIndex
+
+_TOKEN = re.compile(r"\w+")
+
+# больше любого символа: [prefix, prefix + MAX_CHAR] - все строки с префиксом
+MAX_CHAR = "\U0010ffff"
+
+
+def tokenize(text: str) -> set[str]:
+    """Слова текста без учета регистра"""
+    return set(_TOKEN.findall(text.casefold()))
+
+
+def name_matches(name: str, tokens: Optional[set[str]], prefix: Optional[str]) -> bool:
+    """Проверка одного имени - для хранилищ без индексов.
+
+    Как и `TokenIndex.ids`, запрос без слов не находит ничего.
+    """
+    if prefix is not None and not name.casefold().startswith(prefix.casefold()):
+        return False
+    return tokens is None or bool(tokens) and tokens <= tokenize(name)
+
+
+class TokenIndex:
+    """Инвертированный индекс: слово -> множество id с этим словом в имени"""
+
+    def __init__(self) -> None:
+        self._postings: dict[str, set[int]] = {}
+
+    def add(self, entity_id: int, text: str) -> None:
+        for token in tokenize(text):
+            self._postings.setdefault(token, set()).add(entity_id)
+
+    def remove(self, entity_id: int, text: str) -> None:
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(entity_id)
+                if not postings:
+                    del self._postings[token]
+
+    def count(self, tokens: set[str]) -> int:
+        """Верхняя оценка числа совпадений без пересечения: самый редкий список"""
+        return min((len(self._postings.get(token, ())) for token in tokens), default=0)
+
+    def ids(self, tokens: set[str]) -> set[int]:
+        """id, в имени которых есть все слова; пересечение от самого редкого"""
+        postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+        if not postings:
+            return set()
+        return postings[0].intersection(*postings[1:])
+
+
+class PrefixIndex:
+    """Поиск по префиксу имени без учета регистра.
+
+    Это «сплющенный» префиксный trie: имена отсортированы, так что все имена
+    с префиксом лежат подряд и находятся двумя бинарными поисками - O(log n)
+    без словаря на каждый узел дерева.
+    """
+
+    def __init__(self) -> None:
+        self._index = SortedIndex()
+
+    def add(self, entity_id: int, name: str) -> None:
+        self._index.add(name.casefold(), entity_id)
+
+    def add_many(self, entries: Iterable[tuple[int, str]]) -> None:
+        self._index.add_many((name.casefold(), entity_id) for entity_id, name in entries)
+
+    def remove(self, entity_id: int, name: str) -> None:
+        self._index.remove(name.casefold(), entity_id)
+
+    def remove_many(self, entries: Iterable[tuple[int, str]]) -> None:
+        self._index.remove_many({(name.casefold(), entity_id) for entity_id, name in entries})
+
+    def count(self, prefix: str) -> int:
+        prefix = prefix.casefold()
+        return self._index.count(prefix, prefix + MAX_CHAR)
+
+    def ids(self, prefix: str) -> Iterator[int]:
+        """id в порядке имен, лениво"""
+        prefix = prefix.casefold()
+        return self._index.ids(prefix, prefix + MAX_CHAR)
@@ -0,0 +1,46 @@
+import time
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def scan(carts: CartStorage) -> int:
+    """Без очереди сроков: каждый такт проверяет все корзины"""
+    now = carts.clock()
+    return sum(1 for cart in carts.carts.values() if cart.accessed_at + carts.ttl <= now)
+
+
+def main(total: int = 1_000_000, expiring: int = 1_000) -> None:
+    """total корзин, созданных равномерно за ttl; за такт истекают expiring"""
+    clock = Clock()
+    ttl = total / expiring
+    carts = CartStorage(ttl=ttl, clock=clock)
+    for _ in range(total):
+        carts.create_cart()
+        clock.now += 1 / expiring
+    print(f"{total} carts, ttl {ttl:.0f} s, ~{expiring} expire per tick\n")
+    print(f"  {'tick':<8}{'expired':>10}{'timing wheel, ms':>20}{'full scan, ms':>16}")
+
+    for tick in range(5):
+        clock.now += 1
+        started = time.perf_counter()
+        scan(carts)
+        scan_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        expired = carts.expire(limit=total)
+        wheel_ms = (time.perf_counter() - started) * 1000
+        # очередь отстает от точного срока не больше чем на такт своей корзины
+        print(f"  {tick:<8}{expired:>10}{wheel_ms:>20.2f}{scan_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.cart_expiry [carts] [expiring]
+    main(*(int(arg) for arg in argv[1:3]))
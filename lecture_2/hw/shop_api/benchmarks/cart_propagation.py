@@ -0,0 +1,51 @@
+import random
+import time
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import Item, ItemStorage
+
+
+def rescan(carts: CartStorage, item: Item) -> int:
+    """Без обратного индекса: корзины с товаром ищутся проходом по всем
+    корзинам, дальше - те же обновления строк, сумм и индекса цен"""
+    holders = {cart.id for cart in carts.carts.values() if item.id in cart.items}
+    reverse_index, carts.item_carts = carts.item_carts, {item.id: holders}
+    try:
+        return carts.refresh_items([item])
+    finally:
+        carts.item_carts = reverse_index
+
+
+def timed(func, *args) -> tuple[float, int]:
+    started = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main(total: int = 100_000, lines: int = 8) -> None:
+    """total корзин по ~lines товаров; «популярные» товары лежат в доле корзин"""
+    rng = random.Random(0)
+    items, carts = ItemStorage(), CartStorage()
+    shares = [1 / total, 0.01, 0.1, 1.0]
+    popular = [items.add_new_item(f"in {share:.0%} of carts", 10.0) for share in shares]
+    catalog = [items.add_new_item(f"item {i}", float(rng.randint(1, 100))) for i in range(10_000)]
+    for i in range(total):
+        cart_id = carts.create_cart()
+        chosen = [item for item, share in zip(popular, shares) if i % round(1 / share) == 0]
+        carts.add_items_to_cart(cart_id, [(item, 1) for item in chosen + rng.sample(catalog, lines - len(chosen))])
+    print(f"{total} carts x {lines} lines\n")
+    print(f"  {'change':<24}{'carts':>8}{'reverse index, ms':>20}{'rescan, ms':>14}")
+
+    for item in popular:
+        price = item.price
+        items.update_item(item.id, price=price + 1)
+        indexed, changed = timed(carts.refresh_items, [items.get_item(item.id)])
+        items.update_item(item.id, price=price + 2)
+        scanned, _ = timed(rescan, carts, items.get_item(item.id))
+        print(f"  {item.name:<24}{changed:>8}{indexed:>20.2f}{scanned:>14.2f}")
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.cart_propagation [carts] [lines]
+    main(*(int(arg) for arg in argv[1:3]))
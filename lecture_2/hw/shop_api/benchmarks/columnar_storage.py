@@ -0,0 +1,64 @@
+import random
+import time
+import tracemalloc
+from sys import argv
+from typing import Any, Callable
+
+from lecture_2.hw.shop_api.app.storages.columnar_item_storage import ColumnarItemStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+
+def queries(total: int) -> list[tuple[str, dict[str, Any]]]:
+    """(название, аргументы paginate_items_filtered)"""
+    return [
+        ("first page", {}),
+        ("deep page (offset)", {"offset": total // 2}),
+        ("narrow price window", {"min_price": 500.0, "max_price": 501.0}),
+        ("wide price window", {"min_price": 100.0, "max_price": 900.0, "offset": total // 2}),
+        ("by price, show_deleted", {"order_by": "price", "show_deleted": True, "offset": 1000}),
+    ]
+
+
+def fill(storage: Any, total: int) -> None:
+    rng = random.Random(0)
+    for i in range(total):
+        storage.add_new_item(f"item {i % 1000}", round(rng.uniform(1, 1000), 2))
+    for item_id in rng.sample(range(1, total + 1), total // 10):
+        storage.delete_item(item_id)
+
+
+def measure_memory(factory: Callable[[], Any], total: int) -> tuple[Any, int]:
+    tracemalloc.start()
+    storage = factory()
+    fill(storage, total)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return storage, current
+
+
+def latency(storage: Any, kwargs: dict[str, Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        storage.paginate_items_filtered(**{"limit": 10, **kwargs})
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(total: int = 1_000_000) -> None:
+    storages = {}
+    print(f"{total} items, 10% deleted")
+    for name, factory in [("ItemStorage", ItemStorage), ("ColumnarItemStorage", ColumnarItemStorage)]:
+        storage, used = measure_memory(factory, total)
+        storages[name] = storage
+        print(f"  {name:<20} {used / 2**20:>8.1f} MiB  ({used / total:.0f} B/item)")
+
+    print("\nlatency, ms (best of 5)")
+    print(f"  {'query':<26}" + "".join(f"{name:>22}" for name in storages))
+    for title, kwargs in queries(total):
+        print(f"  {title:<26}" + "".join(f"{latency(storage, kwargs):>22.2f}" for storage in storages.values()))
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.columnar_storage [total]
+    main(int(argv[1]) if len(argv) > 1 else 1_000_000)
@@ -0,0 +1,52 @@
+import tempfile
+import time
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.id_allocator import (
+    BlockIdAllocator,
+    FileBlockSource,
+    IdAllocator,
+)
+from lecture_2.hw.shop_api.app.storages.item_storage import Item, ItemStorage
+
+
+class MaxIdItemStorage(ItemStorage):
+    """Исходная схема: max(ids) + 1 на каждую вставку"""
+
+    def add_new_item(self, name: str, price: float) -> Item:
+        new_id = max(self.items.keys(), default=0) + 1
+        new_item = Item(id=new_id, name=name, price=price)
+        self.items[new_id] = new_item
+        return new_item
+
+
+def throughput(storage: ItemStorage, total: int, step: int) -> list[tuple[int, float]]:
+    """Вставки в секунду на каждом отрезке по step вставок"""
+    result = []
+    for size in range(step, total + 1, step):
+        started = time.perf_counter()
+        for i in range(step):
+            storage.add_new_item("item", 1.0)
+        result.append((size, step / (time.perf_counter() - started)))
+    return result
+
+
+def print_series(name: str, series: list[tuple[int, float]]) -> None:
+    print(f"\n{name}")
+    for size, rate in series:
+        print(f"  {size:>9} items: {rate:>12.0f} inserts/s")
+
+
+def main(total: int = 1_000_000) -> None:
+    legacy_total = min(total, 20_000)
+    print_series("max(ids) + 1", throughput(MaxIdItemStorage(), legacy_total, legacy_total // 5))
+    print_series("SequentialIdAllocator", throughput(ItemStorage(), total, total // 5))
+
+    with tempfile.NamedTemporaryFile() as counter:
+        allocator: IdAllocator = BlockIdAllocator(FileBlockSource(counter.name))
+        print_series("BlockIdAllocator(FileBlockSource)", throughput(ItemStorage(allocator), total, total // 5))
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.insert_throughput [total]
+    main(int(argv[1]) if len(argv) > 1 else 1_000_000)
@@ -0,0 +1,88 @@
+import random
+import string
+import time
+from sys import argv
+from typing import Any
+
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.text_index import name_matches, tokenize
+
+CHUNK = 100_000
+COMMON = "item"
+
+
+def vocabulary(rng: random.Random, size: int = 5_000) -> list[str]:
+    return sorted({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(size)})
+
+
+def fill(storage: ItemStorage, total: int, words: list[str], rng: random.Random) -> None:
+    # пачками через upsert_items: каждая пачка - одно слияние сортированных индексов;
+    # у половины товаров есть общее слово COMMON - для широких запросов
+    for start in range(0, total, CHUNK):
+        storage.upsert_items(
+            [
+                (None, " ".join([COMMON] * (rng.random() < 0.5) + rng.sample(words, 3)), round(rng.uniform(1, 1000), 2))
+                for _ in range(min(CHUNK, total - start))
+            ]
+        )
+
+
+def scan(storage: ItemStorage, limit: int = 10, **kwargs: Any) -> list[Any]:
+    """То, что раньше делал клиент: пройти весь каталог и отфильтровать"""
+    tokens = tokenize(kwargs["q"]) if "q" in kwargs else None
+    found = []
+    for item in storage.items.values():
+        if name_matches(item.name, tokens, kwargs.get("name_prefix")) and (
+            kwargs.get("min_price", 0) <= item.price <= kwargs.get("max_price", float("inf"))
+        ):
+            found.append(item)
+            if len(found) == limit:
+                break
+    return found
+
+
+def latency(func: Any, kwargs: dict[str, Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(limit=10, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(total: int = 1_000_000) -> None:
+    rng = random.Random(0)
+    words = vocabulary(rng)
+    storage = ItemStorage()
+    started = time.perf_counter()
+    fill(storage, total, words, rng)
+    print(f"{total} items, {len(words)} words: filled in {time.perf_counter() - started:.1f} s")
+
+    word, other = words[len(words) // 3], words[2 * len(words) // 3]
+    queries = [
+        (f"q={word}", {"q": word}),
+        (f"q={word} {other}", {"q": f"{word} {other}"}),
+        (f"name_prefix={word[:3]}", {"name_prefix": word[:3]}),
+        (f"name_prefix={word}", {"name_prefix": word}),
+        (f"q={word} + price window", {"q": word, "min_price": 100.0, "max_price": 200.0}),
+        (f"q={word}, order_by=price", {"q": word, "order_by": "price"}),
+        # широкие: совпадает половина каталога
+        (f"q={COMMON}", {"q": COMMON}),
+        (f"name_prefix={COMMON[:2]}", {"name_prefix": COMMON[:2]}),
+        (f"q={COMMON}, order_by=price", {"q": COMMON, "order_by": "price"}),
+        (f"q={COMMON}, after=(total // 2,)", {"q": COMMON, "after": (total // 2,)}),
+    ]
+
+    print("\nlatency, ms (best of 5)")
+    print(f"  {'query':<36}{'matches':>10}{'index':>10}{'scan':>10}")
+    for title, kwargs in queries:
+        matches = len(storage.paginate_items_filtered(limit=total, **kwargs))
+        indexed = latency(storage.paginate_items_filtered, kwargs)
+        scan_kwargs = {k: v for k, v in kwargs.items() if k not in ("order_by", "after")}
+        scanned = latency(lambda **args: scan(storage, **args), scan_kwargs)
+        print(f"  {title:<36}{matches:>10}{indexed:>10.3f}{scanned:>10.2f}")
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.name_search [total]
+    main(int(argv[1]) if len(argv) > 1 else 1_000_000)
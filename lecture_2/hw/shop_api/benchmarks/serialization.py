@@ -0,0 +1,66 @@
+import random
+import time
+from sys import argv
+from typing import List
+
+from pydantic import TypeAdapter
+
+from lecture_2.hw.shop_api.app.models import CartResponse, ItemResponse
+from lecture_2.hw.shop_api.app.serialization import encode_cart, encode_carts, encode_items
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+CART = TypeAdapter(CartResponse)
+CARTS = TypeAdapter(List[CartResponse])
+ITEMS = TypeAdapter(List[ItemResponse])
+
+
+def best(func, *args, repeat: int = 20) -> float:
+    result = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        result = min(result, time.perf_counter() - started)
+    return result * 1000
+
+
+def via_models(adapter: TypeAdapter, models) -> bytes:
+    """Прежний путь: модель на каждый объект, затем проверка и сериализация
+    по response_model, как в `fastapi.routing.serialize_response`"""
+    return adapter.dump_json(adapter.validate_python(models, from_attributes=True))
+
+
+def main(lines: int = 100, listing: int = 1000) -> None:
+    """Корзина из lines строк, списки из listing товаров и корзин"""
+    rng = random.Random(0)
+    items, carts = ItemStorage(), CartStorage()
+    catalog = [items.add_new_item(f"item {i}", round(rng.uniform(1, 1000), 2)) for i in range(max(lines, listing))]
+    big = carts.get_cart(carts.create_cart())
+    carts.add_items_to_cart(big.id, [(item, rng.randint(1, 5)) for item in catalog[:lines]])
+    small = [carts.get_cart(carts.create_cart()) for _ in range(listing)]
+    for cart in small:
+        carts.add_items_to_cart(cart.id, [(item, 1) for item in rng.sample(catalog, 3)])
+
+    cases = [
+        (f"cart, {lines} lines", lambda: via_models(CART, CartResponse.from_cart(big)), lambda: encode_cart(big)),
+        (
+            f"{listing} carts x 3 lines",
+            lambda: via_models(CARTS, [CartResponse.from_cart(cart) for cart in small]),
+            lambda: encode_carts(small),
+        ),
+        (
+            f"{listing} items",
+            lambda: via_models(ITEMS, [ItemResponse.from_item(item) for item in catalog[:listing]]),
+            lambda: encode_items(catalog[:listing]),
+        ),
+    ]
+    print(f"  {'response':<22}{'pydantic models, ms':>22}{'to_json, ms':>14}{'speedup':>10}")
+    for title, old, new in cases:
+        assert old() == new()
+        old_ms, new_ms = best(old), best(new)
+        print(f"  {title:<22}{old_ms:>22.3f}{new_ms:>14.3f}{old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.serialization [lines] [listing]
+    main(*(int(arg) for arg in argv[1:3]))
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+import threading
+import time
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.sharded_cart_storage import ShardedCartStorage
+
+
+def writer(carts, catalog, seconds: float, seed: int, done: list[int]) -> None:
+    """Создает корзины и кладет в них товары, пока не выйдет время"""
+    rng = random.Random(seed)
+    own: list[int] = []
+    operations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            if not own or rng.random() < 0.1:
+                own.append(carts.create_cart())
+            carts.add_items_to_cart(rng.choice(own), [(rng.choice(catalog), 1), (rng.choice(catalog), 2)])
+        operations += 100
+    done.append(operations)
+
+
+def throughput(carts, catalog, threads: int, seconds: float) -> float:
+    done: list[int] = []
+    workers = [threading.Thread(target=writer, args=(carts, catalog, seconds, seed, done)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(done) / seconds
+
+
+def main(seconds: float = 2.0) -> None:
+    """Записей в секунду в зависимости от числа потоков и шардов.
+
+    Под GIL байткод исполняет один поток, так что шарды убирают только
+    ожидание на общих блокировках; рост с числом потоков виден на
+    free-threaded сборке (python3.13t и новее).
+    """
+    items = ItemStorage()
+    catalog = [items.add_new_item(f"item {i}", float(i % 50 + 1)) for i in range(1000)]
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL {'on' if gil else 'off'}, {os.cpu_count()} CPUs\n")
+    thread_counts = sorted({1, 2, 4, 8, os.cpu_count() or 1})
+    print(f"  {'shards':<8}" + "".join(f"{f'{threads} threads':>14}" for threads in thread_counts))
+    for shards in (1, 4, 16):
+        row = []
+        for threads in thread_counts:
+            carts = CartStorage() if shards == 1 else ShardedCartStorage(shards)
+            row.append(throughput(carts, catalog, threads, seconds))
+        print(f"  {shards:<8}" + "".join(f"{ops:>14.0f}" for ops in row))
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.sharded_carts [seconds]
+    main(float(argv[1]) if len(argv) > 1 else 2.0)
@@ -0,0 +1,60 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.shared_memory_storage import SharedMemoryItemStorage
+
+NAME = f"shop_bench_{os.getpid()}"
+
+
+def reader(name: str, total: int, seconds: float) -> int:
+    """Число чтений (get_item + страница) за seconds в отдельном процессе"""
+    storage = SharedMemoryItemStorage(name)
+    rng = random.Random(os.getpid())
+    operations = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            storage.get_item(rng.randint(1, total))
+            storage.paginate_items_filtered(rng.randint(0, 100), 10, show_deleted=True)
+        operations += 200
+    storage.close()
+    return operations
+
+
+def main(total: int = 100_000, seconds: float = 2.0) -> None:
+    storage = SharedMemoryItemStorage(NAME, capacity=total)
+    try:
+        started = time.perf_counter()
+        for i in range(total):
+            storage.add_new_item(f"item {i}", random.uniform(1, 1000))
+        print(f"{total} inserts: {total / (time.perf_counter() - started):.0f}/s")
+
+        memory = ItemStorage()
+        for i in range(1000):
+            memory.add_new_item(f"item {i}", 1.0)
+        single = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for _ in range(100):
+                memory.get_item(500)
+                memory.paginate_items_filtered(50, 10, show_deleted=True)
+            single += 200
+        print(f"ItemStorage, 1 process: {single / seconds:>12.0f} reads/s")
+
+        for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+            with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+                reads = sum(pool.map(reader, [NAME] * workers, [total] * workers, [seconds] * workers))
+            print(f"shared, {workers:>2} processes:   {reads / seconds:>12.0f} reads/s")
+    finally:
+        storage.segment.unlink()
+        storage.close()
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.shared_memory_scaling [total]
+    main(int(argv[1]) if len(argv) > 1 else 100_000)
@@ -0,0 +1,67 @@
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from sys import argv
+from typing import Callable
+
+from lecture_2.hw.shop_api.app.storages import BACKENDS, Storages, create_storages
+
+
+def rate(operation: Callable[[int], object], count: int) -> float:
+    """Операций в секунду для operation(i), i in range(count)"""
+    started = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return count / (time.perf_counter() - started)
+
+
+async def concurrent_rate(storages: Storages, item_ids: list[int], concurrency: int = 64) -> float:
+    """get_item через Storages.run, как из роутера: concurrency запросов разом"""
+    async def worker(ids: list[int]) -> None:
+        for item_id in ids:
+            await storages.run(storages.items.get_item, item_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(item_ids[i::concurrency]) for i in range(concurrency)))
+    return len(item_ids) / (time.perf_counter() - started)
+
+
+def bench(storages: Storages, total: int) -> dict[str, float]:
+    rng = random.Random(0)
+    items, carts = storages.items, storages.carts
+    result = {"insert item": rate(lambda i: items.add_new_item(f"item {i}", rng.uniform(1, 1000)), total)}
+
+    item_ids = [item.id for item in items.paginate_items_filtered(0, total, show_deleted=True)]
+    lookups = [rng.choice(item_ids) for _ in range(total)]
+    result["get item"] = rate(lambda i: items.get_item(lookups[i]), total)
+    result["list page"] = rate(lambda i: items.paginate_items_filtered(i % 100 * 10, 10), 1000)
+    result["price window page"] = rate(lambda i: items.paginate_items_filtered(0, 10, 100.0, 110.0), 1000)
+
+    cart_ids = [carts.create_cart() for _ in range(100)]
+    sample = [items.get_item(item_id) for item_id in lookups[:1000]]
+    result["add to cart"] = rate(lambda i: carts.add_item_to_cart(cart_ids[i % 100], sample[i]), 1000)
+    result["get item (async, 64 concurrent)"] = asyncio.run(concurrent_rate(storages, lookups))
+    return result
+
+
+def main(total: int = 20_000) -> None:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in BACKENDS:
+            storages = create_storages(backend, str(Path(directory) / "shop.sqlite3"))
+            try:
+                results[backend] = bench(storages, total)
+            finally:
+                storages.close()
+
+    print(f"{total} items, ops/s")
+    print(f"  {'operation':<34}" + "".join(f"{backend:>12}" for backend in results))
+    for operation in results[BACKENDS[0]]:
+        print(f"  {operation:<34}" + "".join(f"{result[operation]:>12.0f}" for result in results.values()))
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.storage_backends [total]
+    main(int(argv[1]) if len(argv) > 1 else 20_000)
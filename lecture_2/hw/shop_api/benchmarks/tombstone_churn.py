@@ -0,0 +1,53 @@
+import random
+import time
+import tracemalloc
+from sys import argv
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+
+def latency(storage: ItemStorage, repeat: int = 5, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        storage.paginate_items_filtered(limit=10, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def report(title: str, storage: ItemStorage) -> None:
+    current, _ = tracemalloc.get_traced_memory()
+    print(
+        f"  {title:<22}{len(storage.items):>10}{current / 2**20:>10.1f}"
+        f"{latency(storage, offset=1000):>12.3f}{latency(storage, offset=1000, min_price=10.0, max_price=900.0):>12.3f}"
+    )
+
+
+def main(live: int = 100_000, churn: int = 300_000) -> None:
+    """Каталог с live живыми товарами, через который прошло churn удаленных"""
+    rng = random.Random(0)
+    tracemalloc.start()
+    items, carts = ItemStorage(), CartStorage()
+    for _ in range(live):
+        items.add_new_item("live", round(rng.uniform(1, 1000), 2))
+    print(f"{live} live items, {churn} created and deleted")
+    print(f"  {'':<22}{'items':>10}{'MiB':>10}{'list, ms':>12}{'window, ms':>12}")
+    report("live only", items)
+
+    for _ in range(churn):
+        items.delete_item(items.add_new_item("churn", round(rng.uniform(1, 1000), 2)).id)
+    report("with tombstones", items)
+
+    started = time.perf_counter()
+    while items.compact(carts):
+        pass
+    compacted = time.perf_counter() - started
+    report("after compact", items)
+    print(f"\ncompaction: {compacted:.2f} s")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    # python -m lecture_2.hw.shop_api.benchmarks.tombstone_churn [live] [churn]
+    main(*(int(arg) for arg in argv[1:3]))
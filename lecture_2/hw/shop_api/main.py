@@ -1,8 +1,80 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
+from http import HTTPStatus
+from typing import Optional
 
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from lecture_2.hw.shop_api.app.background import compact_periodically, expire_periodically
 from lecture_2.hw.shop_api.app.routers.cart import router as cart_router
 from lecture_2.hw.shop_api.app.routers.item import router as item_router
+from lecture_2.hw.shop_api.app.storages import create_storages
+from lecture_2.hw.shop_api.app.storages.shared_memory_storage import CapacityError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if app.state.compact_interval > 0:
+        tasks.append(asyncio.create_task(compact_periodically(app.state.storages, app.state.compact_interval)))
+    if app.state.cart_ttl is not None:
+        # такт проверки не длиннее ttl, чтобы короткий ttl не растягивался
+        interval = min(app.state.cart_ttl, 1.0)
+        tasks.append(asyncio.create_task(expire_periodically(app.state.storages, interval)))
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    app.state.storages.close()
+
+
+async def capacity_error_handler(request: Request, exc: CapacityError) -> JSONResponse:
+    return JSONResponse(content={"detail": str(exc)}, status_code=HTTPStatus.INSUFFICIENT_STORAGE)
+
+
+def create_app(
+    storage: Optional[str] = None,
+    sqlite_path: Optional[str] = None,
+    shared_name: Optional[str] = None,
+    compact_interval: Optional[float] = None,
+    cart_ttl: Optional[float] = None,
+) -> FastAPI:
+    """Приложение с хранилищем из аргументов или окружения.
+
+    SHOP_STORAGE - memory (по умолчанию), columnar, sqlite или shared. Для
+    запуска с --workers N подходят sqlite (SHOP_SQLITE_PATH - файл базы) и
+    shared (SHOP_SHARED_NAME - имя сегментов shared memory,
+    SHOP_SHARED_CAPACITY - вместимость, задается первым воркером).
+
+    SHOP_COMPACT_INTERVAL - период (с) фоновой уборки удаленных товаров,
+    которых нет в корзинах; 0 отключает уборку. SHOP_CART_TTL - через
+    сколько секунд без обращений корзина удаляется (по умолчанию сутки);
+    0 отключает истечение.
+    """
+    app = FastAPI(title="Shop API", lifespan=lifespan)
+    # хранилища создаются здесь, а не в lifespan, чтобы TestClient без
+    # контекстного менеджера тоже их видел
+    if cart_ttl is None:
+        cart_ttl = float(os.environ.get("SHOP_CART_TTL", 86_400))
+    app.state.cart_ttl = cart_ttl or None
+    app.state.storages = create_storages(
+        storage or os.environ.get("SHOP_STORAGE", "memory"),
+        sqlite_path or os.environ.get("SHOP_SQLITE_PATH", "shop.sqlite3"),
+        int(os.environ.get("SHOP_SQLITE_READERS", 4)),
+        shared_name or os.environ.get("SHOP_SHARED_NAME", "shop_api"),
+        int(os.environ.get("SHOP_SHARED_CAPACITY", 100_000)),
+        app.state.cart_ttl,
+    )
+    app.state.compact_interval = (
+        compact_interval if compact_interval is not None else float(os.environ.get("SHOP_COMPACT_INTERVAL", 60))
+    )
+    app.add_exception_handler(CapacityError, capacity_error_handler)
+    app.include_router(item_router)
+    app.include_router(cart_router)
+    return app
+
 
-app = FastAPI(title="Shop API")
-app.include_router(item_router)
-app.include_router(cart_router)
+app = create_app()
@@ -0,0 +1,152 @@
+import asyncio
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from async_asgi_testclient import TestClient
+
+from lecture_1.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    ClientDisconnected,
+    cancel_on_disconnect,
+)
+from lecture_1.hw import math_plain_asgi
+from lecture_1.hw.math_plain_asgi import app
+
+
+def controller() -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=1, max_request_cost=1_000, max_pending_cost=1_500, free_cost=10
+    )
+
+
+@pytest.mark.asyncio
+async def test_request_over_budget_rejected() -> None:
+    with pytest.raises(AdmissionRejected) as exc_info:
+        async with controller().admit(1_001):
+            pass
+
+    assert exc_info.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+@pytest.mark.asyncio
+async def test_pending_over_budget_rejected_with_retry_after() -> None:
+    admission = controller()
+    async with admission.admit(1_000):
+        async with admission.admit(5):  # дешевые проходят без очереди
+            pass
+
+        with pytest.raises(AdmissionRejected) as exc_info:
+            async with admission.admit(600):
+                pass
+
+    assert exc_info.value.status == HTTPStatus.TOO_MANY_REQUESTS
+    assert exc_info.value.retry_after >= 1
+    assert admission.pending_cost == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited() -> None:
+    admission = controller()
+    running = 0
+    max_running = 0
+
+    async def job() -> None:
+        nonlocal running, max_running
+        async with admission.admit(100):
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(job() for _ in range(5)))
+
+    assert max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_reservation_charges_as_body_arrives() -> None:
+    admission = controller()
+    async with admission.reserve() as reservation:
+        reservation.raise_to(5)
+        reservation.raise_to(400)
+        assert admission.pending_cost == 400
+        with pytest.raises(AdmissionRejected) as exc_info:
+            reservation.raise_to(1_001)
+        assert exc_info.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+
+    assert admission.pending_cost == 0
+
+
+@pytest.mark.asyncio
+async def test_reservation_takes_slot_only_for_compute() -> None:
+    admission = controller()
+    async with admission.reserve() as uploading, admission.reserve() as computing:
+        uploading.raise_to(500)
+        computing.raise_to(500)
+        # первый запрос еще читает тело и слот не держит
+        async with computing.slot():
+            pass
+        async with uploading.slot():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_chunked_mean_without_length_is_admitted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(math_plain_asgi.admission, "max_request_cost", 50_000.0)
+    chunk = b"1.0," * 100_000
+    messages = [
+        {"type": "http.request", "body": b"[" + chunk, "more_body": True},
+        {"type": "http.request", "body": chunk, "more_body": True},
+        {"type": "http.request", "body": chunk + b"1.0]", "more_body": False},
+    ]
+    sent = []
+
+    async def receive() -> dict[str, Any]:
+        return messages.pop(0)
+
+    async def send(message: dict[str, Any]) -> None:
+        sent.append(message)
+
+    # без Content-Length: стоимость набирается по мере чтения и упирается в бюджет
+    scope = {"type": "http", "method": "GET", "path": "/mean", "query_string": b""}
+    await app(scope, receive, send)
+
+    assert sent[0]["status"] == HTTPStatus.SERVICE_UNAVAILABLE
+    assert math_plain_asgi.admission.pending_cost == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect() -> None:
+    messages: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    await messages.put({"type": "http.request", "body": b"", "more_body": False})
+    work = asyncio.ensure_future(asyncio.sleep(10))
+
+    async def disconnect_soon() -> None:
+        await asyncio.sleep(0.01)
+        await messages.put({"type": "http.disconnect"})
+
+    asyncio.ensure_future(disconnect_soon())
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(messages.get, work)
+
+    await asyncio.sleep(0)
+    assert work.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect_returns_result() -> None:
+    async def receive() -> dict[str, Any]:
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    assert await cancel_on_disconnect(receive, asyncio.sleep(0, result=42)) == 42
+
+
+@pytest.mark.asyncio
+async def test_app_rejects_too_expensive_factorial() -> None:
+    async with TestClient(app) as client:
+        response = await client.get("/factorial", query_string={"n": 10_000_000})
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
@@ -0,0 +1,136 @@
+import math
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi.testclient import TestClient as FastAPITestClient
+
+from lecture_1.core.batch import MAX_FACTORIAL_N, Operation, run_batch
+from lecture_1.core.fibonacci import fibonacci_linear
+from lecture_1.hw import math_plain_asgi
+from lecture_1.hw.math_plain_asgi import app as plain_app
+from lecture_1.math_example import app as fastapi_app
+
+OPERATIONS = [
+    {"op": "factorial", "n": 5},
+    {"op": "fibonacci", "n": 10},
+    {"op": "mean", "data": [1, 2.5, 3.5]},
+    {"op": "factorial", "n": -1},
+    {"op": "fibonacci", "n": 3},
+    {"op": "factorial", "n": 5},
+    {"op": "mean", "data": []},
+    {"op": "factorial", "n": MAX_FACTORIAL_N + 1},
+]
+
+EXPECTED = [
+    {"result": 120},
+    {"result": 89},
+    {"result": 7 / 3},
+    {"status": HTTPStatus.BAD_REQUEST},
+    {"result": 3},
+    {"result": 120},
+    {"status": HTTPStatus.BAD_REQUEST},
+    {"status": HTTPStatus.BAD_REQUEST},
+]
+
+
+def check_results(results: list[dict[str, Any]]) -> None:
+    assert len(results) == len(EXPECTED)
+    for result, expected in zip(results, EXPECTED):
+        if "result" in expected:
+            assert result["result"] == pytest.approx(expected["result"])
+        else:
+            assert result["status"] == expected["status"]
+            assert "detail" in result
+
+
+def test_run_batch_deduplicates_sequences() -> None:
+    ns = [0, 1, 7, 7, 300, 299, 50]
+    results = run_batch(
+        [Operation(op="factorial", n=n) for n in ns]
+        + [Operation(op="fibonacci", n=n) for n in ns]
+    )
+
+    assert [r["result"] for r in results[: len(ns)]] == [math.factorial(n) for n in ns]
+    assert [r["result"] for r in results[len(ns) :]] == [fibonacci_linear(n + 1) for n in ns]
+
+
+@pytest.mark.asyncio
+async def test_plain_asgi_batch() -> None:
+    async with TestClient(plain_app) as client:
+        response = await client.post("/batch", json=OPERATIONS)
+
+    assert response.status_code == HTTPStatus.OK
+    check_results(response.json()["results"])
+
+
+def test_fastapi_batch() -> None:
+    response = FastAPITestClient(fastapi_app).post("/batch", json=OPERATIONS)
+
+    assert response.status_code == HTTPStatus.OK
+    check_results(response.json()["results"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"op": "factorial", "n": 1},
+        [{"op": "sqrt", "n": 1}],
+        [{"op": "factorial"}],
+        [{"op": "fibonacci", "n": "1"}],
+        [{"op": "mean", "data": [1, "2"]}],
+        [{"op": "mean"}],
+    ],
+)
+async def test_batch_invalid_body(body: Any) -> None:
+    async with TestClient(plain_app) as client:
+        plain_response = await client.post("/batch", json=body)
+    fastapi_response = FastAPITestClient(fastapi_app).post("/batch", json=body)
+
+    assert plain_response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert fastapi_response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("data", [b"[NaN]", b"[Infinity]", b"[1e999]"])
+async def test_batch_rejects_non_finite(data: bytes) -> None:
+    body = b'[{"op": "mean", "data": ' + data + b"}]"
+    headers = {"content-type": "application/json"}
+    async with TestClient(plain_app) as client:
+        plain_response = await client.post("/batch", data=body, headers=headers)
+    fastapi_response = FastAPITestClient(fastapi_app).post("/batch", content=body, headers=headers)
+
+    assert plain_response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert fastapi_response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_batch_mean_overflow_is_per_operation_error() -> None:
+    body = [{"op": "mean", "data": [1e308, 1e308]}, {"op": "factorial", "n": 3}]
+    async with TestClient(plain_app) as client:
+        plain_response = await client.post("/batch", json=body)
+    fastapi_response = FastAPITestClient(fastapi_app).post("/batch", json=body)
+
+    for response in (plain_response, fastapi_response):
+        assert response.status_code == HTTPStatus.OK
+        overflow, factorial = response.json()["results"]
+        assert overflow["status"] == HTTPStatus.BAD_REQUEST
+        assert factorial == {"result": 6}
+
+
+@pytest.mark.asyncio
+async def test_plain_asgi_batch_goes_through_executor(monkeypatch: pytest.MonkeyPatch) -> None:
+    offloaded = []
+
+    async def run(self, cost, func, *args):
+        offloaded.append(func)
+        return func(*args)
+
+    monkeypatch.setattr(type(math_plain_asgi.executor), "run", run)
+    async with TestClient(plain_app) as client:
+        response = await client.post("/batch", json=OPERATIONS)
+
+    assert offloaded == [run_batch]
+    check_results(response.json()["results"])
@@ -0,0 +1,99 @@
+import math
+import sys
+
+import pytest
+from async_asgi_testclient import TestClient
+
+from lecture_1.core.bigint import compute_formatted, format_int, to_bytes, to_decimal
+from lecture_1.hw import math_plain_asgi
+from lecture_1.hw.math_plain_asgi import app
+
+
+def as_str(value: int) -> str:
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        return str(value)
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0, 7, -7, 2**128, 2**129 - 1, 10**1000, 10**1000 - 1, -(10**5000) - 3, math.factorial(3000)],
+    ids=lambda value: f"{value.bit_length()}bits",
+)
+def test_to_decimal(value: int) -> None:
+    assert str(to_decimal(value)) == as_str(value)
+
+
+def test_to_bytes() -> None:
+    assert to_bytes(0) == b"\x00"
+    assert int.from_bytes(to_bytes(math.factorial(500)), "big") == math.factorial(500)
+
+
+def test_format_int() -> None:
+    value = math.factorial(3000)
+
+    assert format_int(value, "decimal") == compute_formatted(math.factorial, 3000, "decimal") == as_str(value)
+    assert format_int(value, "hex") == hex(value)
+    assert format_int(value, "binary") == to_bytes(value)
+
+
+@pytest.mark.asyncio
+async def test_formatting_runs_with_computation(monkeypatch: pytest.MonkeyPatch) -> None:
+    # в пул уходит вычисление вместе с переводом в десятичный вид, в event
+    # loop остается только отправка готовых цифр
+    offloaded = []
+
+    async def run(self, cost, func, *args):
+        offloaded.append(func)
+        return func(*args)
+
+    monkeypatch.setattr(type(math_plain_asgi.executor), "run", run)
+    async with TestClient(app) as client:
+        computed = await client.get("/factorial", query_string={"n": 6000})
+        cached = await client.get("/fibonacci/100")
+
+    assert offloaded == [compute_formatted, format_int]
+    assert computed.content == f'{{"result": {as_str(math.factorial(6000))}}}'.encode()
+    assert cached.json()["result"] == 573147844013817084101
+
+
+@pytest.mark.asyncio
+async def test_factorial_beyond_str_digits_limit() -> None:
+    n = 5000  # 16326 цифр, больше int_max_str_digits по умолчанию
+    async with TestClient(app) as client:
+        response = await client.get("/factorial", query_string={"n": n})
+
+    assert response.status_code == 200
+    assert response.content == f'{{"result": {as_str(math.factorial(n))}}}'.encode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/factorial?n=30&format=hex", "/fibonacci/30?format=hex"])
+async def test_hex_format(path: str) -> None:
+    async with TestClient(app) as client:
+        response = await client.get(path)
+
+    assert response.status_code == 200
+    assert response.json()["result"] in (hex(math.factorial(30)), hex(1346269))
+
+
+@pytest.mark.asyncio
+async def test_binary_format() -> None:
+    async with TestClient(app) as client:
+        response = await client.get("/factorial?n=100&format=binary")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert int.from_bytes(response.content, "big") == math.factorial(100)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/factorial?n=3&format=oct", "/fibonacci/3?format="])
+async def test_unknown_format(path: str) -> None:
+    async with TestClient(app) as client:
+        response = await client.get(path)
+
+    assert response.status_code == 422
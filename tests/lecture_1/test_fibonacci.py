@@ -0,0 +1,29 @@
+import pytest
+
+from lecture_1.core.fibonacci import (
+    CACHE_SIZE,
+    fibonacci,
+    fibonacci_linear,
+    fibonacci_pair,
+)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 10, 63, 64, 100, 1000, 4097])
+def test_fast_doubling_matches_linear(n: int) -> None:
+    assert fibonacci(n) == fibonacci_linear(n)
+    assert fibonacci_pair(n) == (fibonacci_linear(n), fibonacci_linear(n + 1))
+
+
+def test_negative_n() -> None:
+    with pytest.raises(ValueError):
+        fibonacci_pair(-1)
+
+
+def test_cache_is_bounded() -> None:
+    fibonacci.cache_clear()
+    for n in range(CACHE_SIZE * 2):
+        fibonacci(n)
+
+    info = fibonacci.cache_info()
+    assert info.currsize == CACHE_SIZE
+    assert info.maxsize == CACHE_SIZE
@@ -0,0 +1,105 @@
+import json
+import math
+from http import HTTPStatus
+from typing import Any
+
+import pytest
+
+from lecture_1.core.json_stream import FloatArrayReader
+from lecture_1.hw.math_plain_asgi import app
+
+
+def read_chunks(chunks: list[bytes]) -> FloatArrayReader:
+    reader = FloatArrayReader()
+    for chunk in chunks:
+        reader.feed(chunk)
+    reader.close()
+    return reader
+
+
+@pytest.mark.parametrize(
+    ("chunks", "count", "mean"),
+    [
+        ([b"[1, 2, 3]"], 3, 2.0),
+        ([b"[1", b".5, 2", b".5]"], 2, 2.0),
+        ([b"  [", b"1e2", b",", b"-1e2 ", b"]  "], 2, 0.0),
+        ([b"[]"], 0, None),
+        ([b"[", b" ", b"]"], 0, None),
+    ],
+)
+def test_reader_valid(chunks: list[bytes], count: int, mean: float | None) -> None:
+    reader = read_chunks(chunks)
+
+    assert reader.count == count
+    if mean is not None:
+        assert reader.accumulator.mean == pytest.approx(mean)
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [b""],
+        [b"{}"],
+        [b"[1, 2"],
+        [b"[1,]"],
+        [b"[1,", b"]"],
+        [b"[,1]"],
+        [b"[1 2]"],
+        [b'["1"]'],
+        [b"[[1]]"],
+        [b"[NaN]"],
+        [b"[1_000]"],
+        [b"[1] 2"],
+        [b"[1", b"0" * 2000, b"]"],
+    ],
+)
+def test_reader_invalid(chunks: list[bytes]) -> None:
+    with pytest.raises(ValueError):
+        read_chunks(chunks)
+
+
+def test_reader_compensated_sum() -> None:
+    values = [1e16, 1.0, -1e16] * 1000
+    body = json.dumps(values).encode()
+    reader = read_chunks([body[i : i + 7] for i in range(0, len(body), 7)])
+
+    assert reader.accumulator.total == math.fsum(values)
+
+
+async def call_mean(chunks: list[bytes]) -> tuple[int, dict[str, Any]]:
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive() -> dict[str, Any]:
+        return messages.pop(0)
+
+    async def send(message: dict[str, Any]) -> None:
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/mean", "query_string": b""}
+    await app(scope, receive, send)
+
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return sent[0]["status"], json.loads(body)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("chunks", "status_code"),
+    [
+        ([b"[1, 2", b".0, 3", b"]"], HTTPStatus.OK),
+        ([b"[", b"]"], HTTPStatus.BAD_REQUEST),
+        ([b"[1, 2", b", oops]"], HTTPStatus.UNPROCESSABLE_ENTITY),
+        ([b"[1e308, ", b"1e308]"], HTTPStatus.UNPROCESSABLE_ENTITY),
+        ([b"[1, 1e999]"], HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+async def test_mean_chunked_body(chunks: list[bytes], status_code: int) -> None:
+    status, body = await call_mean(chunks)
+
+    assert status == status_code
+    if status_code == HTTPStatus.OK:
+        assert body["result"] == pytest.approx(2.0)
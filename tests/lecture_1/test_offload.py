@@ -0,0 +1,64 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from typing import Any
+
+import pytest
+
+from lecture_1.core.offload import OffloadExecutor
+
+
+def pid() -> int:
+    return os.getpid()
+
+
+def wait_for(event: Any) -> bool:
+    return event.wait(timeout=30)
+
+
+@pytest.mark.asyncio
+async def test_cheap_tasks_run_inline() -> None:
+    executor = OffloadExecutor(threshold=100)
+    executor.start()
+    try:
+        assert await executor.run(1, pid) == os.getpid()
+    finally:
+        await executor.shutdown()
+
+    assert not executor.running
+
+
+@pytest.mark.asyncio
+async def test_expensive_tasks_run_in_pool() -> None:
+    executor = OffloadExecutor(threshold=100, max_workers=1)
+    executor.start()
+    try:
+        assert await executor.run(1_000, pid) != os.getpid()
+        assert await executor.run(1_000, math.factorial, 20) == math.factorial(20)
+    finally:
+        await executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cheap_tasks_not_blocked_by_expensive() -> None:
+    executor = OffloadExecutor(threshold=100, max_workers=1)
+    executor.start()
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        release = manager.Event()
+        try:
+            # единственный воркер занят, пока тест не отпустит его сам
+            expensive = asyncio.ensure_future(executor.run(1e9, wait_for, release))
+            assert await executor.run(1, math.factorial, 5) == 120
+            assert not expensive.done()
+            release.set()
+            assert await expensive
+        finally:
+            release.set()
+            await executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_without_pool_everything_runs_inline() -> None:
+    executor = OffloadExecutor(threshold=100)
+    assert await executor.run(1_000, pid) == os.getpid()
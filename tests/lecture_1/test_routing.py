@@ -0,0 +1,109 @@
+from http import HTTPStatus
+
+import pytest
+from async_asgi_testclient import TestClient
+
+from lecture_1.hw.math_plain_asgi import app
+from lecture_1.hw.routing import RESOLVED_LIMIT, Router, parse_query
+
+
+async def handler(scope, receive, send, param) -> None:
+    pass
+
+
+async def other_handler(scope, receive, send, param) -> None:
+    pass
+
+
+@pytest.fixture()
+def router() -> Router:
+    router = Router()
+    router.add("GET", "/items", handler)
+    router.add("POST", "/items", other_handler)
+    router.add("GET", "/items/{item_id}", handler)
+    return router
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "expected"),
+    [
+        ("GET", "/items", (handler, None)),
+        ("POST", "/items", (other_handler, None)),
+        ("GET", "/items/42", (handler, "42")),
+        ("GET", "/items/", (handler, "")),
+        ("DELETE", "/items", None),
+        ("POST", "/items/42", None),
+        ("GET", "/items/42/details", None),
+        ("GET", "/other", None),
+    ],
+)
+def test_router_match(router: Router, method: str, path: str, expected) -> None:
+    assert router.match(method, path) == expected
+
+
+def test_router_cache_is_bounded(router: Router) -> None:
+    for item_id in range(RESOLVED_LIMIT * 2):
+        assert router.match("GET", f"/items/{item_id}") == (handler, str(item_id))
+
+    assert len(router.routes) <= RESOLVED_LIMIT
+    # точные пути переживают сброс кэша
+    assert router.match("POST", "/items") == (other_handler, None)
+
+
+def test_router_add_invalidates_resolved_paths(router: Router) -> None:
+    assert router.match("GET", "/other") is None
+
+    router.add("GET", "/other", other_handler)
+
+    assert router.match("GET", "/other") == (other_handler, None)
+
+
+@pytest.mark.parametrize("path", ["/items/{id}/details", "/items{id}", "/items/{id"])
+def test_router_rejects_unsupported_templates(path: str) -> None:
+    with pytest.raises(ValueError):
+        Router().add("GET", path, handler)
+
+
+@pytest.mark.parametrize(
+    ("query_string", "expected"),
+    [
+        (b"", {}),
+        (b"n=10", {"n": "10"}),
+        (b"n=1&n=2", {"n": "2"}),
+        (b"filter=a=b&n=3", {"filter": "a=b", "n": "3"}),
+        (b"flag&&n=", {"flag": "", "n": ""}),
+        (b"q=a+b%26c&%6E=1", {"q": "a b&c", "n": "1"}),
+        (b"name=%D0%BC%D0%B8%D1%80", {"name": "мир"}),
+    ],
+)
+def test_parse_query(query_string: bytes, expected: dict[str, str]) -> None:
+    assert parse_query(query_string) == expected
+
+
+def test_parse_query_decodes_only_read_values(monkeypatch: pytest.MonkeyPatch) -> None:
+    decoded = []
+    monkeypatch.setattr("lecture_1.hw.routing.unquote", lambda text: decoded.append(text) or text)
+
+    params = parse_query(b"n=10&trace=a%3Db")
+
+    assert params.get("n") == "10"
+    assert decoded == []
+    assert params["trace"] == "a%3Db"
+    assert decoded == ["a%3Db"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("path", "status_code"),
+    [
+        ("/factorial?n=5&filter=a=b", HTTPStatus.OK),
+        ("/factorial?n=%C2%B2", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/", HTTPStatus.UNPROCESSABLE_ENTITY),
+        ("/fibonacci/10/extra", HTTPStatus.NOT_FOUND),
+    ],
+)
+async def test_app_routing(path: str, status_code: int) -> None:
+    async with TestClient(app) as client:
+        response = await client.get(path)
+
+    assert response.status_code == status_code
@@ -0,0 +1,133 @@
+import statistics
+import struct
+from http import HTTPStatus
+
+import pytest
+from async_asgi_testclient import TestClient
+from fastapi.testclient import TestClient as FastAPITestClient
+
+from lecture_1.core.stats import Float64Reader, Summary, float64_view
+from lecture_1.hw.math_plain_asgi import app as plain_app
+from lecture_1.math_example import app as fastapi_app
+
+VALUES = [3.5, -1.0, 2.25, 10.0, 7.5, 0.0]
+BINARY = struct.pack(f"<{len(VALUES)}d", *VALUES)
+OCTET_STREAM = {"content-type": "application/octet-stream"}
+
+
+def test_summary() -> None:
+    summary = Summary(keep_values=True, track_variance=True, track_extremes=True)
+    summary.update(VALUES[:2])
+    summary.update(float64_view(BINARY[16:]))
+
+    assert summary.count == len(VALUES)
+    assert summary.mean == pytest.approx(statistics.fmean(VALUES))
+    assert summary.variance == pytest.approx(statistics.variance(VALUES))
+    assert (summary.minimum, summary.maximum) == (min(VALUES), max(VALUES))
+    assert summary.quantiles([0, 0.5, 1]) == pytest.approx(
+        [min(VALUES), statistics.median(VALUES), max(VALUES)]
+    )
+
+
+@pytest.mark.parametrize("offset", [1e9, 1e12, -1e15])
+def test_summary_variance_with_large_offset(offset: float) -> None:
+    values = [offset + 1, offset + 2, offset + 3, offset + 2]
+    summary = Summary(track_variance=True)
+    summary.update(values[:2])
+    summary.update(values[2:])
+
+    assert summary.variance == pytest.approx(statistics.variance(values))
+
+
+def test_summary_computes_only_requested() -> None:
+    summary = Summary.for_request(["min"], [])
+    summary.update(VALUES)
+
+    assert summary.mean == pytest.approx(statistics.fmean(VALUES))
+    assert summary.minimum == min(VALUES)
+    with pytest.raises(ValueError):
+        summary.variance
+    with pytest.raises(ValueError):
+        summary.quantiles([0.5])
+
+
+@pytest.mark.parametrize("value", [float("inf"), float("-inf"), float("nan")])
+def test_float64_reader_rejects_non_finite(value: float) -> None:
+    reader = Float64Reader(Summary(track_variance=True, track_extremes=True))
+    with pytest.raises(ValueError):
+        reader.feed(struct.pack("<2d", 1.0, value))
+
+
+def test_float64_reader_unaligned_chunks() -> None:
+    reader = Float64Reader()
+    for start in range(0, len(BINARY), 5):
+        reader.feed(BINARY[start : start + 5])
+
+    assert reader.close().mean == pytest.approx(statistics.fmean(VALUES))
+
+
+def test_float64_reader_truncated_body() -> None:
+    reader = Float64Reader()
+    reader.feed(BINARY[:-1])
+
+    with pytest.raises(ValueError):
+        reader.close()
+
+
+@pytest.mark.asyncio
+async def test_plain_asgi_binary_mean() -> None:
+    async with TestClient(plain_app) as client:
+        response = await client.get(
+            "/mean?stats=variance,min,max&quantiles=0.5", data=BINARY, headers=OCTET_STREAM
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data["result"] == pytest.approx(statistics.fmean(VALUES))
+    assert data["variance"] == pytest.approx(statistics.variance(VALUES))
+    assert data["min"] == min(VALUES)
+    assert data["max"] == max(VALUES)
+    assert data["quantiles"] == pytest.approx([statistics.median(VALUES)])
+
+
+@pytest.mark.asyncio
+async def test_plain_asgi_binary_mean_rejects_non_finite() -> None:
+    async with TestClient(plain_app) as client:
+        response = await client.get("/mean", data=struct.pack("<2d", 1.0, float("nan")), headers=OCTET_STREAM)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "status_code"),
+    [
+        ({"content": BINARY, "headers": OCTET_STREAM}, HTTPStatus.OK),
+        ({"json": VALUES}, HTTPStatus.OK),
+        ({"content": b"", "headers": OCTET_STREAM}, HTTPStatus.BAD_REQUEST),
+        ({"content": BINARY[:-3], "headers": OCTET_STREAM}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"json": []}, HTTPStatus.BAD_REQUEST),
+        ({"json": {"a": 1}}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"content": struct.pack("<2d", 1.0, float("inf")), "headers": OCTET_STREAM}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"content": struct.pack("<2d", 1e308, 1e308), "headers": OCTET_STREAM}, HTTPStatus.UNPROCESSABLE_ENTITY),
+        ({"content": b"[1.0, Infinity]"}, HTTPStatus.UNPROCESSABLE_ENTITY),
+    ],
+)
+def test_fastapi_mean(kwargs: dict, status_code: int) -> None:
+    client = FastAPITestClient(fastapi_app)
+    response = client.request("GET", "/mean", params={"stats": "min,max"}, **kwargs)
+
+    assert response.status_code == status_code
+    if status_code == HTTPStatus.OK:
+        data = response.json()
+        assert data["result"] == pytest.approx(statistics.fmean(VALUES))
+        assert (data["min"], data["max"]) == (min(VALUES), max(VALUES))
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"stats": "median"}, {"quantiles": "1.5"}, {"quantiles": "a"}],
+)
+def test_fastapi_mean_invalid_options(params: dict) -> None:
+    response = FastAPITestClient(fastapi_app).request("GET", "/mean", params=params, json=VALUES)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
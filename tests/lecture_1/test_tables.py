@@ -0,0 +1,47 @@
+import math
+
+import pytest
+from async_asgi_testclient import TestClient
+
+from lecture_1.core.fibonacci import fibonacci_linear
+from lecture_1.core.tables import MathTables, PackedInts
+from lecture_1.hw import math_plain_asgi
+
+
+def test_packed_ints() -> None:
+    values = [0, 1, 255, 256, 2**64, 3**500]
+    packed = PackedInts.pack(values)
+
+    assert len(packed) == len(values)
+    assert [packed[i] for i in range(len(values))] == values
+    assert packed.nbytes >= len(packed.buffer)
+    with pytest.raises(IndexError):
+        packed[len(values)]
+
+
+def test_math_tables() -> None:
+    tables = MathTables(factorial_n=50, fibonacci_n=100)
+    assert tables.factorial(10) is None
+
+    report = tables.build()
+
+    assert report["factorial_bytes"] > 0 and report["fibonacci_bytes"] > 0
+    assert [tables.factorial(n) for n in range(51)] == [math.factorial(n) for n in range(51)]
+    assert [tables.fibonacci(n) for n in range(101)] == [fibonacci_linear(n) for n in range(101)]
+    assert tables.factorial(51) is None
+    assert tables.fibonacci(-1) is None
+
+
+@pytest.mark.asyncio
+async def test_app_serves_from_tables(monkeypatch) -> None:
+    monkeypatch.setattr(math_plain_asgi, "tables", MathTables(factorial_n=10, fibonacci_n=10))
+
+    def fail(*args):
+        raise AssertionError("value must come from the table")
+
+    monkeypatch.setattr(math_plain_asgi.math, "factorial", fail)
+
+    async with TestClient(math_plain_asgi.app) as client:
+        response = await client.get("/factorial", query_string={"n": 10})
+
+    assert response.json() == {"result": 3628800}
@@ -0,0 +1,39 @@
+import random
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages import BACKENDS
+from lecture_2.hw.shop_api.main import create_app
+
+
+@pytest.fixture(params=BACKENDS)
+def client(request, tmp_path):
+    """Клиент приложения на каждом бэкенде; сегменты shared удаляются после теста"""
+    name = f"shop_test_{uuid4().hex[:12]}"
+    application = create_app(request.param, str(tmp_path / "shop.sqlite3"), name)
+    with TestClient(application) as client:
+        yield client
+    if request.param == "shared":
+        for segment in (f"{name}_items", f"{name}_carts"):
+            shm = SharedMemory(segment)
+            shm.close()
+            shm.unlink()
+
+
+def fill_items(
+    storage, seed: int, count: int = 300, max_price: int = 50, name: Callable[[int], str] = "item {}".format
+) -> None:
+    """Одинаковая для любого хранилища история: добавления, удаления, изменения и замены"""
+    rng = random.Random(seed)
+    for i in range(count):
+        storage.add_new_item(name(i), float(rng.randint(1, max_price)))
+    for item_id in rng.sample(range(1, count + 1), count * 2 // 15):
+        storage.delete_item(item_id)
+    for item_id in rng.sample(range(1, count + 1), count * 2 // 15):
+        storage.update_item(item_id, price=float(rng.randint(1, max_price)))
+    for item_id in rng.sample(range(1, count + 1), count // 15):
+        storage.replace_item(item_id, "replaced", float(rng.randint(1, max_price)))
@@ -0,0 +1,75 @@
+import pytest
+
+from lecture_2.hw.shop_api.app.routers.cart import MAX_QUANTITY
+from lecture_2.hw.shop_api.app.routers.item import MAX_BATCH_SIZE
+
+
+def test_item_batch(client) -> None:
+    existing = client.post("/item/", json={"name": "old", "price": 1.0}).json()["id"]
+
+    response = client.post(
+        "/item/batch",
+        json=[
+            {"name": "first", "price": 10.0},
+            {"id": existing, "name": "replaced", "price": 2.0},
+            {"name": "free", "price": 0},
+            {"id": existing + 1000, "name": "missing", "price": 3.0},
+            {"name": "second", "price": 20.0},
+        ],
+    )
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == [201, 200, 422, 404, 201]
+    assert results[1]["item"] == {"id": existing, "name": "replaced", "price": 2.0, "deleted": False}
+    for result in (results[0], results[4]):
+        assert client.get(f"/item/{result['item']['id']}").json() == result["item"]
+
+
+def test_item_batch_validation(client) -> None:
+    assert client.post("/item/batch", json=[{"name": "no price"}]).status_code == 422
+    assert client.post("/item/batch", json=[{"name": "x", "price": 1.0, "extra": 1}]).status_code == 422
+    too_many = [{"name": "x", "price": 1.0}] * (MAX_BATCH_SIZE + 1)
+    assert client.post("/item/batch", json=too_many).status_code == 422
+
+
+def test_cart_add_map(client) -> None:
+    created = client.post("/item/batch", json=[{"name": f"item {i}", "price": 1.5} for i in range(3)]).json()
+    item_ids = [result["item"]["id"] for result in created]
+    cart_id = client.post("/cart/").json()["id"]
+    client.post(f"/cart/{cart_id}/add/{item_ids[0]}")
+
+    response = client.post(f"/cart/{cart_id}/add", json={str(item_ids[0]): 2, str(item_ids[2]): 5})
+
+    assert response.status_code == 200
+    cart = response.json()
+    assert {item["id"]: item["quantity"] for item in cart["items"]} == {item_ids[0]: 3, item_ids[2]: 5}
+    assert cart["price"] == pytest.approx(12.0)
+    assert response.headers["ETag"] == client.get(f"/cart/{cart_id}").headers["ETag"]
+    assert client.get(f"/cart/{cart_id}").json() == cart
+
+
+def test_cart_add_map_errors(client) -> None:
+    item_id = client.post("/item/", json={"name": "item", "price": 1.0}).json()["id"]
+    deleted_id = client.post("/item/", json={"name": "deleted", "price": 1.0}).json()["id"]
+    client.delete(f"/item/{deleted_id}")
+    cart_id = client.post("/cart/").json()["id"]
+
+    assert client.post(f"/cart/{cart_id}/add", json={}).status_code == 422
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): 0}).status_code == 422
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): 1, str(deleted_id): 1}).status_code == 404
+    assert client.post(f"/cart/{cart_id + 1000}/add", json={str(item_id): 1}).status_code == 404
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): 1}, headers={"If-Match": '"5"'}).status_code == 412
+    # ни один из неудачных запросов корзину не изменил
+    assert client.get(f"/cart/{cart_id}").json()["items"] == []
+
+
+def test_cart_quantity_is_bounded(client) -> None:
+    item_id = client.post("/item/", json={"name": "item", "price": 1.0}).json()["id"]
+    cart_id = client.post("/cart/").json()["id"]
+
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): 2**63}).status_code == 422
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): MAX_QUANTITY + 1}).status_code == 422
+    assert client.post(f"/cart/{cart_id}/add", json={str(item_id): MAX_QUANTITY}).status_code == 200
+    assert client.post(f"/cart/{cart_id}/add/{item_id}").status_code == 422
+    assert client.get(f"/cart/{cart_id}").json()["items"][0]["quantity"] == MAX_QUANTITY
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+
+def test_aggregates_and_indexed_filters() -> None:
+    rng = random.Random(21)
+    items = ItemStorage()
+    catalog = [items.add_new_item(f"item {i}", float(rng.randint(1, 20))) for i in range(50)]
+    carts = CartStorage()
+    cart_ids = [carts.create_cart() for _ in range(400)]
+    for _ in range(1500):
+        carts.add_items_to_cart(rng.choice(cart_ids), [(rng.choice(catalog), rng.randint(1, 3))])
+
+    for cart in carts.carts.values():
+        assert cart.quantity == sum(item.quantity for item in cart.items.values())
+        assert cart.total_cost == pytest.approx(sum(item.quantity * item.price for item in cart.items.values()))
+    assert len(carts.price_index) == len(carts.quantity_index) == 400
+
+    windows = [
+        {"min_quantity": 9, "max_quantity": 9},  # узкое - из индекса количеств
+        {"min_price": 100.0, "max_price": 105.0},  # узкое - из индекса цен
+        {"min_quantity": 2},  # широкое - проход по id
+        {"min_price": 10.0, "max_price": 80.0, "min_quantity": 3, "max_quantity": 12},
+        {"max_quantity": 0},
+    ]
+    for window in windows:
+        expected = [
+            cart.id
+            for cart in carts.carts.values()
+            if window.get("min_price", 0) <= cart.price <= window.get("max_price", float("inf"))
+            and window.get("min_quantity", 0) <= cart.quantity <= window.get("max_quantity", 10**9)
+        ]
+        assert [cart.id for cart in carts.paginate_filtered(limit=1000, **window)] == expected, window
+
+        # постранично через after
+        found, after = [], None
+        while page := carts.paginate_filtered(limit=7, after=after, **window):
+            found += [cart.id for cart in page]
+            after = page[-1].id
+        assert found == expected, window
+
+
+def test_narrow_window_when_quantity_follows_id() -> None:
+    # количество растет с id: окно в конце берется из индекса, а не проходом
+    items = ItemStorage()
+    item = items.add_new_item("item", 1.0)
+    carts = CartStorage()
+    for quantity in range(1, 1001):
+        carts.add_items_to_cart(carts.create_cart(), [(item, quantity)])
+    expected = list(range(951, 981))
+
+    found, after = [], None
+    while page := carts.paginate_filtered(limit=7, after=after, min_quantity=951, max_quantity=980):
+        found += [cart.id for cart in page]
+        after = page[-1].id
+    assert found == expected
+    assert [cart.id for cart in carts.paginate_filtered(offset=4, limit=3, min_price=951.0, max_price=980.0)] == expected[4:7]
+
+
+def test_cart_list_filters(client) -> None:
+    item_ids = [client.post("/item/", json={"name": f"item {i}", "price": 2.0}).json()["id"] for i in range(3)]
+    cart_ids = [client.post("/cart").json()["id"] for _ in range(5)]
+    for count, cart_id in enumerate(cart_ids):
+        if count:
+            client.post(f"/cart/{cart_id}/add", json={str(item_ids[count % 3]): count})
+
+    def listed(**params) -> list[int]:
+        return [cart["id"] for cart in client.get("/cart/", params={"limit": 100, **params}).json() if cart["id"] in cart_ids]
+
+    assert listed(min_quantity=2, max_quantity=3) == cart_ids[2:4]
+    assert listed(max_quantity=0) == cart_ids[:1]
+    assert listed(min_price=6.0) == cart_ids[3:]
+    assert client.get(f"/cart/{cart_ids[4]}").json()["price"] == 8.0
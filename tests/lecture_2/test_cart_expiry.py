@@ -0,0 +1,81 @@
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.expiry import ExpiryQueue
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.main import create_app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_expiry_queue_never_fires_early() -> None:
+    rng = random.Random(23)
+    queue = ExpiryQueue(resolution=0.5)
+    deadlines = {entity_id: rng.uniform(0, 100) for entity_id in range(2000)}
+    for entity_id, deadline in deadlines.items():
+        queue.schedule(entity_id, deadline)
+
+    fired: set[int] = set()
+    for now in range(0, 105, 3):
+        # limit меньше корзины такта - часть корзины остается на следующий вызов
+        while expired := queue.pop_expired(now, limit=7):
+            assert all(deadlines[entity_id] <= now for entity_id in expired)
+            fired.update(expired)
+        assert {entity_id for entity_id, deadline in deadlines.items() if deadline <= now - 0.5} <= fired
+    assert fired == set(deadlines)
+    assert len(queue) == 0
+
+
+def test_idle_carts_expire_and_leave_indexes() -> None:
+    clock = FakeClock()
+    items, carts = ItemStorage(), CartStorage(ttl=60.0, clock=clock)
+    shared, own = items.add_new_item("shared", 2.0), items.add_new_item("own", 5.0)
+    idle, touched, active = (carts.create_cart() for _ in range(3))
+    carts.add_items_to_cart(idle, [(shared, 1), (own, 2)])
+    carts.add_items_to_cart(active, [(shared, 3)])
+
+    clock.now += 40
+    carts.get_cart(touched)
+    carts.add_items_to_cart(active, [(shared, 1)])
+    clock.now += 30
+    assert carts.expire() == 1
+    assert set(carts.carts) == {touched, active}
+    assert not carts.is_referenced(own.id)
+    assert carts.item_carts == {shared.id: {active}}
+    assert len(carts.id_index) == len(carts.price_index) == len(carts.quantity_index) == 2
+    assert [cart.id for cart in carts.paginate_filtered(limit=10, min_price=1.0)] == [active]
+
+    clock.now += 29
+    assert carts.expire() == 0
+    clock.now += 2
+    assert carts.expire(limit=1) == 1
+    assert carts.expire() == 1
+    assert carts.carts == {} and carts.item_carts == {} and len(carts.expiry) == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_expired_cart_is_gone(backend, tmp_path) -> None:
+    application = create_app(backend, str(tmp_path / "shop.sqlite3"), cart_ttl=0.2)
+    with TestClient(application) as client:
+        item_id = client.post("/item/", json={"name": "lamp", "price": 1.0}).json()["id"]
+        cart_id = client.post("/cart").json()["id"]
+        client.post(f"/cart/{cart_id}/add/{item_id}")
+        assert client.get(f"/cart/{cart_id}").status_code == 200
+
+        # список корзин не продлевает им жизнь, в отличие от GET /cart/{id}
+        deadline = time.monotonic() + 5
+        while cart_id in [cart["id"] for cart in client.get("/cart/", params={"limit": 100}).json()]:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert client.get(f"/cart/{cart_id}").status_code == 404
+        assert client.post(f"/cart/{cart_id}/add/{item_id}").status_code == 404
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+
+def test_refresh_touches_only_carts_with_item() -> None:
+    rng = random.Random(22)
+    items, carts = ItemStorage(), CartStorage()
+    catalog = [items.add_new_item(f"item {i}", float(rng.randint(1, 20))) for i in range(20)]
+    cart_ids = [carts.create_cart() for _ in range(300)]
+    for _ in range(1000):
+        carts.add_items_to_cart(rng.choice(cart_ids), [(rng.choice(catalog), rng.randint(1, 3))])
+
+    changed = catalog[:3]
+    holders = {cart_id for item in changed for cart_id in carts.item_carts.get(item.id, ())}
+    versions = {cart.id: cart.version for cart in carts.carts.values()}
+    items.update_item(changed[0].id, price=99.0)
+    items.replace_item(changed[1].id, "renamed", 0.5)
+    items.delete_item(changed[2].id)
+    refreshed = [items.get_item(item.id) for item in changed]
+
+    assert carts.refresh_items(refreshed) == len(holders)
+    assert carts.refresh_items(refreshed) == 0  # уже актуально
+    for cart in carts.carts.values():
+        assert cart.version == versions[cart.id] + (cart.id in holders)
+        assert cart.price == pytest.approx(sum(line.quantity * line.price for line in cart.items.values()))
+        for line in cart.items.values():
+            item = items.get_item(line.id)
+            assert (line.name, line.price, line.available, line.is_in_stock) == (
+                item.name,
+                item.price,
+                not item.deleted,
+                not item.deleted,
+            )
+
+    # индекс цен корзин перестроен вместе с суммами
+    expected = [cart.id for cart in carts.carts.values() if 100 <= cart.price <= 300]
+    assert [cart.id for cart in carts.paginate_filtered(limit=1000, min_price=100, max_price=300)] == expected
+    assert len(carts.price_index) == len(cart_ids)
+
+
+def test_item_changes_reach_carts(client) -> None:
+    first = client.post("/item/", json={"name": "lamp", "price": 10.0}).json()["id"]
+    second = client.post("/item/", json={"name": "chair", "price": 1.0}).json()["id"]
+    holder = client.post("/cart").json()["id"]
+    other = client.post("/cart").json()["id"]
+    client.post(f"/cart/{holder}/add", json={str(first): 3, str(second): 1})
+    client.post(f"/cart/{other}/add", json={str(second): 2})
+    etag = client.get(f"/cart/{other}").headers["ETag"]
+
+    client.patch(f"/item/{first}", json={"price": 20.0})
+    cart = client.get(f"/cart/{holder}").json()
+    assert cart["price"] == 61.0
+    assert cart["items"][0]["price"] == 20.0
+
+    client.put(f"/item/{first}", json={"name": "desk lamp", "price": 5.0})
+    client.delete(f"/item/{second}")
+    cart = client.get(f"/cart/{holder}").json()
+    assert cart["price"] == 16.0
+    assert [(item["name"], item["is_in_stock"]) for item in cart["items"]] == [("desk lamp", True), ("chair", False)]
+
+    client.post("/item/batch", json=[{"id": first, "name": "lamp", "price": 1.0}])
+    assert client.get(f"/cart/{holder}").json()["price"] == 4.0
+    assert client.get(f"/cart/{other}").headers["ETag"] != etag
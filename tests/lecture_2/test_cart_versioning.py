@@ -0,0 +1,125 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage, CartVersionConflict
+from lecture_2.hw.shop_api.app.storages.item_storage import Item
+from lecture_2.hw.shop_api.main import app, create_app
+
+ITEMS = [Item(id=i, name=f"item {i}", price=0.25) for i in range(1, 4)]
+
+
+@pytest.fixture()
+def frequent_switches():
+    # переключение потоков как можно чаще, чтобы гонки проявлялись
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+class RacingItem:
+    """Товар, цена которого читается посреди `cart.price += item.price * n`:
+    поток ждет второй на барьере уже после чтения суммы корзины. Без
+    блокировки корзины оба читают одну и ту же сумму, и одно добавление
+    теряется; с блокировкой второй не войдет, и барьер разрывается по таймауту.
+    """
+
+    def __init__(self, item: Item, barrier: threading.Barrier) -> None:
+        self.id, self.name, self.deleted = item.id, item.name, item.deleted
+        self._price, self._barrier = item.price, barrier
+
+    @property
+    def price(self) -> float:
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return self._price
+
+
+def test_threads_do_not_lose_increments() -> None:
+    storage = CartStorage()
+    cart_id = storage.create_cart()
+    storage.add_item_to_cart(cart_id, ITEMS[0])
+    item = RacingItem(ITEMS[0], threading.Barrier(2, timeout=0.5))
+
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda _: storage.add_item_to_cart(cart_id, item), range(2)))
+
+    cart = storage.get_cart(cart_id)
+    assert cart.items[ITEMS[0].id].quantity == 3
+    assert cart.price == 0.25 * 3
+    assert cart.version == 3
+
+
+def test_compare_and_swap_retries(frequent_switches) -> None:
+    storage = CartStorage()
+    cart_id = storage.create_cart()
+
+    def add(_: int) -> int:
+        conflicts = 0
+        for _ in range(500):
+            while True:
+                version = storage.get_cart(cart_id).version
+                try:
+                    storage.add_item_to_cart(cart_id, ITEMS[0], expected_version=version)
+                    break
+                except CartVersionConflict:
+                    conflicts += 1
+        return conflicts
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(add, range(8)))
+
+    assert storage.get_cart(cart_id).items[ITEMS[0].id].quantity == 4000
+
+
+def test_concurrent_creates_keep_ids_sorted(frequent_switches) -> None:
+    storage = CartStorage()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: storage.create_cart(), range(5000)))
+
+    assert list(storage.id_index.after()) == list(range(1, 5001))
+
+
+def test_if_match() -> None:
+    client = TestClient(app)
+    cart_id = client.post("/cart/").json()["id"]
+    item_id = client.post("/item/", json={"name": "etag", "price": 1.0}).json()["id"]
+
+    version = client.get(f"/cart/{cart_id}").headers["ETag"]
+    assert client.post(f"/cart/{cart_id}/add/{item_id}", headers={"If-Match": version}).status_code == 200
+
+    stale = client.post(f"/cart/{cart_id}/add/{item_id}", headers={"If-Match": version})
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == client.get(f"/cart/{cart_id}").headers["ETag"] != version
+    assert client.post(f"/cart/{cart_id}/add/{item_id}", headers={"If-Match": "*"}).status_code == 200
+    assert client.post(f"/cart/{cart_id}/add/{item_id}", headers={"If-Match": "garbage"}).status_code == 412
+    assert client.get(f"/cart/{cart_id}").json()["items"][0]["quantity"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_sqlite(tmp_path) -> None:
+    """Запросы в SQLite идут из пула потоков, т.е. действительно параллельно"""
+    application = create_app("sqlite", str(tmp_path / "shop.sqlite3"))
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        cart_id = (await client.post("/cart/")).json()["id"]
+        item_ids = [(await client.post("/item/", json={"name": f"i{i}", "price": 0.5})).json()["id"] for i in range(3)]
+
+        responses = await asyncio.gather(
+            *(client.post(f"/cart/{cart_id}/add/{item_ids[i % 3]}") for i in range(600))
+        )
+        assert {response.status_code for response in responses} == {200}
+
+        cart = (await client.get(f"/cart/{cart_id}")).json()
+    application.state.storages.close()
+
+    assert [item["quantity"] for item in cart["items"]] == [200, 200, 200]
+    assert cart["price"] == 300.0
@@ -0,0 +1,69 @@
+import pytest
+
+from lecture_2.hw.shop_api.app.storages.columnar_item_storage import ColumnarItemStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from tests.lecture_2.conftest import fill_items
+
+
+@pytest.fixture(scope="module")
+def storages() -> tuple[ItemStorage, ColumnarItemStorage]:
+    row, columnar = ItemStorage(), ColumnarItemStorage()
+    for storage in (row, columnar):
+        fill_items(storage, seed=3, count=1500, max_price=300, name=lambda i: f"item {i % 40}")
+    return row, columnar
+
+
+@pytest.mark.parametrize("order_by", ["id", "price"])
+@pytest.mark.parametrize("show_deleted", [False, True])
+@pytest.mark.parametrize(("min_price", "max_price"), [(None, None), (50.0, None), (None, 20.0), (100.0, 140.0)])
+@pytest.mark.parametrize(("offset", "limit"), [(0, 10), (35, 50), (0, 5000)])
+def test_same_pages_as_item_storage(storages, order_by, show_deleted, min_price, max_price, offset, limit) -> None:
+    row, columnar = storages
+    args = (offset, limit, min_price, max_price, show_deleted, order_by)
+    assert columnar.paginate_items_filtered(*args) == row.paginate_items_filtered(*args)
+
+
+@pytest.mark.parametrize("order_by", ["id", "price"])
+def test_after_key(storages, order_by) -> None:
+    row, columnar = storages
+    last = row.paginate_items_filtered(0, 300, order_by=order_by)[-1]
+    after = row.sort_key(last, order_by)
+    assert columnar.paginate_items_filtered(0, 50, order_by=order_by, after=after) == row.paginate_items_filtered(
+        0, 50, order_by=order_by, after=after
+    )
+
+
+def test_crud() -> None:
+    storage = ColumnarItemStorage()
+    item = storage.add_new_item("name", 10.0)
+
+    assert storage.get_item(item.id) == item
+    assert storage.update_item(item.id, name="other").name == "other"
+    storage.delete_item(item.id)
+    assert storage.get_item(item.id).deleted
+    assert not storage.replace_item(item.id, "new", 5.0).deleted
+    assert storage.get_item(999) is None
+    with pytest.raises(ValueError):
+        storage.delete_item(999)
+
+
+def test_names_are_pooled() -> None:
+    storage = ColumnarItemStorage()
+    for i in range(100):
+        storage.add_new_item("same" + str(i % 2), 1.0)
+    assert len(storage._names) == 2
+
+
+def test_rejects_decreasing_ids() -> None:
+    class Backwards:
+        def __init__(self) -> None:
+            self.next_id = 10
+
+        def allocate(self) -> int:
+            self.next_id -= 1
+            return self.next_id
+
+    storage = ColumnarItemStorage(Backwards())
+    storage.add_new_item("a", 1.0)
+    with pytest.raises(ValueError):
+        storage.add_new_item("b", 1.0)
@@ -0,0 +1,85 @@
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.main import create_app
+
+
+def test_live_indexes_hold_only_live_items() -> None:
+    rng = random.Random(20)
+    storage = ItemStorage()
+    for i in range(500):
+        storage.add_new_item(f"item {i}", float(rng.randint(1, 50)))
+    deleted = set(rng.sample(range(1, 501), 300))
+    for item_id in deleted:
+        storage.delete_item(item_id)
+    storage.delete_item(next(iter(deleted)))  # повторное удаление ничего не меняет
+    revived = rng.sample(sorted(deleted), 10)
+    for item_id in revived:
+        storage.replace_item(item_id, "revived", 5.0)
+    for item_id in rng.sample(sorted(deleted - set(revived)), 10):
+        storage.update_item(item_id, price=float(rng.randint(1, 50)))
+
+    live = [item for item in storage.items.values() if not item.deleted]
+    assert len(storage.id_index) == len(storage.price_index) == len(live) == 210
+    assert len(storage.deleted_id_index) == len(storage.deleted_price_index) == 290
+
+    everything = sorted(storage.items.values(), key=lambda item: item.id)
+    by_price = sorted(everything, key=lambda item: (item.price, item.id))
+    for show_deleted in (False, True):
+        expected = [item for item in everything if show_deleted or not item.deleted]
+        assert storage.paginate_items_filtered(limit=1000, show_deleted=show_deleted) == expected
+        expected = [item for item in by_price if (show_deleted or not item.deleted) and 10 <= item.price <= 12]
+        for order_by in ("id", "price"):
+            found = storage.paginate_items_filtered(
+                limit=1000, min_price=10, max_price=12, show_deleted=show_deleted, order_by=order_by
+            )
+            assert found == (expected if order_by == "price" else sorted(expected, key=lambda item: item.id))
+
+
+def test_compact_keeps_items_in_carts() -> None:
+    items, carts = ItemStorage(), CartStorage()
+    created = [items.add_new_item(f"lamp {i}", 1.0) for i in range(10)]
+    cart_id = carts.create_cart()
+    carts.add_item_to_cart(cart_id, created[0])
+    for item in created[:6]:
+        items.delete_item(item.id)
+
+    assert items.compact(carts, limit=2) == 2
+    assert items.compact(carts) == 3
+    assert items.compact(carts) == 0
+    assert items.get_item(created[0].id).deleted
+    assert all(items.get_item(item.id) is None for item in created[1:6])
+    assert [item.id for item in items.paginate_items_filtered(limit=100, show_deleted=True)] == [
+        created[0].id,
+        *(item.id for item in created[6:]),
+    ]
+    assert [item.id for item in items.paginate_items_filtered(limit=100, q="lamp")] == [item.id for item in created[6:]]
+    with pytest.raises(ValueError):
+        items.delete_item(created[1].id)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_background_compaction(backend, tmp_path) -> None:
+    application = create_app(backend, str(tmp_path / "shop.sqlite3"), compact_interval=0.05)
+    with TestClient(application) as client:
+        ids = [client.post("/item/", json={"name": f"item {i}", "price": 1.0}).json()["id"] for i in range(5)]
+        cart_id = client.post("/cart").json()["id"]
+        client.post(f"/cart/{cart_id}/add/{ids[0]}")
+        for item_id in ids[:3]:
+            client.delete(f"/item/{item_id}")
+
+        def listed() -> list[int]:
+            return [item["id"] for item in client.get("/item/", params={"show_deleted": True, "limit": 100}).json()]
+
+        expected = [ids[0], *ids[3:]]
+        deadline = time.monotonic() + 5
+        while listed() != expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert listed() == expected
+        assert client.get(f"/item/{ids[1]}").status_code == 404
+        assert [item["id"] for item in client.get(f"/cart/{cart_id}").json()["items"]] == [ids[0]]
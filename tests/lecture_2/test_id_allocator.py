@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.id_allocator import (
+    BlockIdAllocator,
+    FileBlockSource,
+    LocalBlockSource,
+    SequentialIdAllocator,
+)
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+
+
+def test_sequential_allocator() -> None:
+    allocator = SequentialIdAllocator(start=10)
+
+    assert [allocator.allocate() for _ in range(3)] == [10, 11, 12]
+
+
+def test_sequential_allocator_threads() -> None:
+    allocator = SequentialIdAllocator()
+    with ThreadPoolExecutor(8) as pool:
+        ids = list(pool.map(lambda _: allocator.allocate(), range(10_000)))
+
+    assert sorted(ids) == list(range(1, 10_001))
+
+
+def test_block_allocators_do_not_collide() -> None:
+    source = LocalBlockSource()
+    first = BlockIdAllocator(source, block_size=4)
+    second = BlockIdAllocator(source, block_size=4)
+
+    ids = [allocator.allocate() for _ in range(10) for allocator in (first, second)]
+
+    assert len(set(ids)) == len(ids)
+
+
+def allocate_from_file(path: str) -> list[int]:
+    allocator = BlockIdAllocator(FileBlockSource(path), block_size=16)
+    return [allocator.allocate() for _ in range(500)]
+
+
+def test_file_block_source_across_processes(tmp_path: Path) -> None:
+    path = str(tmp_path / "ids")
+    with ProcessPoolExecutor(4) as pool:
+        ids = [i for chunk in pool.map(allocate_from_file, [path] * 4) for i in chunk]
+
+    assert len(set(ids)) == len(ids) == 2000
+
+
+def test_file_block_source_never_leaves_file_empty(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "ids"
+    source = FileBlockSource(str(path))
+    assert source.lease(998) == 1
+    assert path.read_bytes() == b"999"
+
+    # сбой сразу после записи: в файле уже новое значение, а не пустота
+    def crash(fd: int, length: int) -> None:
+        raise OSError("crash")
+
+    monkeypatch.setattr(os, "ftruncate", crash)
+    with pytest.raises(OSError):
+        source.lease(2)
+    monkeypatch.undo()
+    assert path.read_bytes() == b"1001"
+    assert source.lease(1) == 1001
+
+
+def test_storages_use_allocator() -> None:
+    items = ItemStorage(SequentialIdAllocator(start=100))
+    carts = CartStorage(SequentialIdAllocator(start=7))
+
+    assert items.add_new_item("a", 1.0).id == 100
+    assert items.add_new_item("b", 2.0).id == 101
+    assert carts.create_cart() == 7
@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.text_index import PrefixIndex, TokenIndex, name_matches, tokenize
+
+WORDS = ["Red", "green", "blue", "Chair", "table", "lamp", "Ёлка", "ёж"]
+
+
+def test_indexes() -> None:
+    tokens, prefixes = TokenIndex(), PrefixIndex()
+    for item_id, name in enumerate(["Red chair", "red table", "Redwood chair", "blue CHAIR"], 1):
+        tokens.add(item_id, name)
+        prefixes.add(item_id, name)
+
+    assert tokenize("Red, red-CHAIR!") == {"red", "chair"}
+    assert tokens.ids({"red"}) == {1, 2}
+    assert tokens.ids({"chair", "red"}) == {1}
+    assert tokens.ids({"missing", "red"}) == set()
+    assert tokens.ids(set()) == set()
+    assert list(prefixes.ids("RED")) == [1, 2, 3]
+    assert prefixes.count("red ") == 2
+
+    tokens.remove(1, "Red chair")
+    prefixes.remove(1, "Red chair")
+    assert tokens.ids({"red"}) == {2}
+    assert list(prefixes.ids("red")) == [2, 3]
+
+    assert name_matches("Red chair", {"chair"}, "re")
+    assert not name_matches("Red chair", set(), None)
+
+
+def test_storage_keeps_indexes_on_updates() -> None:
+    storage = ItemStorage()
+    first = storage.add_new_item("old lamp", 1.0)
+    second = storage.add_new_item("old chair", 2.0)
+    storage.replace_item(first.id, "new lamp", 1.0)
+    storage.update_item(second.id, name="new chair")
+    storage.upsert_items([(None, "old table", 3.0)])
+
+    assert [item.name for item in storage.paginate_items_filtered(q="old")] == ["old table"]
+    assert [item.name for item in storage.paginate_items_filtered(name_prefix="new")] == ["new lamp", "new chair"]
+    assert storage.paginate_items_filtered(q="new lamp", name_prefix="new l") == [storage.get_item(first.id)]
+
+
+@pytest.mark.parametrize("order_by", ["id", "price"])
+@pytest.mark.parametrize("matching", [30, 400])
+def test_search_cursor_pages(order_by, matching) -> None:
+    # совпадения собраны в конце каталога: и узкий, и широкий запрос
+    rng = random.Random(matching)
+    storage = ItemStorage()
+    storage.upsert_items([(None, "plain lamp", float(rng.randint(1, 9))) for _ in range(1000 - matching)])
+    storage.upsert_items([(None, f"red {rng.choice(WORDS)}", float(rng.randint(1, 9))) for _ in range(matching)])
+    for item_id in rng.sample(sorted(storage.items), 50):
+        storage.delete_item(item_id)
+    expected = sorted(
+        (item for item in storage.items.values() if not item.deleted and name_matches(item.name, {"red"}, "re")),
+        key=lambda item: storage.sort_key(item, order_by),
+    )
+
+    pages, after = [], None
+    while page := storage.paginate_items_filtered(limit=7, order_by=order_by, after=after, q="red", name_prefix="re"):
+        pages.extend(page)
+        after = storage.sort_key(page[-1], order_by)
+    assert pages == expected
+    assert storage.paginate_items_filtered(offset=5, limit=3, order_by=order_by, q="red") == expected[5:8]
+
+
+def test_search_endpoint_matches_scan(client) -> None:
+    rng = random.Random(19)
+    names = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(200)]
+    ids = [item["item"]["id"] for item in client.post(
+        "/item/batch", json=[{"name": name, "price": float(rng.randint(1, 50))} for name in names]
+    ).json()]
+    for item_id in rng.sample(ids, 20):
+        client.delete(f"/item/{item_id}")
+    for item_id in rng.sample(ids, 20):
+        client.patch(f"/item/{item_id}", json={"name": " ".join(rng.sample(WORDS, 2))})
+    everything = client.get("/item/", params={"limit": 1000, "show_deleted": True}).json()
+
+    queries = [
+        {"q": "red"},
+        {"q": "CHAIR red"},
+        {"q": "ёлка"},
+        {"q": "missing"},
+        {"name_prefix": "gr"},
+        {"name_prefix": "Ё"},
+        {"q": "lamp", "name_prefix": "blue"},
+        {"q": "table", "min_price": 10, "max_price": 30},
+        {"name_prefix": "r", "order_by": "price", "show_deleted": True},
+    ]
+    for query in queries:
+        tokens = tokenize(query["q"]) if "q" in query else None
+        expected = [
+            item
+            for item in everything
+            if name_matches(item["name"], tokens, query.get("name_prefix"))
+            and (query.get("show_deleted") or not item["deleted"])
+            and query.get("min_price", 0) <= item["price"] <= query.get("max_price", 100)
+        ]
+        if query.get("order_by") == "price":
+            expected.sort(key=lambda item: (item["price"], item["id"]))
+
+        # постранично через курсор - проверяет и сортировку, и продолжение
+        found, params = [], {**query, "limit": 7}
+        while True:
+            response = client.get("/item/", params=params)
+            assert response.status_code == 200
+            found += response.json()
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+        assert found == expected, query
+
+
+def test_search_validation(client) -> None:
+    assert client.get("/item/", params={"q": ""}).status_code == 422
+    assert client.get("/item/", params={"name_prefix": ""}).status_code == 422
+    assert client.get("/item/", params={"q": "!!!"}).json() == []
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.indexes import IdIndex, SortedIndex
+from lecture_2.hw.shop_api.app.storages.item_storage import Item, ItemStorage
+from lecture_2.hw.shop_api.main import app
+
+
+def test_sorted_index() -> None:
+    index = SortedIndex()
+    for entity_id, key in enumerate([5.0, 1.0, 3.0, 3.0, 9.0]):
+        index.add(key, entity_id)
+    index.remove(9.0, 4)
+    index.remove(9.0, 100)  # нет такой записи
+
+    assert list(index.ids()) == [1, 2, 3, 0]
+    assert list(index.ids(2.0, 5.0)) == [2, 3, 0]
+    assert index.count(3.0, 3.0) == 2
+    assert list(index.ids(6.0, 2.0)) == []
+
+
+
+# размеры пачек попадают в каждую ветку: по одной, по позициям, пересборка
+@pytest.mark.parametrize("changed", [10, 200, 900])
+def test_sorted_index_bulk_updates(changed) -> None:
+    rng = random.Random(changed)
+    keys = {entity_id: float(rng.randint(0, 100)) for entity_id in range(1000)}
+    index = SortedIndex()
+    index.add_many((key, entity_id) for entity_id, key in keys.items())
+
+    old_keys = {entity_id: keys[entity_id] for entity_id in rng.sample(range(1000), changed)}
+    new_keys = {entity_id: float(rng.randint(0, 100)) for entity_id in old_keys}
+    index.rekey(old_keys, new_keys)
+    keys.update(new_keys)
+    assert list(index.ids()) == [entity_id for _, entity_id in sorted((key, entity_id) for entity_id, key in keys.items())]
+
+    removed = set(rng.sample(range(1000), changed))
+    index.remove_many({(keys[entity_id], entity_id) for entity_id in removed})
+    ids = IdIndex()
+    for entity_id in range(1000):
+        ids.add(entity_id)
+    ids.remove_many(removed)
+    assert sorted(index.ids()) == list(ids.after()) == sorted(set(range(1000)) - removed)
+
+    # отрезки подряд (как у истекших корзин) удаляются на месте
+    runs = {entity_id for start in (0, 300, 990) for entity_id in range(start, start + changed // 3)} - removed
+    ids.remove_many(runs)
+    assert list(ids.after()) == sorted(set(range(1000)) - removed - runs)
+
+@pytest.fixture()
+def storage() -> ItemStorage:
+    rng = random.Random(42)
+    storage = ItemStorage()
+    for i in range(2000):
+        storage.add_new_item(f"item {i}", round(rng.uniform(1, 1000), 2))
+    for item_id in rng.sample(range(1, 2001), 300):
+        storage.delete_item(item_id)
+    for item_id in rng.sample(range(1, 2001), 300):
+        storage.update_item(item_id, price=round(rng.uniform(1, 1000), 2))
+    for item_id in rng.sample(range(1, 2001), 100):
+        storage.replace_item(item_id, "replaced", round(rng.uniform(1, 1000), 2))
+    return storage
+
+
+def brute_force(storage: ItemStorage, min_price, max_price, show_deleted) -> list[Item]:
+    return [
+        item
+        for item in storage.items.values()
+        if (show_deleted or not item.deleted)
+        and (min_price is None or item.price >= min_price)
+        and (max_price is None or item.price <= max_price)
+    ]
+
+
+@pytest.mark.parametrize(
+    ("min_price", "max_price"),
+    [(None, None), (100.0, 110.0), (None, 20.0), (990.0, None), (10.0, 900.0), (500.0, 400.0)],
+)
+@pytest.mark.parametrize("show_deleted", [False, True])
+@pytest.mark.parametrize(("offset", "limit"), [(0, 10), (5, 50), (0, 5000)])
+def test_paginate_matches_full_scan(storage: ItemStorage, min_price, max_price, show_deleted, offset, limit) -> None:
+    expected = brute_force(storage, min_price, max_price, show_deleted)
+
+    by_id = storage.paginate_items_filtered(offset, limit, min_price, max_price, show_deleted)
+    by_price = storage.paginate_items_filtered(offset, limit, min_price, max_price, show_deleted, "price")
+
+    assert by_id == expected[offset : offset + limit]
+    ordered = sorted(expected, key=lambda item: (item.price, item.id))
+    assert by_price == ordered[offset : offset + limit]
+
+
+def test_list_items_order_by_price() -> None:
+    client = TestClient(app)
+    for price in (30.0, 10.0, 20.0):
+        client.post("/item", json={"name": "order by price", "price": price})
+
+    response = client.get("/item", params={"order_by": "price", "limit": 1000, "min_price": 5.0})
+    prices = [item["price"] for item in response.json()]
+
+    assert response.status_code == 200
+    assert prices == sorted(prices)
+    assert client.get("/item", params={"order_by": "name"}).status_code == 422
@@ -0,0 +1,45 @@
+import json
+import random
+
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.models import CartResponse, ItemResponse
+from lecture_2.hw.shop_api.app.serialization import encode_cart, encode_carts, encode_item, encode_items
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.main import create_app
+
+
+def test_encoders_match_response_models() -> None:
+    rng = random.Random(25)
+    items, carts = ItemStorage(), CartStorage()
+    catalog = [items.add_new_item(f"item «{i}» \"quoted\"", rng.choice([1, 2.5, 1e-7, 3e12])) for i in range(20)]
+    items.delete_item(catalog[0].id)
+    cart_ids = [carts.create_cart() for _ in range(5)]
+    for cart_id in cart_ids[1:]:
+        carts.add_items_to_cart(cart_id, [(item, rng.randint(1, 5)) for item in rng.sample(catalog, 4)])
+    stored_items = [items.get_item(item.id) for item in catalog]
+    stored_carts = [carts.get_cart(cart_id) for cart_id in cart_ids]
+
+    for item in stored_items:
+        assert encode_item(item) == ItemResponse.from_item(item).model_dump_json().encode()
+    for cart in stored_carts:
+        assert encode_cart(cart) == CartResponse.from_cart(cart).model_dump_json().encode()
+    assert json.loads(encode_items(stored_items)) == [ItemResponse.from_item(item).model_dump() for item in stored_items]
+    assert json.loads(encode_carts(stored_carts)) == [CartResponse.from_cart(cart).model_dump() for cart in stored_carts]
+
+
+def test_raw_responses_keep_contract() -> None:
+    with TestClient(create_app("memory")) as client:
+        created = client.post("/item/", json={"name": "lamp", "price": 3})
+        assert created.status_code == 201
+        assert created.headers["content-type"] == "application/json"
+        assert created.json() == {"id": created.json()["id"], "name": "lamp", "price": 3.0, "deleted": False}
+
+        cart_id = client.post("/cart").json()["id"]
+        added = client.post(f"/cart/{cart_id}/add", json={str(created.json()["id"]): 2})
+        assert added.headers["ETag"] == client.get(f"/cart/{cart_id}").headers["ETag"]
+        assert added.json()["total_cost"] == 6.0
+
+        schemas = client.get("/openapi.json").json()["components"]["schemas"]
+        assert {"CartResponse", "CartItemResponse", "ItemResponse"} <= set(schemas)
@@ -0,0 +1,95 @@
+import random
+import threading
+
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages import ShardedCartStorage, Storages
+from lecture_2.hw.shop_api.app.storages.cart_storage import CartStorage
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.main import create_app
+
+
+def test_sharded_matches_single_storage() -> None:
+    rng = random.Random(24)
+    items = ItemStorage()
+    catalog = [items.add_new_item(f"item {i}", float(rng.randint(1, 20))) for i in range(30)]
+    single, sharded = CartStorage(), ShardedCartStorage(shards=4)
+    cart_ids = [single.create_cart() for _ in range(200)]
+    assert [sharded.create_cart() for _ in range(200)] == cart_ids
+    for _ in range(800):
+        cart_id, quantities = rng.choice(cart_ids), [(rng.choice(catalog), rng.randint(1, 3))]
+        single.add_items_to_cart(cart_id, quantities)
+        sharded.add_items_to_cart(cart_id, quantities)
+
+    items.update_item(catalog[0].id, price=100.0)
+    assert sharded.refresh_items([items.get_item(catalog[0].id)]) == single.refresh_items([items.get_item(catalog[0].id)])
+    assert {shard_index for shard_index, shard in enumerate(sharded.shards) if shard.carts} == {0, 1, 2, 3}
+
+    for window in [{}, {"min_price": 50.0}, {"min_quantity": 3, "max_quantity": 5}, {"max_price": 0.0}]:
+        for offset, after in [(0, None), (7, None), (0, 101), (3, 57)]:
+            expected = single.paginate_filtered(offset=offset, limit=15, after=after, **window)
+            assert sharded.paginate_filtered(offset=offset, limit=15, after=after, **window) == expected
+    assert sharded.get_cart(cart_ids[5]) == single.get_cart(cart_ids[5])
+    assert sharded.get_cart(10**6) is None
+    assert sharded.is_referenced(catalog[1].id) == single.is_referenced(catalog[1].id)
+
+
+def test_parallel_writers_do_not_lose_updates() -> None:
+    items = ItemStorage()
+    item = items.add_new_item("item", 1.0)
+    carts = ShardedCartStorage(shards=3)
+    cart_ids = [carts.create_cart() for _ in range(12)]
+
+    def writer() -> None:
+        for cart_id in cart_ids * 50:
+            carts.add_items_to_cart(cart_id, [(item, 1)])
+
+    workers = [threading.Thread(target=writer) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for cart_id in cart_ids:
+        cart = carts.get_cart(cart_id)
+        assert cart.quantity == cart.items[item.id].quantity == cart.version == 300
+
+
+def test_listing_survives_concurrent_creates() -> None:
+    single = CartStorage()
+    for _ in range(3000):
+        single.create_cart()
+    listing = single.filtered(min_quantity=0)
+    next(listing)
+    single.create_cart()
+    assert len(list(listing)) == 3000
+
+    sharded = ShardedCartStorage(shards=4)
+    for _ in range(3000):
+        sharded.create_cart()
+    stop = threading.Event()
+
+    def creator() -> None:
+        while not stop.is_set():
+            sharded.create_cart()
+
+    worker = threading.Thread(target=creator)
+    worker.start()
+    try:
+        for _ in range(20):
+            assert len(sharded.paginate_filtered(limit=3000)) == 3000
+    finally:
+        stop.set()
+        worker.join()
+
+
+def test_app_with_sharded_carts() -> None:
+    application = create_app("memory")
+    application.state.storages = Storages(items=ItemStorage(), carts=ShardedCartStorage(4))
+    with TestClient(application) as client:
+        item_id = client.post("/item/", json={"name": "lamp", "price": 2.0}).json()["id"]
+        cart_ids = [client.post("/cart").json()["id"] for _ in range(9)]
+        for cart_id in cart_ids[::2]:
+            client.post(f"/cart/{cart_id}/add/{item_id}")
+        assert [cart["id"] for cart in client.get("/cart/", params={"limit": 20}).json()] == cart_ids
+        assert [cart["id"] for cart in client.get("/cart/", params={"min_price": 1.0}).json()] == cart_ids[::2]
+        assert client.get(f"/cart/{cart_ids[-1]}").json()["price"] == 2.0
@@ -0,0 +1,119 @@
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.shared_memory_storage import (
+    CapacityError,
+    SharedMemoryCartStorage,
+    SharedMemoryItemStorage,
+)
+from lecture_2.hw.shop_api.main import create_app
+from tests.lecture_2.conftest import fill_items
+
+
+@pytest.fixture()
+def name():
+    name = f"shop_test_{uuid4().hex[:12]}"
+    yield name
+    for segment in (name, f"{name}_items", f"{name}_carts"):
+        try:
+            shm = SharedMemory(segment)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+        Path(tempfile.gettempdir(), f"{segment}.lock").unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("order_by", ["id", "price"])
+@pytest.mark.parametrize("show_deleted", [False, True])
+@pytest.mark.parametrize(("min_price", "max_price"), [(None, None), (10.0, 20.0)])
+def test_same_pages_as_item_storage(name, order_by, show_deleted, min_price, max_price) -> None:
+    memory, shared = ItemStorage(), SharedMemoryItemStorage(name, capacity=500)
+    fill_items(memory, seed=11, name="товар {}".format)
+    fill_items(shared, seed=11, name="товар {}".format)
+    after = memory.sort_key(memory.paginate_items_filtered(0, 100, order_by=order_by)[-1], order_by)
+
+    for offset, limit, cursor in [(0, 10, None), (7, 25, None), (0, 1000, None), (3, 20, after)]:
+        args = (offset, limit, min_price, max_price, show_deleted, order_by, cursor)
+        assert shared.paginate_items_filtered(*args) == memory.paginate_items_filtered(*args)
+    shared.close()
+
+
+def add_items(name: str, count: int) -> list[int]:
+    storage = SharedMemoryItemStorage(name)
+    try:
+        return [storage.add_new_item(f"item {i}", float(i)).id for i in range(count)]
+    finally:
+        storage.close()
+
+
+def add_to_cart(name: str, cart_id: int, item_ids: list[int]) -> None:
+    items, carts = SharedMemoryItemStorage(f"{name}_items"), SharedMemoryCartStorage(f"{name}_carts")
+    try:
+        for item_id in item_ids:
+            carts.add_item_to_cart(cart_id, items.get_item(item_id))
+    finally:
+        items.close()
+        carts.close()
+
+
+def test_processes_share_one_catalog(name) -> None:
+    storage = SharedMemoryItemStorage(name, capacity=2000)
+    with ProcessPoolExecutor(4, mp_context=get_context("spawn")) as pool:
+        created = [item_id for ids in pool.map(add_items, [name] * 4, [250] * 4) for item_id in ids]
+
+    assert sorted(created) == list(range(1, 1001))
+    assert len(storage.paginate_items_filtered(0, 2000)) == 1000
+    storage.close()
+
+
+def test_processes_do_not_lose_cart_increments(name) -> None:
+    items = SharedMemoryItemStorage(f"{name}_items", capacity=10)
+    carts = SharedMemoryCartStorage(f"{name}_carts", capacity=10)
+    item_ids = [items.add_new_item(f"item {i}", 1.5).id for i in range(3)]
+    cart_id = carts.create_cart()
+
+    with ProcessPoolExecutor(4, mp_context=get_context("spawn")) as pool:
+        list(pool.map(add_to_cart, [name] * 4, [cart_id] * 4, [item_ids * 100] * 4))
+
+    cart = carts.get_cart(cart_id)
+    assert [item.quantity for item in cart.items.values()] == [400, 400, 400]
+    assert cart.price == 1.5 * 1200
+    assert [cart.id for cart in carts.paginate_filtered(min_quantity=1200)] == [cart_id]
+    items.close()
+    carts.close()
+
+
+def test_capacity(name) -> None:
+    storage = SharedMemoryItemStorage(name, capacity=1)
+    storage.add_new_item("one", 1.0)
+
+    with pytest.raises(CapacityError):
+        storage.add_new_item("two", 1.0)
+    with pytest.raises(CapacityError):
+        storage.replace_item(1, "x" * 1000, 1.0)
+    assert storage.get_item(1).name == "one"
+    storage.close()
+
+
+def test_app_with_shared_backend(name) -> None:
+    with TestClient(create_app("shared", shared_name=name)) as client:
+        item_id = client.post("/item/", json={"name": "shared", "price": 2.0}).json()["id"]
+        cart_id = client.post("/cart/").json()["id"]
+        client.post(f"/cart/{cart_id}/add/{item_id}")
+        client.post(f"/cart/{cart_id}/add/{item_id}")
+
+        assert client.get(f"/cart/{cart_id}").json()["items"][0]["quantity"] == 2
+        assert client.post("/item/", json={"name": "x" * 1000, "price": 1.0}).status_code == 507
+
+    # второй "воркер" видит те же данные
+    with TestClient(create_app("shared", shared_name=name)) as client:
+        assert client.get(f"/item/{item_id}").json()["name"] == "shared"
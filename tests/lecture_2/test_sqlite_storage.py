@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from lecture_2.hw.shop_api.app.storages.item_storage import ItemStorage
+from lecture_2.hw.shop_api.app.storages.sqlite_storage import SQLiteCartStorage, SQLiteDatabase, SQLiteItemStorage
+from lecture_2.hw.shop_api.main import create_app
+from tests.lecture_2.conftest import fill_items
+
+
+@pytest.fixture()
+def database(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "shop.sqlite3"), readers=2)
+    yield database
+    database.close()
+
+
+@pytest.mark.parametrize("order_by", ["id", "price"])
+@pytest.mark.parametrize("show_deleted", [False, True])
+@pytest.mark.parametrize(("min_price", "max_price"), [(None, None), (10.0, 20.0)])
+@pytest.mark.parametrize("after", [None, "middle"])
+def test_same_pages_as_item_storage(database, order_by, show_deleted, min_price, max_price, after) -> None:
+    memory, sqlite = ItemStorage(), SQLiteItemStorage(database)
+    fill_items(memory, seed=5)
+    fill_items(sqlite, seed=5)
+    if after is not None:
+        after = memory.sort_key(memory.paginate_items_filtered(0, 100, order_by=order_by)[-1], order_by)
+
+    for offset, limit in [(0, 10), (7, 25), (0, 1000)]:
+        args = (offset, limit, min_price, max_price, show_deleted, order_by, after)
+        assert sqlite.paginate_items_filtered(*args) == memory.paginate_items_filtered(*args)
+
+
+def test_item_not_found(database) -> None:
+    storage = SQLiteItemStorage(database)
+
+    assert storage.get_item(1) is None
+    for call in (storage.delete_item, lambda item_id: storage.update_item(item_id, name="x")):
+        with pytest.raises(ValueError):
+            call(1)
+
+
+def test_carts(database) -> None:
+    items, carts = SQLiteItemStorage(database), SQLiteCartStorage(database)
+    apple, pear = items.add_new_item("apple", 2.0), items.add_new_item("pear", 3.0)
+    cart_id = carts.create_cart()
+    carts.add_item_to_cart(cart_id, apple)
+    carts.add_item_to_cart(cart_id, pear)
+    assert carts.add_item_to_cart(cart_id, apple).quantity == 2
+
+    cart = carts.get_cart(cart_id)
+    assert cart.price == 7.0
+    assert [(item.name, item.quantity) for item in cart.items.values()] == [("apple", 2), ("pear", 1)]
+    assert [cart.id for cart in carts.paginate_filtered(min_quantity=3)] == [cart_id]
+    assert carts.paginate_filtered(max_price=5.0) == []
+    with pytest.raises(KeyError):
+        carts.add_item_to_cart(cart_id + 1, apple)
+
+
+def test_compacted_item_id_is_not_reused(database) -> None:
+    items, carts = SQLiteItemStorage(database), SQLiteCartStorage(database)
+    kept, dropped = items.add_new_item("kept", 1.0), items.add_new_item("dropped", 2.0)
+    items.delete_item(dropped.id)
+
+    assert items.compact(carts) == 1
+    assert items.add_new_item("new", 3.0).id > dropped.id > kept.id
+
+
+def test_expired_cart_id_is_not_reused(database) -> None:
+    now = [0.0]
+    carts = SQLiteCartStorage(database, ttl=10.0, clock=lambda: now[0])
+    first, last = carts.create_cart(), carts.create_cart()
+
+    now[0] += 20
+    assert carts.expire() == 2
+    assert carts.create_cart() > last > first
+
+
+def test_concurrent_writes_and_reads(database) -> None:
+    storage = SQLiteItemStorage(database)
+
+    with ThreadPoolExecutor(8) as pool:
+        created = list(pool.map(lambda i: storage.add_new_item(f"item {i}", 1.0).id, range(200)))
+        found = list(pool.map(storage.get_item, created))
+
+    assert len(set(created)) == 200
+    assert all(item is not None for item in found)
+
+
+def test_persists_across_apps(tmp_path) -> None:
+    path = str(tmp_path / "shop.sqlite3")
+    with TestClient(create_app("sqlite", path)) as client:
+        item_id = client.post("/item/", json={"name": "persistent", "price": 5.0}).json()["id"]
+        cart_id = client.post("/cart/").json()["id"]
+        assert client.post(f"/cart/{cart_id}/add/{item_id}").status_code == 200
+
+    with TestClient(create_app("sqlite", path)) as client:
+        assert client.get(f"/item/{item_id}").json()["name"] == "persistent"
+        assert client.get(f"/cart/{cart_id}").json()["price"] == 5.0
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        create_app("redis")